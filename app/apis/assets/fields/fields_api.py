@@ -3,10 +3,9 @@ from typing import Annotated, Any
 from fastapi import APIRouter, Depends, Request
 
 from app.depends import AsyncSessionDep
-from app.utils.cache_tools import get_redis_data, redis_exists_key, set_redis_data
 
 from . import fields_schema as schema
-from .fields_deps import get_or_create_fields, set_fields_depends
+from .fields_deps import get_fields_data, get_or_create_fields, set_fields_depends
 
 router = APIRouter()
 
@@ -17,12 +16,7 @@ async def assets_fields_get(session: AsyncSessionDep) -> Any:
     获取系统配置
     """
     response = schema.FieldsResponse
-    cache_state = await redis_exists_key("assets:fields")
-    if not cache_state:
-        data = await get_or_create_fields(session=session)
-        await set_redis_data("assets:fields", value=data.model_dump())
-    else:
-        data = await get_redis_data("assets:fields")
+    data = await get_fields_data(session=session)
     return response(message="查询成功", data=data).success()
 
 
@@ -43,8 +37,5 @@ async def assets_fields_set(
     session.add(fields)
     await session.commit()
     await session.refresh(fields)
-    await set_redis_data(
-        "assets:fields",
-        value=fields.model_dump(),
-    )
+    await get_fields_data.invalidate()
     return response(message="更新成功", data=fields).success()
@@ -1,7 +1,9 @@
 from loguru import logger
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache_keys import ASSETS_FIELDS_KEY
 from app.models.assets.assets_model import AssetsFields
+from app.utils.cache_tools import cached
 
 
 async def get_or_create_fields(session: AsyncSession) -> AssetsFields:
@@ -22,6 +24,14 @@ async def get_or_create_fields(session: AsyncSession) -> AssetsFields:
     return fields_data
 
 
+@cached(key=ASSETS_FIELDS_KEY, ttl=None)
+async def get_fields_data(session: AsyncSession) -> dict:
+    """
+    获取字段配置 优先读取缓存
+    """
+    return await get_or_create_fields(session=session)
+
+
 async def set_fields_depends(update_content: AssetsFields) -> dict:
     update_dict = update_content.model_dump(exclude_unset=True, exclude_none=True)
     return update_dict
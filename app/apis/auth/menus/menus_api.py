@@ -3,6 +3,7 @@ from typing import Any
 from fastapi import APIRouter, Query
 from sqlmodel import col, select
 
+from app.apis.auth.roles.roles_crud import clear_roles_cache
 from app.depends import AsyncSessionDep
 from app.models.auth_model import Menus
 from app.utils.format_tools import ToTree
@@ -30,6 +31,7 @@ async def auth_menus_add(
     session.add(db_menu)
     await session.commit()
     await session.refresh(db_menu)
+    await clear_roles_cache()
     return response(message="创建成功", data=db_menu).success()
 
 
@@ -46,6 +48,7 @@ async def auth_menus_del(session: AsyncSessionDep, menu_id: int) -> Any:
         return response(message="对象不存在", data={"id": menu_id}).fail()
     session.delete(menu)
     await session.commit()
+    await clear_roles_cache()
     return response(message="删除成功", data={"id": menu_id}).success()
 
 
@@ -67,6 +70,7 @@ async def auth_menus_set(
     session.add(menu)
     await session.commit()
     await session.refresh(menu)
+    await clear_roles_cache()
     return response(message="更新成功", data=menu).success()
 
 
@@ -4,7 +4,7 @@ from fastapi import APIRouter
 from sqlmodel import select
 
 from app.depends import AsyncSessionDep
-from app.models.auth_model import Roles, RolesMenusLink, UsersRolesLink
+from app.models.auth_model import Roles
 
 from . import roles_crud as crud
 from . import roles_schema as schema
@@ -24,6 +24,7 @@ async def auth_roles_add(
     add_role = await crud.create_role(session=session, role_create=create_roles)
     if not add_role:
         return response(message="创建失败").fail()
+    await crud.clear_roles_cache()
     return response(message="创建成功", data=add_role).success()
 
 
@@ -42,6 +43,7 @@ async def auth_roles_del(session: AsyncSessionDep, role_id: int) -> Any:
         return response(message="角色不存在").fail()
     session.delete(role)
     await session.commit()
+    await crud.clear_roles_cache()
     return response(message="删除成功", data={"id": role_id}).success()
 
 
@@ -59,6 +61,7 @@ async def auth_roles_set(
     if not db_role:
         return response(message="角色不存在").fail()
     result = await crud.update_role(session, db_role, update_role)
+    await crud.clear_roles_cache()
     return response(message="更新成功", data=result).success()
 
 
@@ -68,30 +71,6 @@ async def auth_roles_list(session: AsyncSessionDep) -> Any:
     角色列表
     """
     response = schema.RoleQueryResponse
-    # 查询结果
-    stmt = select(Roles).order_by("id")
-    query_data = (await session.exec(stmt)).all()
-
-    # 过滤菜单使role[menus]中只包含关联菜单的id
-    result = []
-    for role in query_data:
-        menus_id_list = (
-            await session.exec(
-                select(RolesMenusLink.auth_menus_id).where(
-                    RolesMenusLink.auth_roles_id == role.id
-                )
-            )
-        ).all()
-        users_id_list = (
-            await session.exec(
-                select(UsersRolesLink.auth_users_id).where(
-                    UsersRolesLink.auth_roles_id == role.id
-                )
-            )
-        ).all()
-        format_role = role.model_dump()
-        format_role["menus"] = menus_id_list
-        format_role["user_count"] = len(users_id_list)
-        result.append(format_role)
+    result = await crud.get_roles_list(session=session)
     data = {"result": result}
     return response(message="查询成功", data=data).success()
@@ -1,7 +1,12 @@
+from sqlalchemy.orm import noload
 from sqlmodel import col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.auth_model import Menus, Roles
+from app.core.cache_keys import ROLES_LIST_KEY, ROLES_MENUS_KEY
+from app.core.permission import invalidate_permissions
+from app.models.auth_model import Menus, Roles, RolesMenusLink, UsersRolesLink
+from app.utils.cache_tools import cached
+from app.utils.query_tools import count_related, load_related_ids
 
 from . import roles_schema as schema
 
@@ -55,3 +60,69 @@ async def update_role(
     await session.refresh(db_role)
     res = schema.RoleUpdateResult(**db_role.model_dump(), menus=menus_id_list)
     return res
+
+
+@cached(key=ROLES_LIST_KEY, ttl=600, soft_ttl=300)
+async def get_roles_list(session: AsyncSession) -> list[dict]:
+    """
+    角色列表 role[menus]中只包含关联菜单的id
+    关联菜单和用户数各一次批量查询 不加载users和menus关系
+    """
+    query_data = (
+        await session.exec(
+            select(Roles)
+            .options(noload(Roles.users), noload(Roles.menus))
+            .order_by("id")
+        )
+    ).all()
+    roles_id = [role.id for role in query_data]
+    roles_menus = await load_related_ids(
+        session, RolesMenusLink.auth_roles_id, RolesMenusLink.auth_menus_id, roles_id
+    )
+    roles_user_count = await count_related(
+        session, UsersRolesLink.auth_roles_id, roles_id
+    )
+    result = []
+    for role in query_data:
+        format_role = role.model_dump()
+        format_role["menus"] = roles_menus[role.id]
+        format_role["user_count"] = roles_user_count[role.id]
+        result.append(format_role)
+    return result
+
+
+@cached(key=ROLES_MENUS_KEY, ttl=600)
+async def get_roles_menus(session: AsyncSession, roles_id: list[int]) -> list[dict]:
+    """
+    角色ID关联的所有菜单 按角色组合缓存
+    """
+    # 判断是否为超级管理员
+    if 1 in roles_id:
+        return (await session.exec(select(Menus))).all()
+    # 角色ID关联的所有菜单ID 去重
+    menus_id = (
+        await session.exec(
+            select(RolesMenusLink.auth_menus_id)
+            .distinct()
+            .where(col(RolesMenusLink.auth_roles_id).in_(roles_id))
+        )
+    ).all()
+    # menus_id对应的所有菜单
+    return (await session.exec(select(Menus).where(col(Menus.id).in_(menus_id)))).all()
+
+
+async def clear_roles_cache() -> None:
+    """
+    角色、菜单或用户角色变更后清除缓存
+    """
+    await get_roles_list.invalidate()
+    await get_roles_menus.invalidate_all()
+    await invalidate_permissions()
+
+
+async def clear_user_roles_cache() -> None:
+    """
+    用户角色变更后清除缓存
+    """
+    await get_roles_list.invalidate()
+    await invalidate_permissions()
@@ -2,15 +2,18 @@ import math
 from typing import Any, Dict, List
 
 from fastapi import APIRouter, Query, Request
-from redis import Redis
 from sqlalchemy import func
+from sqlalchemy.orm import noload
 from sqlmodel import col, or_, select
 
-from app.core.base import PagingQueryBase
-from app.depends import AsyncSessionDep
+from app.apis.auth.roles.roles_crud import clear_user_roles_cache
+from app.core.base import CountMode, PagingQueryBase
+from app.core.sys_settings import get_sys_settings
+from app.core.token_cache import revoke_user_tokens
+from app.depends import AsyncSessionDep, ReadSessionDep
 from app.ext.channels_tsk.tasks import send_email
 from app.models.auth_model import Users, UsersRolesLink
-from app.utils.cache_tools import get_redis_data
+from app.utils.query_tools import load_related_ids
 
 from . import users_crud as crud
 from . import users_schema as schema
@@ -48,6 +51,8 @@ async def auth_users_add(
     add_res = await crud.create_user(session=session, user_create=user_create)
     if not add_res:
         return response(message="创建失败").fail()
+    # 角色列表中的用户数量变化
+    await clear_user_roles_cache()
     return response(message="创建成功", data=add_res).success()
 
 
@@ -69,8 +74,8 @@ async def auth_users_del(
     session.delete(user)
     await session.commit()
     # 删除redis中的token 强制下线
-    cache: Redis = request.app.state.cache
-    await cache.delete(f"jwt:{user_id}")
+    await revoke_user_tokens([user_id])
+    await clear_user_roles_cache()
     return response(message="删除成功", data={"id": user_id}).success()
 
 
@@ -93,17 +98,13 @@ async def auth_users_bulkdel(
     if len(user_list) == 0:
         return response(message="未查询到用户").fail()
     res_list = []
-    cache_kyes = []
     for user in user_list:
         await session.delete(user)
         res_list.append(user.id)
-        cache_kyes.append(f"jwt:{user.id}")
     await session.commit()
     # redis中批量删除token
-    cache: Redis = request.app.state.cache
-    p_cache = cache.pipeline()
-    await p_cache.delete(*cache_kyes)
-    await p_cache.execute()
+    await revoke_user_tokens(res_list)
+    await clear_user_roles_cache()
     return response(message="删除成功", data=res_list).success()
 
 
@@ -135,8 +136,8 @@ async def auth_users_set(
     )
     if result.user_status is False:
         # 删除redis中的token 强制下线
-        cache: Redis = request.app.state.cache
-        await cache.delete(f"jwt:{user_id}")
+        await revoke_user_tokens([user_id])
+    await clear_user_roles_cache()
     return response(message="更新成功", data=result).success()
 
 
@@ -183,8 +184,8 @@ async def auth_users_bulkset(
         return response(message="未查询到用户", data=res_list).fail()
     # 判断是否更新角色
     update_roles = update_content.update_roles
-    # redis中缓存的kye 如果禁用要删除
-    cache_kye = []
+    # 被禁用的用户ID 需要删除token
+    disabled_users = []
     for user in db_users:
         if "roles" in update_fields and update_roles:
             roles = update_content.roles
@@ -197,7 +198,7 @@ async def auth_users_bulkset(
         if "user_status" in update_fields:
             user.user_status = update_content.user_status
             if update_content.user_status is False:
-                cache_kye.append(f"jwt:{user.id}")
+                disabled_users.append(user.id)
         if "user_type" in update_fields:
             user.user_type = update_content.user_type
         res_list.append(user.id)
@@ -207,16 +208,15 @@ async def auth_users_bulkset(
 
     if update_content.user_status is False:
         # redis中批量删除token
-        cache: Redis = request.app.state.cache
-        p_cache = cache.pipeline()
-        await p_cache.delete(*cache_kye)
-        await p_cache.execute()
+        await revoke_user_tokens(disabled_users)
+    if update_roles:
+        await clear_user_roles_cache()
     return response(message="更新完成", data=res_list).success()
 
 
 @router.get("/query", summary="过滤用户列表", response_model=schema.UserQueryResponse)
 async def auth_users_query(
-    session: AsyncSessionDep,
+    session: ReadSessionDep,
     username: str = Query(None),
     nickname: str = Query(None),
     phone: str = Query(None),
@@ -226,6 +226,8 @@ async def auth_users_query(
     roles: int = Query(None),
     limit: int = 10,
     page: int = 1,
+    cursor: str = Query(None, description="分页游标 传空字符串使用游标分页"),
+    count_mode: CountMode = Query("cached", description="总数查询方式"),
 ) -> Any:
     """
     过滤用户
@@ -251,7 +253,16 @@ async def auth_users_query(
     # 查询结果
     order_by = -Users.create_at
     paging_query = PagingQueryBase(
-        query, order_by, limit, page, Users, schema.UserQueryResult
+        query,
+        order_by,
+        limit,
+        page,
+        Users,
+        schema.UserQueryResult,
+        cursor,
+        count_mode,
+        # 角色ID在下方批量查询
+        options=[noload(Users.roles)],
     )
     if username or nickname:
         fitter = or_(
@@ -264,18 +275,14 @@ async def auth_users_query(
     else:
         query_data = await paging_query.query(session, select_where)
     # 过滤角色使user['roles']中只包含关联角色的id
-    result = []
+    users_roles = await load_related_ids(
+        session,
+        UsersRolesLink.auth_users_id,
+        UsersRolesLink.auth_roles_id,
+        [user.id for user in query_data.result],
+    )
     for user in query_data.result:
-        roles_id_list = (
-            await session.exec(
-                select(UsersRolesLink.auth_roles_id).where(
-                    UsersRolesLink.auth_users_id == user.id
-                )
-            )
-        ).all()
-        user.roles = roles_id_list
-        result.append(user)
-    query_data.result = result
+        user.roles = users_roles[user.id]
 
     return response(message="查询成功", data=query_data).success()
 
@@ -328,7 +335,7 @@ async def auth_users_otpreset(user_id: int, session: AsyncSessionDep) -> Any:
     重置TOTP
     """
     response = schema.ResponseBase
-    _totp = await get_redis_data("sys:settings", "security.totp")
+    _totp = get_sys_settings().security.totp
     if not _totp:
         return response(message="系统未开启MFA登录").fail()
     user = await session.get(Users, user_id)
@@ -2,7 +2,7 @@ from sqlmodel import col, or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.models.auth_model import Roles, Users
-from app.utils.password_tools import generate_password, get_password_hash
+from app.utils.password_tools import async_get_password_hash, generate_password
 
 from . import users_schema as schema
 
@@ -39,9 +39,10 @@ async def create_user(
     添加用户
     """
     roles_id_list = user_create.roles
+    password = await async_get_password_hash(user_create.password)
     db_user = Users.model_validate(
         user_create.model_dump(exclude={"roles"}),
-        update={"password": get_password_hash(user_create.password)},
+        update={"password": password},
     )
     if roles_id_list:
         db_user = update_roles_by_id(session, db_user, roles_id_list)
@@ -82,7 +83,7 @@ async def reset_password(
     """
     if password is None:
         password = generate_password(12)
-    user.sqlmodel_update({"password": get_password_hash(password)})
+    user.sqlmodel_update({"password": await async_get_password_hash(password)})
     session.add(user)
     await session.commit()
     return password
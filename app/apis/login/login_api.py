@@ -10,16 +10,23 @@ from app.depends import (
     jwt_expires_error,
     jwt_validation_error,
 )
+from app.core.cache_keys import jwt_key
 from app.core.config import settings
-from app.core.security import format_token, generate_totp, verify_totp
+from app.core.rate_limit import check_login_limit
+from app.core.security import (
+    format_token,
+    generate_totp,
+    jwt_decode,
+    verify_refresh_key,
+    verify_totp,
+)
+from app.core.token_cache import publish_token_revoked
 from app.models.auth_model import Users
 from app.utils.cache_tools import set_redis_data
 from app.utils.format_tools import ToTree
 from app.utils.password_tools import (
     aes_decrypt_password,
     aes_hash_password,
-    jwt_decode,
-    verify_password,
 )
 
 from . import login_schema as schema
@@ -73,10 +80,12 @@ async def access_token(
     # jwt签发成功写入redis
     user_jwt = format_token(user)
     await set_redis_data(
-        f"jwt:{user.id}",
+        jwt_key(user.id),
         value=user_jwt.access_token,
         ex=settings.SECRET_JWT_EXP * 60,
     )
+    # 旧token失效
+    await publish_token_revoked([user.id])
     return response(
         message="登录成功",
         data=user_jwt,
@@ -92,19 +101,19 @@ async def access_token(
     response_model_exclude_unset=True,
     summary="令牌刷新",
 )
-async def refresh_token(session: AsyncSessionDep, post: schema.RefreshToken) -> Any:
+async def refresh_token(
+    session: AsyncSessionDep, request: Request, post: schema.RefreshToken
+) -> Any:
     """
     刷新jwt
     """
+    await check_login_limit(request.scope)
     response = schema.RefreshResponse
     try:
         access_payload = jwt_decode(post.access_token, verify_exp=False)
         ref_payload = jwt_decode(post.refresh_token)
 
-        if verify_password(
-                f"{access_payload.get('user_id')}{access_payload.get('jid')}{access_payload.get('username')}",
-                ref_payload.get("refresh_key"),
-        ):
+        if await verify_refresh_key(access_payload, ref_payload.get("refresh_key")):
             user = await session.get(Users, access_payload.get("user_id"))
             if not user:
                 return response(message="用户不存在或已删除!").fail(status_code=403)
@@ -113,10 +122,11 @@ async def refresh_token(session: AsyncSessionDep, post: schema.RefreshToken) ->
             user_jwt = format_token(user)
             # jwt签发成功写入redis
             await set_redis_data(
-                f"jwt:{user.id}",
+                jwt_key(user.id),
                 value=user_jwt.access_token,
                 ex=settings.SECRET_JWT_EXP * 60,
             )
+            await publish_token_revoked([user.id])
             return response(message="刷新成功", data=user_jwt).success()
         return jwt_validation_error
     except ExpiredSignatureError:
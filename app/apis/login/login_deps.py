@@ -1,16 +1,18 @@
-from typing import Optional, Sequence
+from typing import Optional
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from pydantic import BaseModel, Field
-from sqlmodel import col, select
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.apis.auth.roles.roles_crud import get_roles_menus
 from app.core.exeption import AuthError
+from app.core.rate_limit import check_login_limit
+from app.core.sys_settings import get_sys_settings
 from app.depends import AsyncSessionDep
 from app.ext.ldap_tsk.ldap_auth import LdapAuthMixin
-from app.models.auth_model import Menus, RolesMenusLink, Users
-from app.utils.cache_tools import get_redis_data
-from app.utils.password_tools import verify_password
+from app.models.auth_model import Users
+from app.utils.password_tools import async_verify_password
 
 from . import login_schema as schema
 
@@ -48,11 +50,15 @@ def user_login_by_ldap(user: Users, password: str, ldap_conf: dict) -> None:
 
 
 async def user_login(
-        session: AsyncSessionDep, post: schema.LoginRequestForm = Depends()
+        session: AsyncSessionDep,
+        request: Request,
+        post: schema.LoginRequestForm = Depends(),
 ) -> LoginVerifyDepends:
     """
     登录验证
     """
+    # 查询用户和验证密码之前限流
+    await check_login_limit(request.scope, post.username)
     user = (
         await session.exec(select(Users).where(Users.username == post.username))
     ).one_or_none()
@@ -66,24 +72,22 @@ async def user_login(
     if not user.user_status:
         raise AuthError(message="用户已被禁用!", status_code=403)
     if user.user_type == 1:
-        if not verify_password(post.password, user.password):
+        if not await async_verify_password(post.password, user.password):
             raise AuthError(message="用户密码不正确!", status_code=400)
     # 获取系统配置
-    sys_conf = await get_redis_data("sys:settings")
-    verify_info.totp_enable = sys_conf["security"]["totp"] if sys_conf else False
+    sys_conf = get_sys_settings()
+    verify_info.totp_enable = bool(sys_conf.security.totp)
     if user.user_type == 2:
         # 获取ldap配置
-        ldap_conf = sys_conf["ldap"]["config"]
+        ldap_conf = sys_conf.ldap.config.model_dump()
         # ldap验证
         user_login_by_ldap(user=user, password=post.password, ldap_conf=ldap_conf)
     return verify_info
 
 
-async def get_user_link_menus(session: AsyncSession, user: Users) -> Sequence[Menus]:
+async def get_user_link_menus(session: AsyncSession, user: Users) -> list[dict]:
     # 平台设置的用户默认权限
-    default_roles: list[int] = await get_redis_data(
-        "sys:settings", "general.user_default_roles"
-    )
+    default_roles: list[int] = get_sys_settings().general.user_default_roles
     # 当前用户关联的所有角色ID
     roles_id =[]
     if default_roles:
@@ -92,21 +96,4 @@ async def get_user_link_menus(session: AsyncSession, user: Users) -> Sequence[Me
         if role.role_status:
             roles_id.append(role.id)
 
-    # 判断是否为超级管理员
-    if 1 in roles_id:
-        routers = (await session.exec(select(Menus))).all()
-        return routers
-    # 角色ID关联的所有菜单ID 去重
-    menus_id = (
-        await session.exec(
-            select(RolesMenusLink.auth_menus_id)
-            .distinct()
-            .where(col(RolesMenusLink.auth_roles_id).in_(roles_id))
-        )
-    ).all()
-
-    # menus_id对应的所有菜单
-    routers = (
-        await session.exec(select(Menus).where(col(Menus.id).in_(menus_id)))
-    ).all()
-    return routers
+    return await get_roles_menus(session=session, roles_id=roles_id)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Security
 
-from app.depends import check_token_dep
+from app.depends import check_permission_dep, check_token_dep
 
 from .assets import assetsRouter
 from .auth import authRouters
@@ -12,7 +12,9 @@ from .tasks import tasksRouters
 loginRouter = APIRouter()
 loginRouter.include_router(login_api.router, tags=["login"])
 
-apiRouter = APIRouter(dependencies=[Security(check_token_dep)])
+apiRouter = APIRouter(
+    dependencies=[Security(check_token_dep), Security(check_permission_dep)]
+)
 apiRouter.include_router(authRouters, prefix="/auth", tags=["auth"])
 apiRouter.include_router(assetsRouter,prefix="/assets",tags=["assets"])
 apiRouter.include_router(filesRouters, prefix="/files", tags=["files"])
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 from .settings import settings_api
 from .apicheck import check_api
+from .monitor import monitor_api
 
 systemRouter = APIRouter()
 
 systemRouter.include_router(settings_api.router, prefix="/settings")
 systemRouter.include_router(check_api.router, prefix="/apicheck")
+systemRouter.include_router(monitor_api.router, prefix="/monitor")
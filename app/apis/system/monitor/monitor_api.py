@@ -0,0 +1,94 @@
+from typing import Any
+
+from fastapi import APIRouter, Query
+
+from app.core.cache import cache_metrics, get_client_tracking, get_redis_pool_stats
+from app.core.config import settings
+from app.core.database import get_db_pool_stats
+from app.core.loop_monitor import loop_monitor
+from app.core.rate_limit import login_limit_stats
+
+from . import monitor_schema as schema
+
+router = APIRouter()
+
+
+@router.get(
+    "/redis_pool",
+    summary="Redis连接池状态",
+    response_model=schema.RedisPoolStatsResponse,
+)
+async def monitor_redis_pool() -> Any:
+    """
+    当前进程共享Redis连接池状态
+    """
+    response = schema.RedisPoolStatsResponse
+    data = schema.RedisPoolStats(**get_redis_pool_stats())
+    return response(message="查询成功", data=data).success()
+
+
+@router.get(
+    "/db_pool",
+    summary="数据库连接池状态",
+    response_model=schema.DbPoolStatsResponse,
+)
+async def monitor_db_pool() -> Any:
+    """
+    当前进程同步和异步引擎的连接池状态
+    """
+    response = schema.DbPoolStatsResponse
+    data = [schema.DbPoolStats(**stats) for stats in get_db_pool_stats()]
+    return response(message="查询成功", data=data).success()
+
+
+@router.get("/cache", summary="缓存指标", response_model=schema.CacheStatsResponse)
+async def monitor_cache() -> Any:
+    """
+    当前进程按key前缀统计的缓存指标
+    """
+    response = schema.CacheStatsResponse
+    tracking = get_client_tracking()
+    data = schema.CacheStats(
+        families=cache_metrics.stats(),
+        tracking=tracking.stats() if tracking else None,
+    )
+    return response(message="查询成功", data=data).success()
+
+
+@router.get(
+    "/login_limit",
+    summary="登录限流统计",
+    response_model=schema.LoginLimitStatsResponse,
+)
+async def monitor_login_limit() -> Any:
+    """
+    当前进程登录限流统计
+    """
+    response = schema.LoginLimitStatsResponse
+    data = schema.LoginLimitStats(
+        enable=settings.LOGIN_LIMIT_ENABLE, **login_limit_stats
+    )
+    return response(message="查询成功", data=data).success()
+
+
+@router.get(
+    "/loop",
+    summary="事件循环阻塞报告",
+    response_model=schema.LoopMonitorStatsResponse,
+)
+async def monitor_loop(
+    limit: int = Query(default=20, ge=1, le=200), reset: bool = False
+) -> Any:
+    """
+    当前进程事件循环阻塞 按路由和阻塞位置汇总 总阻塞时长最多的在前
+    """
+    response = schema.LoopMonitorStatsResponse
+    data = schema.LoopMonitorStats(
+        enable=loop_monitor.running,
+        threshold_ms=settings.LOOP_MONITOR_THRESHOLD,
+        stall_count=loop_monitor.stall_count,
+        worst=loop_monitor.report(limit),
+    )
+    if reset:
+        loop_monitor.reset()
+    return response(message="查询成功", data=data).success()
@@ -0,0 +1,161 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.base import ResponseBase
+
+
+class RedisPoolStats(BaseModel):
+    """
+    Redis连接池使用情况
+    """
+
+    mode: str = Field(description="Redis模式")
+    max_connections: int = Field(default=0, description="最大连接数")
+    created: int = Field(default=0, description="已创建连接数")
+    in_use: int = Field(default=0, description="使用中连接数")
+    idle: int = Field(default=0, description="空闲连接数")
+    waits: int = Field(default=0, description="等待空闲连接次数")
+
+
+class RedisPoolStatsResponse(ResponseBase):
+    """
+    Redis连接池使用情况响应
+    """
+
+    data: Optional[RedisPoolStats] = None
+
+
+class DbPoolStats(BaseModel):
+    """
+    数据库连接池使用情况
+    """
+
+    kind: str = Field(description="引擎类型 sync async replica:N")
+    role: str = Field(description="连接池角色")
+    pool_size: int = Field(default=0, description="连接池大小")
+    max_overflow: int = Field(default=0, description="最多溢出连接数")
+    checked_out: int = Field(default=0, description="使用中连接数")
+    checked_in: int = Field(default=0, description="空闲连接数")
+    overflow: int = Field(default=0, description="当前溢出连接数")
+    checkouts: int = Field(default=0, description="取出连接次数")
+    wait_avg_ms: float = Field(default=0, description="平均等待时间(毫秒)")
+    wait_max_ms: float = Field(default=0, description="最大等待时间(毫秒)")
+    slow_waits: int = Field(default=0, description="等待超过100毫秒的次数")
+    timeouts: int = Field(default=0, description="等待超时次数")
+    connects: int = Field(default=0, description="新建连接次数")
+    invalidations: int = Field(default=0, description="失效连接次数")
+    healthy: Optional[bool] = Field(default=None, description="从库是否可用")
+    lag: Optional[int] = Field(default=None, description="从库复制延迟(秒)")
+
+
+class DbPoolStatsResponse(ResponseBase):
+    """
+    数据库连接池使用情况响应
+    """
+
+    data: Optional[list[DbPoolStats]] = None
+
+
+class CacheFamilyStats(BaseModel):
+    """
+    按key前缀统计的缓存指标
+    """
+
+    family: str = Field(description="key前缀")
+    commands: dict[str, int] = Field(default={}, description="各命令执行次数")
+    hits: int = Field(default=0, description="命中次数")
+    misses: int = Field(default=0, description="未命中次数")
+    errors: int = Field(default=0, description="错误次数")
+    read_bytes: int = Field(default=0, description="读取数据大小")
+    write_bytes: int = Field(default=0, description="写入数据大小")
+    latency_sum: float = Field(default=0, description="命令总耗时(毫秒)")
+    latency_buckets: dict[str, int] = Field(
+        default={}, description="命令耗时分布 key为桶上限(毫秒)"
+    )
+
+
+class ClientTrackingStats(BaseModel):
+    """
+    客户端缓存使用情况
+    """
+
+    enabled: bool = Field(default=False, description="是否可用")
+    nodes: int = Field(default=0, description="订阅节点数")
+    online: int = Field(default=0, description="在线节点数")
+    keys: int = Field(default=0, description="缓存key数量")
+    hits: int = Field(default=0, description="命中次数")
+    misses: int = Field(default=0, description="未命中次数")
+    invalidations: int = Field(default=0, description="失效次数")
+    evictions: int = Field(default=0, description="淘汰次数")
+
+
+class CacheStats(BaseModel):
+    """
+    缓存指标
+    """
+
+    families: list[CacheFamilyStats] = Field(default=[], description="按key前缀统计")
+    tracking: Optional[ClientTrackingStats] = Field(
+        default=None, description="客户端缓存 未开启为空"
+    )
+
+
+class CacheStatsResponse(ResponseBase):
+    """
+    缓存指标响应
+    """
+
+    data: Optional[CacheStats] = None
+
+
+class LoopStall(BaseModel):
+    """
+    按路由和阻塞位置汇总的事件循环阻塞
+    """
+
+    route: str = Field(default="-", description="阻塞时执行的路由或任务")
+    location: str = Field(default="-", description="阻塞位置 最内层的项目代码")
+    count: int = Field(default=0, description="阻塞次数")
+    total_ms: float = Field(default=0, description="总阻塞时长(毫秒)")
+    max_ms: float = Field(default=0, description="最大阻塞时长(毫秒)")
+    last_ms: float = Field(default=0, description="最近一次阻塞时长(毫秒)")
+    stack: list[str] = Field(default=[], description="最近一次阻塞的调用栈")
+
+
+class LoopMonitorStats(BaseModel):
+    """
+    事件循环阻塞检测报告
+    """
+
+    enable: bool = Field(default=False, description="是否开启")
+    threshold_ms: int = Field(default=0, description="阻塞阈值(毫秒)")
+    stall_count: int = Field(default=0, description="阻塞总次数")
+    worst: list[LoopStall] = Field(default=[], description="按总阻塞时长排序")
+
+
+class LoopMonitorStatsResponse(ResponseBase):
+    """
+    事件循环阻塞检测报告响应
+    """
+
+    data: Optional[LoopMonitorStats] = None
+
+
+class LoginLimitStats(BaseModel):
+    """
+    登录限流统计
+    """
+
+    enable: bool = Field(default=True, description="是否开启")
+    allowed: int = Field(default=0, description="放行次数")
+    rejected: dict[str, int] = Field(default={}, description="按类型统计的拦截次数")
+    errors: int = Field(default=0, description="redis异常放行次数")
+
+
+class LoginLimitStatsResponse(ResponseBase):
+    """
+    登录限流统计响应
+    """
+
+    data: Optional[LoginLimitStats] = None
@@ -4,17 +4,21 @@ from celery.result import AsyncResult
 from fastapi import APIRouter, Depends, Request
 from sqlmodel import select
 
+from app.core.cache_keys import SYS_SETTINGS_KEY
+from app.core.sys_settings import publish_sys_settings
 from app.depends import AsyncSessionDep
 from app.ext.ldap_tsk.tasks import ldap_sync
 from app.models.tasks_model import TaskMeta
-from app.utils.cache_tools import get_redis_data, redis_exists_key, set_redis_data
+from app.utils.cache_tools import get_redis_hash
 from app.utils.datetime_tools import utc_to_local
 
 from . import settings_schema as schema
 from .settings_deps import (
     add_ldap_sync_interval_task,
     get_or_create_settings,
+    load_settings_data,
     set_settings_depends,
+    settings_response_data,
 )
 
 router = APIRouter()
@@ -26,13 +30,10 @@ async def get_settings(session: AsyncSessionDep) -> Any:
     获取系统配置
     """
     response = schema.SettingsResponse
-    cache_state = await redis_exists_key("sys:settings")
-    if not cache_state:
-        data = await get_or_create_settings(session=session)
-        await set_redis_data("sys:settings", value=data.model_dump())
-    else:
-        data = await get_redis_data("sys:settings")
-    return response(message="查询成功", data=data).success()
+    data = await get_redis_hash(SYS_SETTINGS_KEY)
+    if not data:
+        data = await load_settings_data(session=session)
+    return response(message="查询成功", data=settings_response_data(data)).success()
 
 
 @router.patch("/set", summary="更新系统配置", response_model=schema.SettingsResponse)
@@ -53,14 +54,15 @@ async def set_settings(
     session.add(settings)
     await session.commit()
     await session.refresh(settings)
-    await set_redis_data(
-        "sys:settings",
-        value=settings.model_dump(exclude={"ansible_model_list", "system_path"}),
+    # 只写入变更的分区并通知所有进程刷新配置快照
+    await publish_sys_settings(
+        settings.model_dump(include={*update_content.keys(), "update_at"})
     )
+    await load_settings_data.invalidate()
     if "ldap" in update_content:
         # 更新ldap定时同步
         await add_ldap_sync_interval_task(session=session, username=req.state.username)
-    return response(message="更新成功", data=settings).success()
+    return response(message="更新成功", data=settings_response_data(settings)).success()
 
 
 @router.post("/syncldap", summary="ldap触发同步", response_model=schema.ResponseBase)
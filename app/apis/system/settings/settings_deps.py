@@ -1,17 +1,32 @@
+from copy import deepcopy
+
 from fastapi import HTTPException
 from loguru import logger
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.ext.ldap_tsk.utils import get_ldap_sync_conf
+from app.core.cache_keys import SYS_SETTINGS_DB_KEY
+from app.core.sys_settings import (
+    SYS_SETTINGS_COMPUTED,
+    get_sys_settings,
+    publish_sys_settings,
+)
 from app.ext.sqlmodel_celery_beat.models import (
     IntervalPeriod,
     IntervalSchedule,
     PeriodicTask,
 )
 from app.models.system_model import SettingsBase, SystemSettings
+from app.utils.cache_tools import cached
 from app.utils.ipaddress_tools import check_ip_list
-from app.utils.password_tools import aes_hash_password, is_decrypt
+from app.utils.password_tools import encrypt_secret, is_decrypt, strip_secret_marker
+
+# 返回给客户端时需要去除版本标记的密钥字段 (分区, 字段路径)
+SETTINGS_SECRET_FIELDS = (
+    ("general", ("user_default_password",)),
+    ("ldap", ("config", "password")),
+    ("channels", ("email", "mail_password")),
+)
 
 
 async def get_or_create_settings(session: AsyncSession) -> SystemSettings:
@@ -32,6 +47,31 @@ async def get_or_create_settings(session: AsyncSession) -> SystemSettings:
     return settings
 
 
+@cached(key=SYS_SETTINGS_DB_KEY, ttl=60)
+async def load_settings_data(session: AsyncSession) -> SystemSettings:
+    """
+    redis中不存在系统配置时从数据库加载并发布
+    并发请求只有一个查询数据库
+    """
+    settings = await get_or_create_settings(session=session)
+    await publish_sys_settings(settings.model_dump(exclude=SYS_SETTINGS_COMPUTED))
+    return settings
+
+
+def settings_response_data(data: SystemSettings | dict) -> dict:
+    """
+    返回给客户端的系统配置 密钥去除版本标记 保持客户端解密的密文格式不变
+    """
+    data = data.model_dump() if isinstance(data, SystemSettings) else deepcopy(data)
+    for section, path in SETTINGS_SECRET_FIELDS:
+        parent = data.get(section)
+        for field in path[:-1]:
+            parent = parent.get(field) if isinstance(parent, dict) else None
+        if isinstance(parent, dict) and path[-1] in parent:
+            parent[path[-1]] = strip_secret_marker(parent[path[-1]])
+    return data
+
+
 async def set_settings_depends(update_content: SettingsBase) -> dict:
     """
     更新系统配置
@@ -57,7 +97,7 @@ async def set_settings_depends(update_content: SettingsBase) -> dict:
             general.get("user_default_password") if general else None
         )
         if user_default_password is not None and not is_decrypt(user_default_password):
-            update_dict["general"]["user_default_password"] = aes_hash_password(
+            update_dict["general"]["user_default_password"] = encrypt_secret(
                 user_default_password
             )
     # ldap配置中的密码加密
@@ -66,14 +106,14 @@ async def set_settings_depends(update_content: SettingsBase) -> dict:
         ldap_config = ldap.get("config") if ldap else None
         ldap_password = ldap_config.get("password") if ldap_config else None
         if ldap_password is not None and not is_decrypt(ldap_password):
-            update_dict["ldap"]["config"]["password"] = aes_hash_password(ldap_password)
+            update_dict["ldap"]["config"]["password"] = encrypt_secret(ldap_password)
     # channels配置中的密码加密
     if "channels" in update_dict:
         channels = update_dict.get("channels")
         mail_config = channels.get("email") if channels else None
         mail_password = mail_config.get("mail_password") if mail_config else None
         if mail_password is not None and not is_decrypt(mail_password):
-            update_dict["channels"]["email"]["MAIL_PASSWORD"] = aes_hash_password(
+            update_dict["channels"]["email"]["MAIL_PASSWORD"] = encrypt_secret(
                 mail_password
             )
     return update_dict
@@ -83,7 +123,7 @@ async def add_ldap_sync_interval_task(session: AsyncSession, username: str = "ad
     """
     添加ldap定时同步任务
     """
-    sync_config = get_ldap_sync_conf()
+    sync_config = get_sys_settings().ldap.sync
     task = (
         await session.exec(
             select(PeriodicTask).where(PeriodicTask.task == "tasks.ldap_sync")
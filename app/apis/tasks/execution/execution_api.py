@@ -9,9 +9,10 @@ import aiofiles
 from fastapi import APIRouter, Query, Request
 from sqlmodel import col, select
 
-from app.core.base import PagingQueryBase, ResponseBase
+from app.core.base import CountMode, PagingQueryBase, ResponseBase
+from app.core.cache_keys import tasks_record_key
 from app.core.config import base_path
-from app.depends import AsyncSessionDep, SessionDep
+from app.depends import AsyncSessionDep, ReadSessionDep, SessionDep
 from app.ext.ansible_tsk.runner import (
     RunConf,
     TasksRunConfig,
@@ -21,7 +22,7 @@ from app.ext.ansible_tsk.runner import (
 from app.ext.ansible_tsk.tasks import asb_temp_task
 from app.models.tasks_model import TasksHistory
 from app.tasks import celery
-from app.utils.cache_tools import get_redis_data, set_redis_data
+from app.utils.cache_tools import get_redis_model, set_redis_model
 from app.utils.files_tools import remove_dir
 
 from . import execution_schema as schemas
@@ -37,10 +38,8 @@ async def tasks_history_get(session: AsyncSessionDep, tid: str) -> Any:
     查询任务历史
     """
     response = schemas.GetHistoryResponse
-    task_record = await get_redis_data(f"tasks:record:{tid}")
-    if task_record:
-        task_record = TasksHistory.model_validate(task_record)
-    else:
+    task_record = await get_redis_model(tasks_record_key(tid), TasksHistory)
+    if not task_record:
         task_record = (
             await session.exec(select(TasksHistory).where(TasksHistory.task_id == tid))
         ).one_or_none()
@@ -65,9 +64,7 @@ async def tasks_exec_run(
     task_record = create_task_record(
         session=session, username=req.state.username, run_conf=run_conf
     )
-    await set_redis_data(
-        f"tasks:record:{task_record.task_id}", task_record.model_dump()
-    )
+    await set_redis_model(tasks_record_key(task_record.task_id), task_record)
     asb_temp_task.apply_async(
         task_id=run_conf.ident,
         kwargs=run_conf.model_dump(),
@@ -139,7 +136,7 @@ async def tasks_exec_del(
     "/query", summary="过滤任务历史", response_model=schemas.TasksHistoryQueryResponse
 )
 async def tasks_history_query(
-    session: AsyncSessionDep,
+    session: ReadSessionDep,
     task_name: str = Query(None),
     task_status: str = Query(None),
     task_type: str = Query(None),
@@ -147,6 +144,8 @@ async def tasks_history_query(
     task_scheduled_name: str = Query(None),
     limit: int = 10,
     page: int = 1,
+    cursor: str = Query(None, description="分页游标 传空字符串使用游标分页"),
+    count_mode: CountMode = Query("window", description="总数查询方式"),
 ) -> Any:
     """
     过滤任务历史
@@ -166,7 +165,14 @@ async def tasks_history_query(
         query.setdefault("task_scheduled_name", task_scheduled_name)
     order_by = -TasksHistory.task_start_time
     paging_query = PagingQueryBase(
-        query, order_by, limit, page, TasksHistory, schemas.TasksHistoryQueryResult
+        query,
+        order_by,
+        limit,
+        page,
+        TasksHistory,
+        schemas.TasksHistoryQueryResult,
+        cursor,
+        count_mode,
     )
     if task_name:
         fitter = col(TasksHistory.task_name).like(f"%{task_name}%")
@@ -199,7 +205,7 @@ async def get_task_stdout(task_id: str = Query(), private_dir: str = Query()) ->
     summary="任务历史统计",
     response_model=schemas.HistoryStatisticsResponse,
 )
-async def task_history_statistics(session: AsyncSessionDep, periodic: int):
+async def task_history_statistics(session: ReadSessionDep, periodic: int):
     base_periodic = 60 * 60 * 24 * periodic
     time_now = int(time.time())
     time_start = time_now - base_periodic
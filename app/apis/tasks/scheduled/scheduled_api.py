@@ -3,8 +3,8 @@ from typing import Any
 from fastapi import APIRouter, Query, Request
 from sqlmodel import col, select
 
-from app.core.base import PagingQueryBase
-from app.depends import AsyncSessionDep
+from app.core.base import CountMode, PagingQueryBase
+from app.depends import AsyncSessionDep, ReadSessionDep
 from app.ext.sqlmodel_celery_beat.models import PeriodicTask
 
 from . import scheduled_crud as crud
@@ -101,7 +101,7 @@ async def task_scheduled_sys_set(
     "/query", summary="过滤定时任务", response_model=schemas.ScheduledQueryResponse
 )
 async def tasks_scheduled_query(
-    session: AsyncSessionDep,
+    session: ReadSessionDep,
     name: str = Query(None),
     types: str = Query("interval"),
     task_type: str = Query(None),
@@ -109,6 +109,8 @@ async def tasks_scheduled_query(
     one_off: bool = Query(None),
     limit: int = 10,
     page: int = 1,
+    cursor: str = Query(None, description="分页游标 传空字符串使用游标分页"),
+    count_mode: CountMode = Query("cached", description="总数查询方式"),
 ) -> Any:
     response = schemas.ScheduledQueryResponse
     # 序列化查询参数
@@ -123,7 +125,14 @@ async def tasks_scheduled_query(
         query.setdefault("one_off", one_off)
     order_by = -PeriodicTask.create_at
     paging_query = PagingQueryBase(
-        query, order_by, limit, page, PeriodicTask, schemas.ScheduledQueryResult
+        query,
+        order_by,
+        limit,
+        page,
+        PeriodicTask,
+        schemas.ScheduledQueryResult,
+        cursor,
+        count_mode,
     )
     if name:
         fitter = col(PeriodicTask.name).like(f"%{name}%")
@@ -7,7 +7,7 @@ from sqlmodel import col, select
 
 from app.core.base import PagingQueryBase
 from app.core.config import base_path
-from app.depends import AsyncSessionDep
+from app.depends import AsyncSessionDep, ReadSessionDep
 from app.models.tasks_model import TaskTemplates
 from app.utils.files_tools import remove_dir
 
@@ -58,7 +58,7 @@ async def tasks_add_template(
     "/query", summary="过滤任务模版", response_model=schema.TemplateQueryResponse
 )
 async def tasks_template_query(
-    session: AsyncSessionDep,
+    session: ReadSessionDep,
     name: str = Query(None),
     task_type: str = Query(None),
     is_all: bool = False,
@@ -1,11 +1,14 @@
+import base64
+import json
 import math
 import time
-from typing import Any, Mapping, Optional, Type, TypeVar
+from typing import Any, Literal, Mapping, Optional, Type, TypeVar
 
 from fastapi import BackgroundTasks, HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.sql import operators
 from sqlmodel import BIGINT, Field, SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette.responses import JSONResponse
@@ -94,15 +97,29 @@ class PagingQueryBaseModel(BaseModel):
     page_total: Optional[int] = None
     page: Optional[int] = None
     limit: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    has_more: Optional[bool] = None
 
 
 QueryModelT = TypeVar("QueryModelT", bound=BaseModel)
 ResultModelT = TypeVar("ResultModelT", bound=BaseModel)
+# 总数查询方式
+# exact: 单独执行count查询
+# window: 使用COUNT(*) OVER()与数据一次查询
+# cached: 缓存count结果 涉及的表提交修改后失效
+# estimate: 无过滤条件时使用表统计信息的估算行数 有过滤条件时同cached
+# none: 不查询总数 只返回has_more
+CountMode = Literal["exact", "window", "cached", "estimate", "none"]
 
 
 class PagingQueryBase:
     """
     分页查询基础模型
+    cursor不为None时使用游标分页 按(排序字段, id)定位 不查询总数
+    空字符串表示第一页 之后使用结果中的next_cursor或prev_cursor
+    count_mode为页码分页时总数的查询方式 见CountMode
+    options为查询选项 如noload(Users.roles)避免加载关联数据
     """
 
     def __init__(
@@ -113,6 +130,9 @@ class PagingQueryBase:
         page: int,
         query_model: Type[QueryModelT],
         result_model: Type[ResultModelT],
+        cursor: Optional[str] = None,
+        count_mode: CountMode = "exact",
+        options: Optional[list[Any]] = None,
     ):
         self.query_kwargs = query_kwargs
         self.order_by = order_by
@@ -120,20 +140,168 @@ class PagingQueryBase:
         self.page = page
         self.query_model = query_model
         self.result_model = result_model
-        self.stmt = select(query_model)
+        self.cursor = cursor
+        self.count_mode = count_mode
+        self.options = options or []
+        self.stmt = select(query_model).options(*self.options)
         self.total_stmt = select(func.count()).select_from(query_model)
 
+    def _sort_key(self) -> tuple[Any, bool]:
+        """
+        排序字段和是否倒序
+        """
+        order_by = self.order_by
+        # -column 与 column.desc() 都视为倒序
+        if getattr(order_by, "operator", None) is operators.neg:
+            return order_by.element, True
+        if getattr(order_by, "modifier", None) is operators.desc_op:
+            return order_by.element, True
+        if getattr(order_by, "modifier", None) is operators.asc_op:
+            return order_by.element, False
+        return order_by, False
+
+    @staticmethod
+    def encode_cursor(value: Any, row_id: Any, direction: str) -> str:
+        data = json.dumps([value, row_id, direction], separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[Any, Any, str]:
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            value, row_id, direction = json.loads(data)
+            if direction not in ("next", "prev"):
+                raise ValueError(direction)
+            # 游标值只能是json标量 列表或字典无法作为查询参数
+            if not isinstance(value, (str, int, float, type(None))):
+                raise ValueError(value)
+            if not isinstance(row_id, (str, int)):
+                raise ValueError(row_id)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail="分页游标无效!") from e
+        return value, row_id, direction
+
+    def _seek(self, key: Any, value: Any, row_id: Any, less: bool) -> Any:
+        """
+        (排序字段, id)小于或大于游标位置的条件 MySQL中NULL小于任何值
+        """
+        id_column = self.query_model.id
+        if value is None:
+            if less:
+                return and_(key.is_(None), id_column < row_id)
+            return or_(key.is_not(None), and_(key.is_(None), id_column > row_id))
+        if less:
+            seek = tuple_(key, id_column) < tuple_(value, row_id)
+            if getattr(key, "nullable", True):
+                seek = or_(seek, key.is_(None))
+            return seek
+        return tuple_(key, id_column) > tuple_(value, row_id)
+
+    async def get_keyset_result(
+        self, session: AsyncSession, stmt: Any
+    ) -> PagingQueryBaseModel:
+        key, desc = self._sort_key()
+        id_column = self.query_model.id
+        direction = "next"
+        if self.cursor:
+            value, row_id, direction = self.decode_cursor(self.cursor)
+            # 向后翻页时取倒序方向的数据
+            less = desc if direction == "next" else not desc
+            stmt = stmt.where(self._seek(key, value, row_id, less))
+        reverse = desc if direction == "next" else not desc
+        if reverse:
+            stmt = stmt.order_by(key.desc(), id_column.desc())
+        else:
+            stmt = stmt.order_by(key.asc(), id_column.asc())
+        # 多取一条判断是否还有数据
+        query_data = list((await session.exec(stmt.limit(self.limit + 1))).all())
+        has_more = len(query_data) > self.limit
+        query_data = query_data[: self.limit]
+        if direction == "prev":
+            query_data.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, bool(self.cursor)
+        next_cursor = prev_cursor = None
+        if query_data:
+            first, last = query_data[0], query_data[-1]
+            if has_next:
+                next_cursor = self.encode_cursor(
+                    getattr(last, key.key), last.id, "next"
+                )
+            if has_prev:
+                prev_cursor = self.encode_cursor(
+                    getattr(first, key.key), first.id, "prev"
+                )
+        return self.result_model(
+            result=query_data,
+            limit=self.limit,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            has_more=has_next,
+        )
+
+    async def get_total(
+        self, session: AsyncSession, stmt: Any, total_stmt: Any
+    ) -> tuple[int, bool]:
+        """
+        按count_mode查询总数 返回(总数, 是否为估算值)
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from app.core.database import cached_count, estimated_count
+
+        if self.count_mode == "estimate" and stmt.whereclause is None:
+            total = await estimated_count(session, self.query_model.__tablename__)
+            if total is not None:
+                return total, True
+        if self.count_mode in ("cached", "estimate"):
+            return await cached_count(session, total_stmt), False
+        return int((await session.exec(total_stmt)).one()), False
+
+    async def get_result_without_total(
+        self, session: AsyncSession, stmt: Any
+    ) -> PagingQueryBaseModel:
+        # 多取一条判断是否还有数据
+        query_data = list((await session.exec(stmt.limit(self.limit + 1))).all())
+        has_more = len(query_data) > self.limit
+        return self.result_model(
+            result=query_data[: self.limit],
+            page=self.page,
+            limit=self.limit,
+            has_more=has_more,
+        )
+
     async def get_result(
         self, session: AsyncSession, stmt: Any, total_stmt: Any
     ) -> PagingQueryBaseModel:
-        query_data = (
-            await session.exec(
-                stmt.limit(self.limit)
-                .offset(self.limit * (self.page - 1))
-                .order_by(self.order_by)
+        if self.cursor is not None:
+            return await self.get_keyset_result(session, stmt)
+        offset = self.limit * (self.page - 1)
+        page_stmt = stmt.offset(offset).order_by(self.order_by)
+        if self.count_mode == "none":
+            return await self.get_result_without_total(session, page_stmt)
+        estimated = False
+        if self.count_mode == "window":
+            # 多列查询返回(数据, 总数)的行 沿用原语句的过滤条件和options
+            window_stmt = select(self.query_model, func.count().over()).options(
+                *self.options
             )
-        ).all()
-        query_total = (await session.exec(total_stmt)).one()
+            if stmt.whereclause is not None:
+                window_stmt = window_stmt.where(stmt.whereclause)
+            window_stmt = window_stmt.offset(offset).order_by(self.order_by)
+            rows = (await session.exec(window_stmt.limit(self.limit))).all()
+            query_data = [row[0] for row in rows]
+            if rows:
+                query_total = rows[0][1]
+            else:
+                # 超出范围时窗口函数没有结果 查询总数判断页数
+                query_total = int((await session.exec(total_stmt)).one())
+        else:
+            query_data = (await session.exec(page_stmt.limit(self.limit))).all()
+            query_total, estimated = await self.get_total(session, stmt, total_stmt)
+            if estimated:
+                # 估算值可能偏小
+                query_total = max(query_total, offset + len(query_data))
         if not query_total:
             return self.result_model(
                 result=[],
@@ -144,7 +312,7 @@ class PagingQueryBase:
             )
         # 分页总数
         page_total = math.ceil(int(query_total) / self.limit)
-        if self.page > page_total:
+        if self.page > page_total and not estimated:
             raise HTTPException(status_code=400, detail="输入页数大于分页总数!")
         result = self.result_model(
             result=query_data,
@@ -152,13 +320,16 @@ class PagingQueryBase:
             page_total=page_total,
             page=self.page,
             limit=self.limit,
+            has_more=self.page < page_total,
         )
         return result
 
     async def query(self, session: AsyncSession, select_where: Optional[Any] = None):
         # 查询结果
-        stmt = self.stmt.filter_by(**self.query_kwargs)
-        total_stmt = self.total_stmt.filter_by(**self.query_kwargs)
+        # 参数排序 相同过滤条件生成相同的语句
+        query_kwargs = dict(sorted(self.query_kwargs.items()))
+        stmt = self.stmt.filter_by(**query_kwargs)
+        total_stmt = self.total_stmt.filter_by(**query_kwargs)
         if select_where is not None:
             stmt = stmt.where(select_where)
             total_stmt = total_stmt.where(select_where)
@@ -171,6 +342,7 @@ class PagingQueryBase:
         stmt = self.stmt
         total_stmt = self.total_stmt
         if filter_by is not None:
+            filter_by = dict(sorted(filter_by.items()))
             stmt = stmt.filter_by(**filter_by)
             total_stmt = total_stmt.filter_by(**filter_by)
         stmt = stmt.filter(filters)
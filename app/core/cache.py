@@ -1,11 +1,26 @@
-from collections.abc import AsyncGenerator, Generator
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from typing import Any
 
 from fastapi import FastAPI
-from redis import Redis, RedisCluster, Sentinel
+from loguru import logger
+from redis import BlockingConnectionPool, Redis, RedisCluster, Sentinel, SSLConnection
 from redis import asyncio as aioredis
 from redis.asyncio.cluster import ClusterNode as AioClusterNode
+from redis.cluster import PRIMARY
 from redis.cluster import ClusterNode
 
+from app.core.cache_keys import (
+    ASSETS_FIELDS_KEY,
+    JWT_PREFIX,
+    ROLES_LIST_KEY,
+    ROLES_MENUS_PREFIX,
+    SYS_SETTINGS_TAG,
+    TASKS_RECORD_PREFIX,
+)
 from app.core.config import settings
 
 
@@ -23,9 +38,14 @@ class RedisConfig:
     encoding = settings.REDIS_ENCODING
     decode_responses = True
     max_connections = settings.REDIS_MAX_CONNECTIONS
+    pool_timeout = settings.REDIS_POOL_TIMEOUT
     ssl = settings.REDIS_SSL
     ssl_cert_reqs = settings.REDIS_SSL_CERT_REQS
     ssl_ca_certs = settings.REDIS_SSL_CA_CERTS
+    client_tracking = settings.REDIS_CLIENT_TRACKING
+    tracking_prefixes = settings.REDIS_TRACKING_PREFIXES
+    tracking_max_keys = settings.REDIS_TRACKING_MAX_KEYS
+    tracking_ttl = settings.REDIS_TRACKING_TTL
 
     def get_sentinel_list(self) -> list[str]:
         """
@@ -66,7 +86,14 @@ class RedisMixin(RedisConfig):
         单机
         :return:
         """
-        return Redis(
+        pool_kwargs = {}
+        if self.ssl:
+            pool_kwargs = {
+                "connection_class": SSLConnection,
+                "ssl_cert_reqs": self.ssl_cert_reqs,
+                "ssl_ca_certs": self.ssl_ca_certs,
+            }
+        pool = BlockingConnectionPool(
             host=self.host.split(":")[0],
             port=int(self.host.split(":")[-1]),
             username=self.username,
@@ -74,18 +101,18 @@ class RedisMixin(RedisConfig):
             db=self.db,
             decode_responses=self.decode_responses,
             max_connections=self.max_connections,
-            ssl=self.ssl,
-            ssl_cert_reqs=self.ssl_cert_reqs,
-            ssl_ca_certs=self.ssl_ca_certs,
+            timeout=self.pool_timeout,
+            **pool_kwargs,
         )
+        return Redis(connection_pool=pool)
 
     @property
-    def redis_sentinel_conn(self) -> Sentinel:
+    def redis_sentinel_conn(self) -> Redis:
         """
         哨兵
         :return:
         """
-        return Sentinel(
+        sentinel = Sentinel(
             sentinels=self.get_sentinel_list(),
             username=self.username,
             password=self.password,
@@ -96,9 +123,10 @@ class RedisMixin(RedisConfig):
             ssl_cert_reqs=self.ssl_cert_reqs,
             ssl_ca_certs=self.ssl_ca_certs,
         )
+        return sentinel.master_for(self.sentinel_name)
 
     @property
-    def redis_cluster_conn(self) -> aioredis.RedisCluster:
+    def redis_cluster_conn(self) -> RedisCluster:
         """
         集群
         :return:
@@ -109,6 +137,7 @@ class RedisMixin(RedisConfig):
             username=self.username,
             password=self.password,
             decode_responses=self.decode_responses,
+            max_connections=self.max_connections,
             ssl=self.ssl,
             ssl_cert_reqs=self.ssl_cert_reqs,
             ssl_ca_certs=self.ssl_ca_certs,
@@ -135,6 +164,22 @@ class RedisMixin(RedisConfig):
         return redis_conn
 
 
+class StatsBlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """
+    带统计的阻塞连接池
+    连接耗尽时等待空闲连接而不是直接报错，并记录等待次数
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+
+    async def get_connection(self, command_name, *keys, **options):
+        if not self.can_get_connection():
+            self.waits += 1
+        return await super().get_connection(command_name, *keys, **options)
+
+
 class AsyncRedisMixin(RedisConfig):
     """
     AsyncRedis 连接
@@ -146,7 +191,14 @@ class AsyncRedisMixin(RedisConfig):
         单机
         :return:
         """
-        return aioredis.Redis(
+        pool_kwargs = {}
+        if self.ssl:
+            pool_kwargs = {
+                "connection_class": aioredis.SSLConnection,
+                "ssl_cert_reqs": self.ssl_cert_reqs,
+                "ssl_ca_certs": self.ssl_ca_certs,
+            }
+        pool = StatsBlockingConnectionPool(
             host=self.host.split(":")[0],
             port=int(self.host.split(":")[-1]),
             username=self.username,
@@ -154,18 +206,18 @@ class AsyncRedisMixin(RedisConfig):
             db=self.db,
             decode_responses=self.decode_responses,
             max_connections=self.max_connections,
-            ssl=self.ssl,
-            ssl_cert_reqs=self.ssl_cert_reqs,
-            ssl_ca_certs=self.ssl_ca_certs,
+            timeout=self.pool_timeout,
+            **pool_kwargs,
         )
+        return aioredis.Redis(connection_pool=pool)
 
     @property
-    async def redis_sentinel_conn(self) -> aioredis.Sentinel:
+    async def redis_sentinel_conn(self) -> aioredis.Redis:
         """
         哨兵
         :return:
         """
-        return aioredis.Sentinel(
+        sentinel = aioredis.Sentinel(
             sentinels=self.get_sentinel_list(),
             username=self.username,
             password=self.password,
@@ -176,6 +228,7 @@ class AsyncRedisMixin(RedisConfig):
             ssl_cert_reqs=self.ssl_cert_reqs,
             ssl_ca_certs=self.ssl_ca_certs,
         )
+        return sentinel.master_for(self.sentinel_name)
 
     @property
     async def redis_cluster_conn(self) -> aioredis.RedisCluster:
@@ -188,11 +241,75 @@ class AsyncRedisMixin(RedisConfig):
             username=self.username,
             password=self.password,
             decode_responses=self.decode_responses,
+            max_connections=self.max_connections,
             ssl=self.ssl,
             ssl_cert_reqs=self.ssl_cert_reqs,
             ssl_ca_certs=self.ssl_ca_certs,
         )
 
+    async def redis_node_conn(self, host: str, port: int) -> aioredis.Redis:
+        """
+        集群中的单个节点 asyncio集群客户端不支持pubsub时使用
+        :return:
+        """
+        return aioredis.Redis(
+            host=host,
+            port=int(port),
+            username=self.username,
+            password=self.password,
+            decode_responses=self.decode_responses,
+            ssl=self.ssl,
+            ssl_cert_reqs=self.ssl_cert_reqs,
+            ssl_ca_certs=self.ssl_ca_certs,
+        )
+
+    async def tracking_nodes(
+        self, cache: aioredis.Redis | aioredis.RedisCluster
+    ) -> list[tuple[str, int]]:
+        """
+        客户端缓存需要订阅失效通知的节点
+        单机为配置的地址 哨兵为当前主节点 集群为所有主节点
+        """
+        if self.mode == "standalone":
+            return [(self.host.split(":")[0], int(self.host.split(":")[-1]))]
+        if self.mode == "sentinel":
+            sentinel = aioredis.Sentinel(
+                sentinels=self.get_sentinel_list(),
+                username=self.username,
+                password=self.password,
+                ssl=self.ssl,
+                ssl_cert_reqs=self.ssl_cert_reqs,
+                ssl_ca_certs=self.ssl_ca_certs,
+            )
+            return [await sentinel.discover_master(self.sentinel_name)]
+        return [
+            (node.host, int(node.port))
+            for node in cache.get_nodes()
+            if node.server_type == PRIMARY
+        ]
+
+    def tracking_connection(self, host: str, port: int) -> aioredis.Connection:
+        """
+        接收失效通知的连接 RESP2下通过REDIRECT转发到自身的__redis__:invalidate频道
+        """
+        conn_kwargs = {}
+        conn_class = aioredis.Connection
+        if self.ssl:
+            conn_class = aioredis.SSLConnection
+            conn_kwargs = {
+                "ssl_cert_reqs": self.ssl_cert_reqs,
+                "ssl_ca_certs": self.ssl_ca_certs,
+            }
+        return conn_class(
+            host=host,
+            port=int(port),
+            username=self.username,
+            password=self.password,
+            decode_responses=self.decode_responses,
+            socket_keepalive=True,
+            **conn_kwargs,
+        )
+
     @property
     async def connect_redis(self):
         """
@@ -214,38 +331,531 @@ class AsyncRedisMixin(RedisConfig):
         return redis_conn
 
 
+# 进程内共享的aioRedis客户端 在register_redis中创建 stopping时关闭
+_async_cache: aioredis.Redis | aioredis.RedisCluster | None = None
+_async_cache_lock = asyncio.Lock()
+
+
+async def get_async_cache() -> aioredis.Redis | aioredis.RedisCluster:
+    """
+    获取进程内共享的aioRedis客户端 未初始化时创建
+    """
+    global _async_cache  # pylint: disable=global-statement
+    if _async_cache is None:
+        async with _async_cache_lock:
+            if _async_cache is None:
+                _async_cache = await AsyncRedisMixin().connect_redis
+    return _async_cache
+
+
+async def get_async_pubsub_redis() -> aioredis.Redis:
+    """
+    获取用于pubsub的aioRedis客户端
+    集群模式PUBLISH会广播到所有节点 订阅任意一个节点即可
+    """
+    cache = await get_async_cache()
+    if isinstance(cache, aioredis.RedisCluster):
+        node = cache.get_default_node()
+        return await AsyncRedisMixin().redis_node_conn(node.host, node.port)
+    return cache
+
+
+# 集群模式下发布通知使用的节点客户端 进程内共享
+_publish_node: aioredis.Redis | None = None
+
+
+async def publish_message(channel: str, message: Any) -> int:
+    """
+    发布通知 集群客户端没有publish 通过订阅使用的节点发布
+    集群模式PUBLISH会广播到所有节点
+    """
+    global _publish_node  # pylint: disable=global-statement
+    cache = await get_async_cache()
+    if not isinstance(cache, aioredis.RedisCluster):
+        return await cache.publish(channel, message)
+    if _publish_node is None:
+        node = await get_async_pubsub_redis()
+        if _publish_node is None:
+            _publish_node = node
+        else:
+            await node.aclose()
+    return await _publish_node.publish(channel, message)
+
+
+# RESP2下失效通知的频道
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+class ClientTracking:
+    """
+    基于客户端缓存(CLIENT TRACKING)的进程内LRU
+    每个节点一条连接以BCAST模式订阅前缀 服务端在key变更或过期时推送失效通知
+    通知连接断开期间不使用本地缓存 重连后清空全部数据
+    本进程写入的key在写入后立即清除 不等待失效通知
+    """
+
+    def __init__(self, prefixes: list[str], max_keys: int, ttl: int):
+        self.prefixes = tuple(prefixes)
+        self.max_keys = max_keys
+        self.ttl = ttl
+        # {key: {variant: (过期时间, 数据)}}
+        self._data: OrderedDict[str, dict[Any, tuple[float, Any]]] = OrderedDict()
+        # 每次失效自增 读取期间发生失效则不写入本地缓存
+        self._epoch = 0
+        self._nodes: list[tuple[str, int]] = []
+        self._online: set[tuple[str, int]] = set()
+        self._tasks: list[asyncio.Task] = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        所有节点的失效通知连接均正常
+        """
+        return bool(self._nodes) and len(self._online) == len(self._nodes)
+
+    def tracks(self, key: str) -> bool:
+        return self.enabled and key.startswith(self.prefixes)
+
+    async def fetch(
+        self, key: str, variant: Any, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        读取key 本地未命中时调用load从redis读取
+        variant : 同一个key不同的读取方式 例如 get/hgetall/hmget字段
+        """
+        if not self.tracks(key):
+            return await load()
+        entry = self._data.get(key, {}).get(variant)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        epoch = self._epoch
+        value = await load()
+        if epoch == self._epoch and self.enabled:
+            self._data.setdefault(key, {})[variant] = (
+                time.monotonic() + self.ttl,
+                value,
+            )
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, keys: list[str] | None) -> None:
+        """
+        keys为None时清空全部 例如FLUSHDB或连接断开
+        """
+        self._epoch += 1
+        if keys is None:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            return
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    async def _listen(self, host: str, port: int) -> None:
+        """
+        订阅单个节点的失效通知 断开后重连
+        """
+        node = (host, port)
+        while True:
+            conn = AsyncRedisMixin().tracking_connection(host, port)
+            try:
+                await conn.connect()
+                await conn.send_command("CLIENT", "ID")
+                client_id = await conn.read_response()
+                # 失效通知转发到本连接 订阅后本连接只接收消息
+                args = ["CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST"]
+                for prefix in self.prefixes:
+                    args.extend(["PREFIX", prefix])
+                await conn.send_command(*args)
+                await conn.read_response()
+                await conn.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+                await conn.read_response()
+                self.invalidate(None)
+                self._online.add(node)
+                while True:
+                    message = await conn.read_response()
+                    if isinstance(message, list) and message[0] == "message":
+                        # 消息内容为失效的key列表 FLUSHDB时为None
+                        self.invalidate(message[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Redis Client Tracking Error {host}:{port} - {e}")
+            finally:
+                self._online.discard(node)
+                self.invalidate(None)
+                await conn.disconnect()
+            await asyncio.sleep(5)
+
+    async def start(self, cache: aioredis.Redis | aioredis.RedisCluster) -> None:
+        self._nodes = await AsyncRedisMixin().tracking_nodes(cache)
+        self._tasks = [
+            asyncio.create_task(self._listen(host, port)) for host, port in self._nodes
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._nodes = []
+        self.invalidate(None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "nodes": len(self._nodes),
+            "online": len(self._online),
+            "keys": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+# 客户端缓存 未开启REDIS_CLIENT_TRACKING时为None
+_tracking: ClientTracking | None = None
+
+
+def get_client_tracking() -> ClientTracking | None:
+    """
+    获取进程内的客户端缓存
+    """
+    return _tracking
+
+
+def evict_client_tracking(keys: list[str]) -> None:
+    """
+    本进程写入或删除key后清除本地缓存 失效通知在另一条连接上 可能晚于后续读取
+    """
+    if _tracking is not None and keys:
+        _tracking.invalidate(keys)
+
+
 async def register_redis(app: FastAPI) -> None:
     """
-    注册redis测试连接
+    注册redis测试连接 开启客户端缓存时订阅失效通知
     """
-    app.state.cache = await AsyncRedisMixin().connect_redis
+    global _tracking  # pylint: disable=global-statement
+    app.state.cache = await get_async_cache()
+    if RedisConfig.client_tracking and _tracking is None:
+        _tracking = ClientTracking(
+            prefixes=RedisConfig.tracking_prefixes,
+            max_keys=RedisConfig.tracking_max_keys,
+            ttl=RedisConfig.tracking_ttl,
+        )
+        await _tracking.start(app.state.cache)
 
 
-def get_redis() -> Generator[Redis, None, None]:
+async def close_redis(app: FastAPI) -> None:
+    """
+    关闭共享的aioRedis客户端及连接池
+    """
+    global _async_cache, _tracking, _publish_node  # pylint: disable=global-statement
+    if _tracking is not None:
+        await _tracking.stop()
+        _tracking = None
+    if _publish_node is not None:
+        await _publish_node.aclose()
+        _publish_node = None
+    cache = _async_cache
+    _async_cache = None
+    app.state.cache = None
+    if cache is None:
+        return
+    if isinstance(cache, aioredis.RedisCluster):
+        await cache.aclose()
+    else:
+        await cache.aclose(close_connection_pool=True)
+
+
+def get_redis_pool_stats() -> dict:
+    """
+    共享aioRedis连接池使用情况
+    in_use 使用中 idle 空闲 waits 等待空闲连接次数
+    """
+    stats = {
+        "mode": RedisConfig.mode,
+        "max_connections": RedisConfig.max_connections,
+        "created": 0,
+        "in_use": 0,
+        "idle": 0,
+        "waits": 0,
+    }
+    cache = _async_cache
+    if cache is None:
+        return stats
+    if isinstance(cache, aioredis.RedisCluster):
+        # 集群模式每个节点独立维护连接
+        for node in cache.get_nodes():
+            idle = len(node._free)  # pylint: disable=protected-access
+            created = len(node._connections)  # pylint: disable=protected-access
+            stats["created"] += created
+            stats["idle"] += idle
+            stats["in_use"] += created - idle
+        return stats
+    pool = cache.connection_pool
+    idle = len(pool._available_connections)  # pylint: disable=protected-access
+    in_use = len(pool._in_use_connections)  # pylint: disable=protected-access
+    stats["max_connections"] = pool.max_connections
+    stats["created"] = idle + in_use
+    stats["idle"] = idle
+    stats["in_use"] = in_use
+    stats["waits"] = getattr(pool, "waits", 0)
+    return stats
+
+
+# 按key前缀统计的缓存指标 不匹配的key归入other
+CACHE_KEY_FAMILIES = (
+    JWT_PREFIX,
+    SYS_SETTINGS_TAG,
+    TASKS_RECORD_PREFIX,
+    ASSETS_FIELDS_KEY,
+    ROLES_LIST_KEY,
+    ROLES_MENUS_PREFIX,
+)
+# 命令耗时直方图的桶上限(毫秒)
+CACHE_LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class CacheMetrics:
+    """
+    进程内缓存指标 按key前缀统计命中、耗时、数据大小和错误
+    """
+
+    def __init__(self):
+        self._families: dict[str, dict] = {}
+
+    @staticmethod
+    def family(key: str) -> str:
+        for prefix in CACHE_KEY_FAMILIES:
+            if key.startswith(prefix):
+                return prefix
+        return "other"
+
+    def _get(self, key: str) -> dict:
+        name = self.family(key)
+        if name not in self._families:
+            self._families[name] = {
+                "family": name,
+                "commands": {},
+                "hits": 0,
+                "misses": 0,
+                "errors": 0,
+                "read_bytes": 0,
+                "write_bytes": 0,
+                "latency_sum": 0.0,
+                # 最后一个桶为超过最大上限
+                "latency_buckets": [0] * (len(CACHE_LATENCY_BUCKETS) + 1),
+            }
+        return self._families[name]
+
+    def record(
+        self,
+        key: str,
+        command: str,
+        seconds: float,
+        read_bytes: int = 0,
+        write_bytes: int = 0,
+        hit: bool | None = None,
+    ) -> None:
+        family = self._get(key)
+        family["commands"][command] = family["commands"].get(command, 0) + 1
+        family["read_bytes"] += read_bytes
+        family["write_bytes"] += write_bytes
+        if hit is not None:
+            family["hits" if hit else "misses"] += 1
+        ms = seconds * 1000
+        family["latency_sum"] += ms
+        for index, bucket in enumerate(CACHE_LATENCY_BUCKETS):
+            if ms <= bucket:
+                break
+        else:
+            index = len(CACHE_LATENCY_BUCKETS)
+        family["latency_buckets"][index] += 1
+
+    def record_keys(
+        self,
+        keys: list[str],
+        command: str,
+        seconds: float,
+        read_values: list | None = None,
+        write_values: dict | None = None,
+    ) -> None:
+        """
+        多key命令 每个前缀记一次命令和耗时 命中和数据大小按key统计
+        read_values : 与keys顺序一致的返回值
+        write_values : {key: 写入的数据}
+        """
+        groups: dict[str, list[int]] = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(self.family(key), []).append(index)
+        for indexes in groups.values():
+            key = keys[indexes[0]]
+            read_bytes = write_bytes = 0
+            if read_values is not None:
+                read_bytes = sum(payload_size(read_values[i]) for i in indexes)
+            if write_values is not None:
+                write_bytes = sum(
+                    payload_size(write_values.get(keys[i])) for i in indexes
+                )
+            self.record(key, command, seconds, read_bytes, write_bytes)
+            if read_values is not None:
+                family = self._get(key)
+                hits = sum(1 for i in indexes if read_values[i] is not None)
+                family["hits"] += hits
+                family["misses"] += len(indexes) - hits
+
+    def error(self, key: str, command: str) -> None:
+        family = self._get(key)
+        family["commands"][command] = family["commands"].get(command, 0) + 1
+        family["errors"] += 1
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                **family,
+                "commands": dict(family["commands"]),
+                "latency_buckets": dict(
+                    zip(
+                        [*map(str, CACHE_LATENCY_BUCKETS), "+Inf"],
+                        family["latency_buckets"],
+                    )
+                ),
+            }
+            for family in self._families.values()
+        ]
+
+
+cache_metrics = CacheMetrics()
+
+
+def payload_size(value: Any) -> int:
     """
-    获取Redis连接
+    redis返回或写入数据的大小 字符数近似字节数
     """
-    redis_coon = RedisMixin().connect_redis
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(v) for v in value)
+    return len(str(value))
+
+
+def _as_keys(key: str | list[str]) -> list[str]:
+    return key if isinstance(key, list) else [key]
+
+
+async def observe_cache(
+    key: str | list[str],
+    command: str,
+    call: Awaitable[Any],
+    write: Any = None,
+    read: bool = False,
+) -> Any:
+    """
+    执行redis命令并记录指标
+    key : 命令的key 用于归类 多key命令传key列表 按每个key的前缀统计
+    write : 写入的数据 用于统计大小 多key命令为{key: 数据}
+    read : 读命令 返回值非空为命中 多key命令返回值与key列表顺序一致
+    """
+    start = time.perf_counter()
     try:
-        yield redis_coon
-    finally:
-        redis_coon.close()
+        result = await call
+    except Exception:
+        for family_key in {cache_metrics.family(k): k for k in _as_keys(key)}.values():
+            cache_metrics.error(family_key, command)
+        raise
+    seconds = time.perf_counter() - start
+    if isinstance(key, list):
+        cache_metrics.record_keys(
+            key,
+            command,
+            seconds,
+            read_values=result if read else None,
+            write_values=write,
+        )
+    elif read:
+        hit = any(result) if isinstance(result, list) else bool(result)
+        cache_metrics.record(
+            key, command, seconds, read_bytes=payload_size(result), hit=hit
+        )
+    else:
+        cache_metrics.record(key, command, seconds, write_bytes=payload_size(write))
+    return result
+
+
+# 进程内共享的同步Redis客户端 celery worker子进程启动时重建
+_sync_cache: Redis | RedisCluster | None = None
+_sync_cache_lock = threading.Lock()
+
+
+def get_sync_cache() -> Redis | RedisCluster:
+    """
+    获取进程内共享的同步Redis客户端 未初始化时创建
+    连接池线程安全 prefork和eventlet下均可复用
+    """
+    global _sync_cache  # pylint: disable=global-statement
+    if _sync_cache is None:
+        with _sync_cache_lock:
+            if _sync_cache is None:
+                _sync_cache = RedisMixin().connect_redis
+    return _sync_cache
+
+
+def reset_sync_cache() -> None:
+    """
+    丢弃从父进程继承的同步Redis客户端 fork后在子进程中调用
+    继承的socket仍属于父进程 此处不关闭
+    """
+    global _sync_cache  # pylint: disable=global-statement
+    _sync_cache = None
+
+
+def close_sync_cache() -> None:
+    """
+    关闭共享的同步Redis客户端及连接池
+    """
+    global _sync_cache  # pylint: disable=global-statement
+    cache = _sync_cache
+    _sync_cache = None
+    if cache is None:
+        return
+    if isinstance(cache, RedisCluster):
+        cache.close()
+    else:
+        cache.connection_pool.disconnect()
+
+
+def get_redis() -> Generator[Redis, None, None]:
+    """
+    获取Redis连接 复用进程内共享客户端 不在此处关闭
+    """
+    yield get_sync_cache()
 
 
 async def get_async_redis() -> AsyncGenerator[aioredis.Redis, None, None]:
     """
-    获取aioRedis连接
+    获取aioRedis连接 复用进程内共享客户端 不在此处关闭
     """
-    _redis_coon = await AsyncRedisMixin().connect_redis
-    try:
-        yield _redis_coon
-    finally:
-        await _redis_coon.close()
+    yield await get_async_cache()
 
 
 if __name__ == "__main__":
-    import asyncio
-
     a = asyncio.run(AsyncRedisMixin().connect_redis)
     print(type(a))
     print(a)
@@ -0,0 +1,59 @@
+# 缓存key命名 所有key族在此定义
+# 集群模式下需要在同一个pipeline中访问的key使用相同的hash tag 保证落在同一个slot
+# 其他key不加hash tag 避免集中在单个节点
+
+# 用户当前有效的jwt
+JWT_PREFIX = "jwt:"
+# jwt失效通知频道 消息内容为逗号分隔的用户ID 不属于keyspace
+JWT_REVOKED_CHANNEL = "jwt:revoked"
+# 角色菜单权限变更通知频道 不属于keyspace
+PERMISSION_CHANNEL = "auth:permission:changed"
+# 登录限流令牌桶 hash类型 tokens/ts
+LOGIN_LIMIT_PREFIX = "limit:login:"
+# 自动封禁的客户端IP set类型 整个集合共用过期时间
+BANNED_IPS_KEY = "security:banned_ips"
+# 执行中的任务记录
+TASKS_RECORD_PREFIX = "tasks:record:"
+# 系统配置 hash类型 每个分区一个字段 与版本号使用相同的hash tag
+SYS_SETTINGS_TAG = "{sys:settings}"
+SYS_SETTINGS_KEY = SYS_SETTINGS_TAG
+SYS_SETTINGS_VERSION_KEY = f"{SYS_SETTINGS_TAG}:version"
+# 系统配置变更通知频道 不属于keyspace
+SYS_SETTINGS_CHANNEL = "sys:settings:changed"
+# 旧版本的系统配置key 启动时迁移
+SYS_SETTINGS_LEGACY_KEYS = ("sys:settings", "sys:settings:version")
+# redis中不存在系统配置时从数据库加载的结果
+SYS_SETTINGS_DB_KEY = "sys:settings:db"
+# 资产字段配置
+ASSETS_FIELDS_KEY = "assets:fields"
+# 角色列表
+ROLES_LIST_KEY = "auth:roles:list"
+# 角色组合关联的菜单 cached模版 roles_id为排序去重后逗号拼接的角色ID
+ROLES_MENUS_PREFIX = "auth:menus:roles:"
+ROLES_MENUS_KEY = f"{ROLES_MENUS_PREFIX}{{roles_id}}"
+# cached装饰器跨进程的单飞锁
+CACHE_LOCK_PREFIX = "lock:"
+# 数据表版本号 hash类型 字段为表名 提交修改后自增
+TABLE_VERSION_KEY = "db:table:version"
+# 分页查询缓存的总数
+COUNT_CACHE_PREFIX = "db:count:"
+
+
+def jwt_key(user_id: int | str) -> str:
+    return f"{JWT_PREFIX}{user_id}"
+
+
+def tasks_record_key(task_id: str) -> str:
+    return f"{TASKS_RECORD_PREFIX}{task_id}"
+
+
+def login_limit_key(kind: str, value: str) -> str:
+    return f"{LOGIN_LIMIT_PREFIX}{kind}:{value}"
+
+
+def cache_lock_key(key: str) -> str:
+    return f"{CACHE_LOCK_PREFIX}{key}"
+
+
+def count_cache_key(version: str, digest: str) -> str:
+    return f"{COUNT_CACHE_PREFIX}{version}:{digest}"
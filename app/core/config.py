@@ -1,6 +1,7 @@
 import os.path
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 import yaml  # type: ignore
 from pydantic import BaseModel, DirectoryPath, Field, HttpUrl, MySQLDsn, computed_field
@@ -39,6 +40,18 @@ def load(
 DefaultConfig = load()
 
 
+class DbPoolConfig(BaseModel):
+    """
+    数据库连接池配置
+    """
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 3600
+    pool_pre_ping: bool = True
+
+
 class Settings(BaseSettings):
     """
     默认读取系统环境变量，若无对应key则使用config.yaml中配置
@@ -106,14 +119,36 @@ class Settings(BaseSettings):
     LOG_RETENTION: str = DefaultConfig["LOG"]["LOG_RETENTION"]
     LOG_CONSOLE: bool = DefaultConfig["LOG"]["LOG_CONSOLE"]
     LOG_FILE: bool = DefaultConfig["LOG"]["LOG_FILE"]
+    LOOP_MONITOR_ENABLE: bool = DefaultConfig["LOG"]["LOOP_MONITOR_ENABLE"]
+    LOOP_MONITOR_THRESHOLD: int = DefaultConfig["LOG"]["LOOP_MONITOR_THRESHOLD"]
+    LOOP_MONITOR_STACK_LIMIT: int = DefaultConfig["LOG"]["LOOP_MONITOR_STACK_LIMIT"]
 
     # 安全配置
     SECRET_KEY: str = DefaultConfig["SECURITY"]["SECRET_KEY"]
     SECRET_IV: str = DefaultConfig["SECURITY"]["SECRET_IV"]
     SECRET_JWT_KEY: str = DefaultConfig["SECURITY"]["SECRET_JWT_KEY"]
     SECRET_JWT_ALGORITHM: str = DefaultConfig["SECURITY"]["SECRET_JWT_ALGORITHM"]
+    SECRET_JWT_BACKEND: Literal["auto", "native", "jose"] = DefaultConfig["SECURITY"][
+        "SECRET_JWT_BACKEND"
+    ]
     SECRET_JWT_EXP: int = DefaultConfig["SECURITY"]["SECRET_JWT_EXP"]
     SECRET_REJWT_EXP: int = DefaultConfig["SECURITY"]["SECRET_REJWT_EXP"]
+    SECRET_JWT_LOCAL_CACHE: bool = DefaultConfig["SECURITY"]["SECRET_JWT_LOCAL_CACHE"]
+    SECRET_JWT_CACHE_SIZE: int = DefaultConfig["SECURITY"]["SECRET_JWT_CACHE_SIZE"]
+    CRYPTO_MAX_WORKERS: int = DefaultConfig["SECURITY"]["CRYPTO_MAX_WORKERS"]
+    LOGIN_LIMIT_ENABLE: bool = DefaultConfig["SECURITY"]["LOGIN_LIMIT_ENABLE"]
+    LOGIN_LIMIT_IP_CAPACITY: int = DefaultConfig["SECURITY"]["LOGIN_LIMIT_IP_CAPACITY"]
+    LOGIN_LIMIT_IP_RATE: float = DefaultConfig["SECURITY"]["LOGIN_LIMIT_IP_RATE"]
+    LOGIN_LIMIT_USER_CAPACITY: int = DefaultConfig["SECURITY"][
+        "LOGIN_LIMIT_USER_CAPACITY"
+    ]
+    LOGIN_LIMIT_USER_RATE: float = DefaultConfig["SECURITY"]["LOGIN_LIMIT_USER_RATE"]
+    TRUSTED_PROXIES: list[str] = DefaultConfig["SECURITY"]["TRUSTED_PROXIES"]
+    BLOCKED_LOG_INTERVAL: int = DefaultConfig["SECURITY"]["BLOCKED_LOG_INTERVAL"]
+    IP_AUTO_BAN_ENABLE: bool = DefaultConfig["SECURITY"]["IP_AUTO_BAN_ENABLE"]
+    IP_AUTO_BAN_THRESHOLD: int = DefaultConfig["SECURITY"]["IP_AUTO_BAN_THRESHOLD"]
+    IP_AUTO_BAN_TTL: int = DefaultConfig["SECURITY"]["IP_AUTO_BAN_TTL"]
+    IP_AUTO_BAN_LOCAL_TTL: int = DefaultConfig["SECURITY"]["IP_AUTO_BAN_LOCAL_TTL"]
 
     # 数据库配置
     DB_HOST: str = DefaultConfig["DATABASE"]["DB_HOST"]
@@ -123,6 +158,23 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = DefaultConfig["DATABASE"]["DB_PASSWORD"]
     DB_QUERY: str = DefaultConfig["DATABASE"]["DB_QUERY"]
     DB_ECHO: bool = DefaultConfig["DATABASE"]["DB_ECHO"]
+    DB_POOL_ROLE: Literal["auto", "api", "worker", "beat"] = DefaultConfig["DATABASE"][
+        "DB_POOL_ROLE"
+    ]
+    DB_POOLS: dict[str, dict[str, dict]] = DefaultConfig["DATABASE"]["DB_POOLS"]
+    DB_POOL_WARMUP: int = DefaultConfig["DATABASE"]["DB_POOL_WARMUP"]
+    DB_REPLICAS: list[str] = DefaultConfig["DATABASE"]["DB_REPLICAS"]
+    DB_REPLICA_MAX_LAG: int = DefaultConfig["DATABASE"]["DB_REPLICA_MAX_LAG"]
+    DB_REPLICA_CHECK_INTERVAL: int = DefaultConfig["DATABASE"][
+        "DB_REPLICA_CHECK_INTERVAL"
+    ]
+    DB_COUNT_CACHE_TTL: int = DefaultConfig["DATABASE"]["DB_COUNT_CACHE_TTL"]
+
+    def get_db_pool(self, role: str, kind: str) -> DbPoolConfig:
+        """
+        角色和引擎对应的连接池配置 未配置的使用默认值
+        """
+        return DbPoolConfig.model_validate(self.DB_POOLS.get(role, {}).get(kind, {}))
 
     def get_database_uri(self, scheme):
         return MySQLDsn.build(  # pylint: disable=no-member
@@ -160,9 +212,17 @@ class Settings(BaseSettings):
     REDIS_SENTINEL_NAME: str | None = DefaultConfig["CACHE"]["REDIS_SENTINEL_NAME"]
     REDIS_ENCODING: str = DefaultConfig["CACHE"]["REDIS_ENCODING"]
     REDIS_MAX_CONNECTIONS: int = DefaultConfig["CACHE"]["REDIS_MAX_CONNECTIONS"]
+    REDIS_POOL_TIMEOUT: int = DefaultConfig["CACHE"]["REDIS_POOL_TIMEOUT"]
+    CACHE_CODEC: str = DefaultConfig["CACHE"]["CACHE_CODEC"]
     REDIS_SSL: bool = DefaultConfig["CACHE"]["REDIS_SSL"]
     REDIS_SSL_CERT_REQS: str | None = DefaultConfig["CACHE"]["REDIS_SSL_CERT_REQS"]
     REDIS_SSL_CA_CERTS: str | None = DefaultConfig["CACHE"]["REDIS_SSL_CA_CERTS"]
+    REDIS_CLIENT_TRACKING: bool = DefaultConfig["CACHE"]["REDIS_CLIENT_TRACKING"]
+    REDIS_TRACKING_PREFIXES: list[str] = DefaultConfig["CACHE"][
+        "REDIS_TRACKING_PREFIXES"
+    ]
+    REDIS_TRACKING_MAX_KEYS: int = DefaultConfig["CACHE"]["REDIS_TRACKING_MAX_KEYS"]
+    REDIS_TRACKING_TTL: int = DefaultConfig["CACHE"]["REDIS_TRACKING_TTL"]
 
     # celery配置
     CELERY_BROKER_URL: str = DefaultConfig["CELERY"]["CELERY_BROKER_URL"]
@@ -1 +1,15 @@
-from .db_engines import async_engine, engine, register_db
+from .db_counts import (
+    bump_table_versions,
+    cached_count,
+    estimated_count,
+    flush_table_versions,
+)
+from .db_engines import (
+    async_engine,
+    check_indexes,
+    close_db,
+    engine,
+    get_db_pool_stats,
+    get_read_engine,
+    register_db,
+)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+from itertools import chain
+from typing import Any, Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import Table, event, text
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.util import find_tables
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import get_async_cache, get_sync_cache
+from app.core.cache_keys import TABLE_VERSION_KEY, count_cache_key
+from app.core.config import settings
+
+# session.info中记录本次事务修改过的表
+CHANGED_TABLES = "changed_tables"
+# session.info中记录提交后尚未完成的版本号更新任务
+PENDING_BUMPS = "pending_table_bumps"
+# 未提交完成的版本号更新任务 避免被回收
+_pending_bumps: set[asyncio.Task] = set()
+
+
+def _add_changed_tables(session: Session, tables: Iterable[str]) -> None:
+    session.info.setdefault(CHANGED_TABLES, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(
+    session: Session, flush_context: Any  # pylint: disable=unused-argument
+) -> None:
+    """
+    记录ORM增删改涉及的表
+    """
+    _add_changed_tables(
+        session,
+        {
+            obj.__table__.name
+            for obj in chain(session.new, session.dirty, session.deleted)
+            if hasattr(obj, "__table__")
+        },
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_tables(state: ORMExecuteState) -> None:
+    """
+    记录insert/update/delete语句涉及的表
+    """
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            _add_changed_tables(state.session, {table.name})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session: Session) -> None:
+    session.info.pop(CHANGED_TABLES, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_tables(session: Session) -> None:
+    """
+    提交后增加修改过的表的版本号 使缓存的总数失效
+    异步会话中的更新任务记录在session.info 由flush_table_versions等待完成
+    """
+    tables = session.info.pop(CHANGED_TABLES, None)
+    if tables:
+        task = bump_table_versions(tables)
+        if task is not None:
+            session.info.setdefault(PENDING_BUMPS, []).append(task)
+
+
+async def _bump_async(tables: set[str]) -> None:
+    try:
+        cache = await get_async_cache()
+        async with cache.pipeline(transaction=False) as pipe:
+            for table in tables:
+                pipe.hincrby(TABLE_VERSION_KEY, table, 1)
+            await pipe.execute()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Table Version Bump Error - {e}")
+
+
+def bump_table_versions(tables: Iterable[str]) -> Optional[asyncio.Task]:
+    """
+    增加表的版本号 在事件循环中异步执行并返回任务 否则同步执行
+    """
+    tables = set(tables)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        task = loop.create_task(_bump_async(tables))
+        _pending_bumps.add(task)
+        task.add_done_callback(_pending_bumps.discard)
+        return task
+    try:
+        with get_sync_cache().pipeline(transaction=False) as pipe:
+            for table in tables:
+                pipe.hincrby(TABLE_VERSION_KEY, table, 1)
+            pipe.execute()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Table Version Bump Error - {e}")
+    return None
+
+
+async def flush_table_versions(session: AsyncSession) -> None:
+    """
+    等待会话提交后的版本号更新完成 写接口返回前缓存的总数已失效
+    """
+    tasks = session.info.pop(PENDING_BUMPS, None)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def statement_tables(stmt: Any) -> list[str]:
+    """
+    语句涉及的所有表 包括子查询中的表
+    """
+    return sorted(
+        {
+            table.name
+            for table in find_tables(stmt, check_columns=True)
+            if isinstance(table, Table)
+        }
+    )
+
+
+def statement_digest(stmt: Any) -> str:
+    """
+    语句和参数的摘要 相同过滤条件得到相同的摘要
+    """
+    compiled = stmt.compile()
+    params = sorted((key, repr(value)) for key, value in compiled.params.items())
+    return hashlib.sha1(f"{compiled}|{params}".encode()).hexdigest()
+
+
+async def cached_count(session: AsyncSession, total_stmt: Any) -> int:
+    """
+    缓存的总数 缓存key包含涉及的表的版本号 任一表提交修改后失效
+    redis不可用时直接查询
+    """
+    tables = statement_tables(total_stmt)
+    key = None
+    try:
+        cache = await get_async_cache()
+        versions = await cache.hmget(TABLE_VERSION_KEY, tables)
+        version = ".".join(
+            f"{table}={int(value or 0)}" for table, value in zip(tables, versions)
+        )
+        key = count_cache_key(version, statement_digest(total_stmt))
+        value = await cache.get(key)
+        if value is not None:
+            return int(value)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Count Cache Error - {e}")
+        key = None
+    total = int((await session.exec(total_stmt)).one())
+    if key is not None:
+        try:
+            await cache.set(key, total, ex=settings.DB_COUNT_CACHE_TTL)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Count Cache Error - {e}")
+    return total
+
+
+async def estimated_count(session: AsyncSession, table: str) -> Optional[int]:
+    """
+    从表统计信息读取估算的行数 仅支持MySQL 其他数据库返回None
+    """
+    bind = session.get_bind()
+    if bind.dialect.name != "mysql":
+        return None
+    result = await session.exec(
+        text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ).bindparams(table=table)
+    )
+    row = result.first()
+    if row is None or row[0] is None:
+        return None
+    return int(row[0])
@@ -1,24 +1,144 @@
+import asyncio
+
 from loguru import logger
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import Connection, Index, MetaData, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateIndex
 from sqlmodel import Session, create_engine, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-engine = create_engine(str(settings.DATABASE_URI), echo=settings.DB_ECHO)
+from .db_pool import (
+    InstrumentedAsyncPool,
+    InstrumentedQueuePool,
+    get_db_pool_role,
+    get_pool_stats,
+    instrument_engine,
+)
+from .db_replicas import replica_set
+
+# 当前进程的连接池角色 api worker beat
+db_pool_role = get_db_pool_role()
+sync_pool_config = settings.get_db_pool(db_pool_role, "sync")
+async_pool_config = settings.get_db_pool(db_pool_role, "async")
+
+engine = create_engine(
+    str(settings.DATABASE_URI),
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    **sync_pool_config.model_dump(),
+)
 async_engine = create_async_engine(
-    str(settings.ASYNC_DATABASE_URI), echo=settings.DB_ECHO
+    str(settings.ASYNC_DATABASE_URI),
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedAsyncPool,
+    **async_pool_config.model_dump(),
 )
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+
+def get_db_pool_stats() -> list[dict]:
+    """
+    同步和异步引擎的连接池使用情况
+    """
+    return [
+        get_pool_stats(engine, "sync", db_pool_role),
+        get_pool_stats(async_engine.sync_engine, "async", db_pool_role),
+        *replica_set.stats(db_pool_role),
+    ]
+
+
+def get_read_engine() -> AsyncEngine:
+    """
+    只读查询使用的引擎 轮询可用从库 没有可用从库时使用主库
+    """
+    return replica_set.choose() or async_engine
+
+
+def _warmup_sync(count: int) -> None:
+    sync_conns = [engine.connect() for _ in range(count)]
+    for conn in sync_conns:
+        conn.close()
+
 
+async def _warmup_async(count: int) -> None:
+    async_conns = await asyncio.gather(*(async_engine.connect() for _ in range(count)))
+    await asyncio.gather(*(conn.close() for conn in async_conns))
 
-async def register_db() -> None:
+
+async def warmup_db(count: int) -> None:
+    """
+    预先建立连接 避免启动后的第一批请求等待建立连接
+    同步连接在线程池中建立 不阻塞事件循环
+    """
+    sync_count = min(count, sync_pool_config.pool_size)
+    async_count = min(count, async_pool_config.pool_size)
+    await asyncio.gather(
+        asyncio.get_running_loop().run_in_executor(None, _warmup_sync, sync_count),
+        _warmup_async(async_count),
+    )
+    logger.info(f"Mysql Pool Warmup - sync {sync_count} async {async_count}")
+
+
+async def register_db(warmup: int = settings.DB_POOL_WARMUP) -> None:
     """
-    启动时测试数据库连接
+    启动时测试数据库连接 warmup大于0时预先建立连接
+    配置了从库时开始检查从库状态
     """
     try:
         with Session(engine) as sync_session:
             sync_session.exec(select(1))
         async with AsyncSession(async_engine) as async_session:
             await async_session.exec(select(1))
+        if warmup > 0:
+            await warmup_db(warmup)
     except Exception as e:
         logger.error(e)
         raise e
+    await replica_set.start()
+
+
+def _missing_indexes(conn: Connection, metadata: MetaData) -> list[Index]:
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(
+            index
+            for index in sorted(table.indexes, key=lambda index: index.name or "")
+            if index.name and index.name not in existing
+        )
+    return missing
+
+
+async def check_indexes(
+    metadata: MetaData, bind: AsyncEngine = async_engine
+) -> list[str]:
+    """
+    检查模型声明的索引是否已在数据库中创建 返回缺少的索引的DDL
+    create_all不会给已存在的表补建索引 升级后需要手动执行
+    """
+    try:
+        async with bind.connect() as conn:
+            missing = await conn.run_sync(_missing_indexes, metadata)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Index Check Error - {e}")
+        return []
+    statements = [
+        str(CreateIndex(index).compile(dialect=bind.dialect)).strip()
+        for index in missing
+    ]
+    for statement in statements:
+        logger.warning(f"缺少索引 请手动执行 - {statement};")
+    return statements
+
+
+async def close_db() -> None:
+    """
+    停止从库检查并关闭从库连接
+    """
+    await replica_set.stop()
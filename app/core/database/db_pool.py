@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+# 等待连接超过此时间记为慢等待(毫秒)
+SLOW_CHECKOUT_MS = 100
+
+
+class PoolMetrics:
+    """
+    进程内连接池指标
+    等待时间包括连接池已满时的等待和新建连接的耗时
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds * 1000 >= SLOW_CHECKOUT_MS:
+                self.slow += 1
+
+    def timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+# {引擎类型: 指标}
+db_pool_metrics = {"sync": PoolMetrics(), "async": PoolMetrics()}
+
+
+class InstrumentedPoolMixin:
+    """
+    记录取出连接等待时间 与QueuePool或AsyncAdaptedQueuePool组合使用
+    """
+
+    metrics_key = "sync"
+
+    def _do_get(self):
+        metrics = db_pool_metrics[self.metrics_key]
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            metrics.timeout()
+            raise
+        metrics.checkout(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    """
+    记录取出连接等待时间的同步连接池
+    """
+
+    metrics_key = "sync"
+
+
+class InstrumentedAsyncPool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """
+    记录取出连接等待时间的异步连接池
+    """
+
+    metrics_key = "async"
+
+
+def instrumented_async_pool(metrics_key: str) -> type[InstrumentedAsyncPool]:
+    """
+    单独统计指标的异步连接池 用于从库
+    """
+    db_pool_metrics.setdefault(metrics_key, PoolMetrics())
+    return type(
+        f"InstrumentedAsyncPool[{metrics_key}]",
+        (InstrumentedAsyncPool,),
+        {"metrics_key": metrics_key},
+    )
+
+
+def get_db_pool_role() -> str:
+    """
+    当前进程的连接池角色 auto时根据启动命令判断
+    """
+    if settings.DB_POOL_ROLE != "auto":
+        return settings.DB_POOL_ROLE
+    # orig_argv保留了python -m celery中的-m celery
+    argv = [*getattr(sys, "orig_argv", []), *sys.argv]
+    if any(_is_celery_arg(arg) for arg in argv):
+        if "worker" in argv:
+            return "worker"
+        if "beat" in argv:
+            return "beat"
+    return "api"
+
+
+def _is_celery_arg(arg: str) -> bool:
+    """
+    celery命令本身 或python -m celery时的celery/__main__.py
+    """
+    path = os.path.normpath(arg)
+    name = os.path.basename(path)
+    if name == "__main__.py":
+        name = os.path.basename(os.path.dirname(path))
+    return os.path.splitext(name)[0] == "celery"
+
+
+def instrument_engine(engine: Engine, kind: str) -> None:
+    """
+    统计新建连接和失效连接
+    """
+    metrics = db_pool_metrics[kind]
+
+    @event.listens_for(engine, "connect")
+    def on_connect(*args):  # pylint: disable=unused-argument
+        metrics.connect()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(*args):  # pylint: disable=unused-argument
+        metrics.invalidate()
+
+
+def get_pool_stats(engine: Engine, kind: str, role: str) -> dict:
+    """
+    连接池使用情况和指标
+    """
+    pool = engine.pool
+    metrics = db_pool_metrics[kind]
+    stats = {
+        "kind": kind,
+        "role": role,
+        "pool_size": 0,
+        "max_overflow": 0,
+        "checked_out": 0,
+        "checked_in": 0,
+        "overflow": 0,
+        "checkouts": metrics.checkouts,
+        "wait_avg_ms": round(
+            metrics.wait_total * 1000 / metrics.checkouts if metrics.checkouts else 0, 3
+        ),
+        "wait_max_ms": round(metrics.wait_max * 1000, 3),
+        "slow_waits": metrics.slow,
+        "timeouts": metrics.timeouts,
+        "connects": metrics.connects,
+        "invalidations": metrics.invalidations,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            pool_size=pool.size(),
+            max_overflow=pool._max_overflow,  # pylint: disable=protected-access
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return stats
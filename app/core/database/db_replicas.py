@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import DbPoolConfig, settings
+
+from .db_pool import (
+    get_db_pool_role,
+    get_pool_stats,
+    instrument_engine,
+    instrumented_async_pool,
+)
+
+# 复制状态语句 MySQL 8.0.22之前只支持SLAVE
+REPLICA_STATUS_SQL = (
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+)
+
+
+class Replica:
+    """
+    只读从库
+    """
+
+    def __init__(self, index: int, dsn: str, pool_config: DbPoolConfig):
+        self.name = f"replica:{index}"
+        self.engine = create_async_engine(
+            dsn,
+            echo=settings.DB_ECHO,
+            poolclass=instrumented_async_pool(self.name),
+            **pool_config.model_dump(),
+        )
+        instrument_engine(self.engine.sync_engine, self.name)
+        self.healthy = False
+        # 复制延迟 秒 复制停止或未知时为None
+        self.lag: Optional[int] = None
+        self.error: Optional[str] = None
+
+    async def fetch_lag(self) -> Optional[int]:
+        """
+        查询复制延迟
+        """
+        async with self.engine.connect() as conn:
+            for index, (sql, column) in enumerate(REPLICA_STATUS_SQL):
+                try:
+                    result = await conn.exec_driver_sql(sql)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    if index == len(REPLICA_STATUS_SQL) - 1:
+                        raise
+                    await conn.rollback()
+                    continue
+                row = result.mappings().first()
+                if row is None or row.get(column) is None:
+                    return None
+                return int(row[column])
+        return None
+
+
+class ReplicaSet:
+    """
+    从库集合 定时检查复制延迟 轮询选择延迟不超过max_lag的从库
+    没有可用从库时使用主库 每个从库使用pool_config的连接池配置
+    """
+
+    def __init__(
+        self,
+        dsn_list: list[str],
+        pool_config: DbPoolConfig,
+        max_lag: int,
+        interval: int,
+    ):
+        self.replicas = [
+            Replica(index, dsn, pool_config) for index, dsn in enumerate(dsn_list)
+        ]
+        self.max_lag = max_lag
+        self.interval = interval
+        self._healthy: list[Replica] = []
+        self._counter = itertools.count()
+        self._checker: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[AsyncEngine]:
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            replica.lag = await replica.fetch_lag()
+            replica.error = None
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            replica.lag = None
+            # 同样的错误只记录一次
+            if str(e) != replica.error:
+                replica.error = str(e)
+                logger.error(f"Mysql Replica {replica.name} Check Error - {e}")
+        healthy = replica.lag is not None and replica.lag <= self.max_lag
+        if healthy != replica.healthy:
+            logger.warning(
+                f"Mysql Replica {replica.name} "
+                f"{'可用' if healthy else '不可用'} 复制延迟 {replica.lag}"
+            )
+        replica.healthy = healthy
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+        self._healthy = [replica for replica in self.replicas if replica.healthy]
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check_all()
+
+    async def start(self) -> None:
+        if not self.replicas or self._checker is not None:
+            return
+        await self.check_all()
+        self._checker = asyncio.create_task(self._check_loop())
+
+    async def stop(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+        self._healthy = []
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self, role: str) -> list[dict]:
+        return [
+            {
+                **get_pool_stats(replica.engine.sync_engine, replica.name, role),
+                "healthy": replica.healthy,
+                "lag": replica.lag,
+            }
+            for replica in self.replicas
+        ]
+
+
+# 从库连接池与主库异步引擎使用同一角色的配置
+replica_set = ReplicaSet(
+    settings.DB_REPLICAS,
+    pool_config=settings.get_db_pool(get_db_pool_role(), "async"),
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    interval=settings.DB_REPLICA_CHECK_INTERVAL,
+)
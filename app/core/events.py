@@ -2,14 +2,20 @@ from typing import Callable
 
 from fastapi import FastAPI
 from loguru import logger
+from sqlmodel import SQLModel
 
-from app.core.cache import register_redis
+from app.core.cache import close_redis, register_redis
 from app.core.config import init_path, settings
-from app.core.database import register_db
+from app.core.database import check_indexes, close_db, register_db
 from app.core.exeption import register_exception_handlers
 from app.core.logs import init_logs
+from app.core.loop_monitor import close_loop_monitor, register_loop_monitor
 from app.core.middleware import register_middleware
+from app.core.permission import close_permissions, register_permissions
 from app.core.routers import register_routers
+from app.core.security import close_blocked_clients, register_blocked_clients
+from app.core.sys_settings import close_sys_settings, register_sys_settings
+from app.core.token_cache import close_token_cache, register_token_cache
 
 
 def startup(app: FastAPI) -> Callable:
@@ -49,10 +55,34 @@ def startup(app: FastAPI) -> Callable:
         await register_redis(app)
         logger.success("Redis Registration Complete")
 
+        # 加载系统配置快照并订阅变更
+        await register_sys_settings(app)
+        logger.success("Sys Settings Registration Complete")
+
+        # 订阅JWT失效通知
+        await register_token_cache(app)
+        logger.success("Token Cache Registration Complete")
+
+        # 订阅权限变更通知
+        await register_permissions(app)
+        logger.success("Permissions Registration Complete")
+
         # 注册路由
         await register_routers(app)
         logger.success("Routers Registration Complete")
 
+        # 路由注册后模型已全部导入 检查已存在的表是否缺少索引
+        await check_indexes(SQLModel.metadata)
+
+        # 拦截日志定时汇总
+        await register_blocked_clients(app)
+        logger.success("Blocked Clients Registration Complete")
+
+        # 事件循环阻塞检测
+        await register_loop_monitor(app)
+        if settings.LOOP_MONITOR_ENABLE:
+            logger.success("Loop Monitor Registration Complete")
+
     return app_start
 
 
@@ -66,7 +96,24 @@ def stopping(app: FastAPI) -> Callable:
         # APP停止时触发
         logger.info("Application Stop Event Handler")
 
-        await app.state.cache.close()
+        await close_loop_monitor(app)
+
+        await close_blocked_clients(app)
+        logger.success("Blocked Clients Summary Stopped")
+
+        await close_sys_settings(app)
+        logger.success("Sys Settings Listener Stopped")
+
+        await close_token_cache(app)
+        logger.success("Token Cache Listener Stopped")
+
+        await close_permissions(app)
+        logger.success("Permissions Listener Stopped")
+
+        await close_db()
+        logger.success("Mysql Replicas Closed")
+
+        await close_redis(app)
         logger.success("Redis Close connection")
 
     return stop_app
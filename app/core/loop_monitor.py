@@ -0,0 +1,226 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from fastapi import FastAPI
+from loguru import logger
+
+from app.core.config import settings
+
+# 项目代码所在目录 用于定位阻塞位置
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoopStall:
+    """
+    按路由和阻塞位置汇总的阻塞记录
+    """
+
+    __slots__ = ("route", "location", "count", "total", "max", "last", "stack")
+
+    def __init__(self, route: str, location: str):
+        self.route = route
+        self.location = location
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.stack: list[str] = []
+
+    def add(self, seconds: float, stack: list[str]) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.stack = stack
+
+    def to_dict(self) -> dict:
+        return {
+            "route": self.route,
+            "location": self.location,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+            "last_ms": round(self.last * 1000, 1),
+            "stack": self.stack,
+        }
+
+
+class LoopMonitor:
+    """
+    事件循环阻塞检测
+    事件循环中的心跳协程定时更新时间 监控线程发现心跳超过阈值未更新时
+    抓取事件循环线程的调用栈和当前任务对应的路由 心跳恢复后记录阻塞时长
+    """
+
+    # 最多保存的汇总记录数量 超过时丢弃总耗时最少的
+    max_stalls = 200
+
+    def __init__(self, threshold: float, stack_limit: int):
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self.interval = threshold / 2
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.beat = time.monotonic()
+        self.stalls: dict[tuple[str, str], LoopStall] = {}
+        self.stall_count = 0
+        # {任务: ASGI scope} 由LoopMonitorMiddleware维护
+        self.tasks: dict[asyncio.Task, dict] = {}
+        # 监控线程抓取的阻塞信息 (心跳时间, 路由, 位置, 调用栈)
+        self._pending: Optional[tuple[float, str, str, list[str]]] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat is not None
+
+    def bind(self, scope: dict) -> Optional[asyncio.Task]:
+        task = asyncio.current_task()
+        if task is not None:
+            self.tasks[task] = scope
+        return task
+
+    def unbind(self, task: Optional[asyncio.Task]) -> None:
+        if task is not None:
+            self.tasks.pop(task, None)
+
+    def _route(self) -> str:
+        """
+        当前正在执行的任务对应的路由 非请求任务返回任务名称
+        """
+        task = asyncio.current_task(self.loop)
+        if task is None:
+            return "-"
+        scope = self.tasks.get(task)
+        if scope is None:
+            return f"task:{task.get_name()}"
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope.get("path")
+        return f"{scope.get('method')} {path}"
+
+    def _capture(self) -> tuple[str, list[str]]:
+        """
+        抓取事件循环线程的调用栈 阻塞位置为最内层的项目代码
+        """
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        frame = frames.get(self.loop_thread_id)
+        if frame is None:
+            return "-", []
+        summary = traceback.extract_stack(frame, limit=self.stack_limit)
+        stack = [f"{item.filename}:{item.lineno} {item.name}" for item in summary]
+        for item in reversed(summary):
+            if item.filename.startswith(APP_DIR):
+                filename = os.path.relpath(item.filename, os.path.dirname(APP_DIR))
+                return f"{filename}:{item.lineno} {item.name}", stack
+        return (stack[-1] if stack else "-"), stack
+
+    def _watch(self) -> None:
+        """
+        监控线程
+        """
+        while not self._stopped.wait(self.interval):
+            beat = self.beat
+            if time.monotonic() - beat < self.threshold:
+                continue
+            pending = self._pending
+            if pending is not None and pending[0] == beat:
+                continue
+            try:
+                location, stack = self._capture()
+                self._pending = (beat, self._route(), location, stack)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Loop Monitor Capture Error - {e}")
+
+    def _record(self, seconds: float) -> None:
+        pending, self._pending = self._pending, None
+        if pending is None or pending[0] != self.beat:
+            # 阻塞结束前监控线程未来得及抓取
+            route, location, stack = "-", "-", []
+        else:
+            _, route, location, stack = pending
+        key = (route, location)
+        stall = self.stalls.get(key)
+        if stall is None:
+            if len(self.stalls) >= self.max_stalls:
+                least = min(self.stalls, key=lambda k: self.stalls[k].total)
+                self.stalls.pop(least)
+            stall = self.stalls[key] = LoopStall(route, location)
+        stall.add(seconds, stack)
+        self.stall_count += 1
+
+    async def _heartbeat_loop(self) -> None:
+        """
+        心跳协程 唤醒延迟超过阈值即为阻塞
+        """
+        while True:
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            delay = time.monotonic() - self.beat - self.interval
+            if delay >= self.threshold:
+                self._record(delay)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stopped.set()
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+        self._watchdog = None
+
+    def report(self, limit: int = 20) -> list[dict]:
+        """
+        按总阻塞时长排序的阻塞记录
+        """
+        worst = sorted(self.stalls.values(), key=lambda s: s.total, reverse=True)
+        return [stall.to_dict() for stall in worst[:limit]]
+
+    def reset(self) -> None:
+        self.stalls.clear()
+        self.stall_count = 0
+
+
+loop_monitor = LoopMonitor(
+    threshold=settings.LOOP_MONITOR_THRESHOLD / 1000,
+    stack_limit=settings.LOOP_MONITOR_STACK_LIMIT,
+)
+
+
+async def register_loop_monitor(
+    app: FastAPI,  # pylint: disable=unused-argument
+) -> None:
+    """
+    开启LOOP_MONITOR_ENABLE时启动阻塞检测
+    """
+    if settings.LOOP_MONITOR_ENABLE:
+        loop_monitor.start()
+
+
+async def close_loop_monitor(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    停止阻塞检测
+    """
+    await loop_monitor.stop()
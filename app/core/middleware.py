@@ -1,11 +1,15 @@
-from fastapi import FastAPI, Request, Response
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from loguru import logger
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.base import ResponseBase
 from app.core.config import settings
-from app.core.security import get_client_ip, verify_client_ip
+from app.core.loop_monitor import loop_monitor
+from app.core.security import blocked_clients, get_client_ip, verify_client_ip
 
 
 def register_middleware(app: FastAPI) -> None:
@@ -13,6 +17,8 @@ def register_middleware(app: FastAPI) -> None:
     添加中间件
     """
     app.add_middleware(RequestIpCheckMiddleware)
+    if settings.LOOP_MONITOR_ENABLE:
+        app.add_middleware(LoopMonitorMiddleware)
     # 跨域
     app.add_middleware(
         CORSMiddleware,
@@ -23,21 +29,139 @@ def register_middleware(app: FastAPI) -> None:
     )
 
 
-class RequestIpCheckMiddleware(BaseHTTPMiddleware):
+class RequestIpCheckMiddleware:
     """
     判断IP地址是否允许访问实现IP拦截
+    纯ASGI中间件 只读取scope 放行的请求和响应不经过任何包装
+    已自动封禁的IP直接拦截 拦截日志按间隔汇总输出
+    """
+
+    # 拦截响应 与ResponseBase.fail格式一致 只需拼接客户端IP
+    forbidden_prefix = '{"code":0,"message":"非法IP '.encode()
+    forbidden_suffix = b'","data":{}}'
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client_ip = get_client_ip(scope)
+        if not await blocked_clients.is_banned(client_ip) and await verify_client_ip(
+            client_ip
+        ):
+            await self.app(scope, receive, send)
+            return
+        await blocked_clients.record(client_ip, scope["method"], scope.get("path"))
+        await self.forbidden(client_ip, send)
+
+    async def forbidden(self, client_ip: str, send: Send) -> None:
+        # 客户端IP来自请求头 需要转义
+        body = b"".join(
+            [
+                self.forbidden_prefix,
+                json.dumps(client_ip, ensure_ascii=False)[1:-1].encode(),
+                self.forbidden_suffix,
+            ]
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 403,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class LoopMonitorMiddleware:
+    """
+    记录请求所在的任务 事件循环阻塞时按路由归类
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = loop_monitor.bind(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_monitor.unbind(task)
+
+
+def _bench_ip_check(number: int = 3000, stream_mb: int = 125) -> None:
+    """
+    IP检查中间件改为纯ASGI前后的延迟和吞吐对比 python -m app.core.middleware
+    BaseHTTPMiddleware为改写前的实现 两者都只校验IP 不依赖redis
     """
+    # pylint: disable=import-outside-toplevel
+    import httpx
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import StreamingResponse
+
+    class LegacyIpCheckMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            client_ip = get_client_ip(request.scope)
+            if not await verify_client_ip(client_ip):
+                return ResponseBase(message=f"非法IP {client_ip}").fail(403)
+            return await call_next(request)
+
+    chunk = b"x" * 1024 * 1024
+
+    def build_app(middleware: type) -> FastAPI:
+        app = FastAPI()
+        app.add_middleware(middleware)
+
+        @app.get("/ping")
+        async def ping() -> dict:
+            return {"code": 1}
+
+        @app.get("/stream")
+        async def stream() -> StreamingResponse:
+            async def body():
+                for _ in range(stream_mb):
+                    yield chunk
+
+            return StreamingResponse(body())
+
+        return app
+
+    async def run(name: str, middleware: type) -> None:
+        transport = httpx.ASGITransport(
+            app=build_app(middleware), client=("127.0.0.1", 50000)
+        )
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            await client.get("/ping")
+            start = time.perf_counter()
+            for _ in range(number):
+                await client.get("/ping")
+            latency = (time.perf_counter() - start) / number
+            start = time.perf_counter()
+            async with client.stream("GET", "/stream") as response:
+                async for _ in response.aiter_raw():
+                    pass
+            stream_time = time.perf_counter() - start
+        print(
+            f"{name:<20}{latency * 1e6:,.0f}us/req {1 / latency:,.0f} req/s "
+            f"stream={stream_mb / stream_time:,.0f} MB/s"
+        )
+
+    for name, middleware in (
+        ("BaseHTTPMiddleware", LegacyIpCheckMiddleware),
+        ("pure ASGI", RequestIpCheckMiddleware),
+    ):
+        asyncio.run(run(name, middleware))
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
 
-        client_ip = await get_client_ip(request)
-        state = await verify_client_ip(client_ip)
-        if not state:
-            logger.warning(
-                f"非法IP {client_ip} 已拦截! - {request.method} 403 {request.url}"
-            )
-            return ResponseBase(message=f"非法IP {client_ip}").fail(status_code=403)
-        response = await call_next(request)
-        return response
+if __name__ == "__main__":
+    _bench_ip_check()
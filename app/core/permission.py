@@ -0,0 +1,249 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+from loguru import logger
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import get_async_cache, get_async_pubsub_redis, publish_message
+from app.core.cache_keys import PERMISSION_CHANNEL
+from app.core.database import async_engine
+from app.core.sys_settings import get_sys_settings
+from app.models.auth_model import Menus, Roles, RolesMenusLink, UsersRolesLink
+
+# 超级管理员角色 拥有全部菜单
+SUPER_ROLE_ID = 1
+# 全部权限位
+ALL_PERMISSIONS = -1
+# 订阅断开期间权限映射的有效时间 秒
+PERMISSION_OFFLINE_TTL = 10
+
+
+class PermissionMap:
+    """
+    编译后的权限映射 每个菜单对应一个位 角色和用户对应位集
+    菜单或按钮的name与路由的operation_id相同时 访问该路由需要拥有该菜单
+    没有对应菜单的路由只校验token 编译时记录在unmatched中
+    """
+
+    def __init__(
+        self,
+        menus: list[tuple[int, str]],
+        roles: list[int],
+        roles_menus: list[tuple[int, int]],
+        users_roles: list[tuple[int, int]],
+        route_names: Iterable[str] = (),
+    ):
+        # {菜单ID: 位}
+        self.bits: dict[int, int] = {
+            menu_id: 1 << index for index, (menu_id, _) in enumerate(sorted(menus))
+        }
+        # {operation_id: 需要的位}
+        self.routes: dict[str, int] = {}
+        for menu_id, name in menus:
+            self.routes[name] = self.routes.get(name, 0) | self.bits[menu_id]
+        # 需要校验权限但没有对应菜单的路由
+        self.unmatched: list[str] = sorted(set(route_names) - set(self.routes))
+        # {启用的角色ID: 位集}
+        self.roles: dict[int, int] = {role_id: 0 for role_id in roles}
+        for role_id, menu_id in roles_menus:
+            if role_id in self.roles and menu_id in self.bits:
+                self.roles[role_id] |= self.bits[menu_id]
+        if SUPER_ROLE_ID in self.roles:
+            self.roles[SUPER_ROLE_ID] = ALL_PERMISSIONS
+        # {用户ID: [角色ID]}
+        self.users_roles: dict[int, list[int]] = {}
+        for user_id, role_id in users_roles:
+            self.users_roles.setdefault(user_id, []).append(role_id)
+        # {用户ID: (系统配置版本, 位集)} 默认角色来自系统配置
+        self._users: dict[int, tuple[int, int]] = {}
+
+    def roles_bits(self, roles_id: list[int]) -> int:
+        bits = 0
+        for role_id in roles_id:
+            bits |= self.roles.get(role_id, 0)
+        return bits
+
+    def user_bits(self, user_id: int) -> int:
+        """
+        用户的有效位集 包含平台设置的默认角色
+        """
+        sys_settings = get_sys_settings()
+        entry = self._users.get(user_id)
+        if entry is not None and entry[0] == sys_settings.version:
+            return entry[1]
+        bits = self.roles_bits(
+            [
+                *self.users_roles.get(user_id, []),
+                *sys_settings.general.user_default_roles,
+            ]
+        )
+        self._users[user_id] = (sys_settings.version, bits)
+        return bits
+
+    def allowed(self, bits: int, operation_id: str | None) -> bool:
+        mask = self.routes.get(operation_id)
+        return mask is None or bool(bits & mask)
+
+
+_permission_map: Optional[PermissionMap] = None
+_compiled_at = 0.0
+# 每次失效自增 编译期间发生失效则不保存
+_epoch = 0
+_online = False
+_lock = asyncio.Lock()
+_listener: Optional[asyncio.Task] = None
+# 需要校验权限的路由的operation_id 注册路由时写入
+_permission_routes: frozenset[str] = frozenset()
+# 上次输出过的没有对应菜单的路由 变化时才再次输出
+_logged_unmatched: list[str] = []
+
+
+def set_permission_routes(route_names: Iterable[str]) -> None:
+    """
+    记录需要校验权限的路由 编译权限映射时检查是否都有对应的菜单
+    """
+    global _permission_routes  # pylint: disable=global-statement
+    _permission_routes = frozenset(route_names)
+    reset_permissions()
+
+
+def _log_unmatched(permission_map: PermissionMap) -> None:
+    """
+    没有对应菜单的路由只校验token 菜单改名后路由会失去权限控制 编译时输出警告
+    """
+    global _logged_unmatched  # pylint: disable=global-statement
+    if permission_map.unmatched == _logged_unmatched:
+        return
+    _logged_unmatched = permission_map.unmatched
+    if permission_map.unmatched:
+        logger.warning(
+            f"以下路由没有对应的菜单或按钮 只校验token: "
+            f"{', '.join(permission_map.unmatched)}"
+        )
+
+
+async def compile_permission_map(session: AsyncSession) -> PermissionMap:
+    """
+    从数据库编译权限映射
+    """
+    menus = (await session.exec(select(Menus.id, Menus.name))).all()
+    roles = (
+        await session.exec(select(Roles.id).where(col(Roles.role_status).is_(True)))
+    ).all()
+    roles_menus = (
+        await session.exec(
+            select(RolesMenusLink.auth_roles_id, RolesMenusLink.auth_menus_id)
+        )
+    ).all()
+    users_roles = (
+        await session.exec(
+            select(UsersRolesLink.auth_users_id, UsersRolesLink.auth_roles_id)
+        )
+    ).all()
+    return PermissionMap(menus, roles, roles_menus, users_roles, _permission_routes)
+
+
+async def get_permission_map() -> PermissionMap:
+    """
+    获取进程内权限映射 失效后重新编译 并发请求只编译一次
+    """
+    global _permission_map, _compiled_at  # pylint: disable=global-statement
+    permission_map = _permission_map
+    if permission_map is not None and (
+        _online or time.monotonic() - _compiled_at < PERMISSION_OFFLINE_TTL
+    ):
+        return permission_map
+    async with _lock:
+        if _permission_map is not None and _permission_map is not permission_map:
+            return _permission_map
+        epoch = _epoch
+        async with AsyncSession(async_engine) as session:
+            permission_map = await compile_permission_map(session)
+        _log_unmatched(permission_map)
+        if epoch == _epoch:
+            _permission_map = permission_map
+            _compiled_at = time.monotonic()
+    return permission_map
+
+
+def reset_permissions() -> None:
+    """
+    清除进程内权限映射
+    """
+    global _permission_map, _epoch  # pylint: disable=global-statement
+    _epoch += 1
+    _permission_map = None
+
+
+async def invalidate_permissions() -> None:
+    """
+    角色、菜单或用户角色变更后通知所有进程重新编译
+    """
+    reset_permissions()
+    await publish_message(PERMISSION_CHANNEL, _epoch)
+
+
+async def get_user_permissions(user_id: int) -> int:
+    """
+    用户的有效权限位集
+    """
+    return (await get_permission_map()).user_bits(user_id)
+
+
+async def _listen_permissions() -> None:
+    """
+    订阅权限变更通知 断开期间权限映射按PERMISSION_OFFLINE_TTL过期
+    """
+    global _online  # pylint: disable=global-statement
+    while True:
+        cache = None
+        client = None
+        pubsub = None
+        try:
+            cache = await get_async_cache()
+            client = await get_async_pubsub_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(PERMISSION_CHANNEL)
+            # 断线期间可能遗漏通知 重新订阅后重新编译
+            reset_permissions()
+            _online = True
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    reset_permissions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Permission Listener Error - {e}")
+        finally:
+            _online = False
+            if pubsub is not None:
+                await pubsub.aclose()
+            if client is not None and client is not cache:
+                await client.aclose()
+        await asyncio.sleep(5)
+
+
+async def register_permissions(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    订阅权限变更通知
+    """
+    global _listener  # pylint: disable=global-statement
+    _listener = asyncio.create_task(_listen_permissions())
+
+
+async def close_permissions(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    取消权限变更订阅
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
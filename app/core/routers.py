@@ -4,6 +4,8 @@ from loguru import logger
 
 from app.apis.routers import loginRouter, apiRouter
 from app.core.config import settings
+from app.core.permission import set_permission_routes
+from app.depends import check_permission_dep
 
 Routers = APIRouter(prefix=settings.SYS_ROUTER_PREFIX)
 Routers.include_router(loginRouter)
@@ -24,3 +26,13 @@ async def register_routers(app: FastAPI) -> None:
                 route.operation_id = route.name
         except AttributeError as e:
             logger.error(f" {e} ")
+    # 需要校验权限的路由 用于检查是否都有对应的菜单
+    set_permission_routes(
+        route.operation_id
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and any(
+            dependency.call is check_permission_dep
+            for dependency in route.dependant.dependencies
+        )
+    )
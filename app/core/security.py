@@ -1,19 +1,34 @@
+import asyncio
+import base64
 import binascii
+import hashlib
+import hmac
+import json
 import time
-from datetime import datetime, timedelta
 
 import pyotp
-from fastapi import Request
-from IPy import IP
+from fastapi import FastAPI
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
 from loguru import logger
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers
+from starlette.types import Scope
 
 from app.apis.login.login_schema import AccessToken
+from app.core.cache import get_async_cache, observe_cache
+from app.core.cache_keys import BANNED_IPS_KEY
 from app.core.config import settings
+from app.core.sys_settings import get_sys_settings
 from app.models.auth_model import Users
-from app.utils.cache_tools import get_redis_data, redis_exists_key
-from app.utils.ipaddress_tools import is_ip, is_ip_in_range
-from app.utils.password_tools import get_password_hash, random_str
+from app.utils.format_tools import json_dumps_bytes, json_loads
+from app.utils.ipaddress_tools import IpMatcher, parse_ip_entry
+from app.utils.password_tools import (
+    async_verify_password,
+    hmac_sign,
+    hmac_verify,
+    random_str,
+)
 
 # openssl rand -hex 32
 SECRET_KEY = settings.SECRET_JWT_KEY
@@ -22,17 +37,149 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.SECRET_JWT_EXP
 REFRESH_TOKEN_EXPIRE_MINUTES = settings.SECRET_REJWT_EXP
 
 
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class JoseJwtCodec:
+    """
+    python-jose编解码 支持所有算法
+    """
+
+    name = "jose"
+
+    def __init__(self, key: str, algorithm: str):
+        self.key = key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, self.key, algorithm=self.algorithm)
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        return jwt.decode(
+            token,
+            self.key,
+            algorithms=[self.algorithm],
+            options={"verify_exp": verify_exp},
+        )
+
+
+class NativeJwtCodec:
+    """
+    HS256/HS384/HS512 JWT编解码 密钥和头部只准备一次
+    与python-jose签发的token互相兼容 异常类型相同 调用方无需修改
+    只校验签名和exp 系统签发的token不包含其他时间声明
+    """
+
+    name = "native"
+    DIGESTS = {
+        "HS256": hashlib.sha256,
+        "HS384": hashlib.sha384,
+        "HS512": hashlib.sha512,
+    }
+
+    def __init__(self, key: str, algorithm: str):
+        if algorithm not in self.DIGESTS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        self.algorithm = algorithm
+        # 已完成密钥填充的HMAC对象 每次签名复制一份
+        self._hmac = hmac.new(key.encode(), digestmod=self.DIGESTS[algorithm])
+        # 与python-jose相同的头部
+        self.header = _b64encode(
+            json.dumps(
+                {"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True
+            ).encode()
+        )
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict) -> str:
+        signing_input = self.header + b"." + _b64encode(json_dumps_bytes(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def _check_header(self, header_segment: bytes) -> None:
+        if header_segment == self.header:
+            return
+        try:
+            header = json_loads(_b64decode(header_segment))
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise JWTError("Invalid header padding") from e
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise JWTError("The specified alg value is not allowed")
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        try:
+            signing_input, crypto_segment = token.encode().rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".", 1)
+            signature = _b64decode(crypto_segment)
+        except (ValueError, AttributeError, binascii.Error) as e:
+            raise JWTError("Not enough segments") from e
+        self._check_header(header_segment)
+        if not hmac.compare_digest(self._sign(signing_input), signature):
+            raise JWTError("Signature verification failed.")
+        try:
+            payload = json_loads(_b64decode(payload_segment))
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise JWTError("Invalid payload padding") from e
+        if not isinstance(payload, dict):
+            raise JWTError("Invalid payload string: must be a json object")
+        if verify_exp and "exp" in payload:
+            try:
+                exp = int(payload["exp"])
+            except (ValueError, TypeError) as e:
+                raise JWTClaimsError(
+                    "Expiration Time claim (exp) must be an integer."
+                ) from e
+            if exp < int(time.time()):
+                raise ExpiredSignatureError("Signature has expired.")
+        return payload
+
+
+JWT_CODECS = {"jose": JoseJwtCodec, "native": NativeJwtCodec}
+
+
+def get_jwt_codec(
+    key: str = SECRET_KEY,
+    algorithm: str = ALGORITHM,
+    backend: str = settings.SECRET_JWT_BACKEND,
+) -> JoseJwtCodec | NativeJwtCodec:
+    """
+    按配置选择JWT编解码实现 auto时HS算法使用内置实现
+    """
+    if backend == "auto":
+        backend = "native" if algorithm in NativeJwtCodec.DIGESTS else "jose"
+    return JWT_CODECS[backend](key, algorithm)
+
+
+jwt_codec = get_jwt_codec()
+
+
 def create_access_token(subject: dict, exp: int) -> str:
     """
     生成token
-    :param exp:
+    :param exp: 有效期 分钟
     :param subject:需要存储到token的数据
     :return:
     """
-    expires = int(time.mktime((datetime.now() + timedelta(minutes=exp)).timetuple()))
-    subject.update(exp=expires)
-    encoded_jwt: str = jwt.encode(subject, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    subject.update(exp=int(time.time()) + exp * 60)
+    return jwt_codec.encode(subject)
+
+
+def jwt_decode(token, verify_exp=True) -> dict:
+    """
+    jwt解密
+    :param token:
+    :param verify_exp:
+    :return:
+    """
+    return jwt_codec.decode(token, verify_exp=verify_exp)
 
 
 def format_token(user: Users) -> AccessToken:
@@ -41,7 +188,7 @@ def format_token(user: Users) -> AccessToken:
     :param user:
     :return:
     """
-    jid = get_password_hash(random_str())
+    jid = random_str()
     username = user.username
     nickname = user.nickname
     user_id = user.id
@@ -51,20 +198,14 @@ def format_token(user: Users) -> AccessToken:
         subject=jwt_data, exp=ACCESS_TOKEN_EXPIRE_MINUTES
     )
     refresh_token = create_access_token(
-        subject={"refresh_key": get_password_hash(f"{user_id}{jid}{username}")},
+        subject={"refresh_key": hmac_sign(f"{user_id}{jid}{username}")},
         exp=REFRESH_TOKEN_EXPIRE_MINUTES,
     )
 
     data = {
         "access_token": access_token,
         "refresh_token": refresh_token,
-        "expires_in": int(
-            time.mktime(
-                (
-                    datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-                ).timetuple()
-            )
-        ),
+        "expires_in": int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "token_type": "Bearer",
         "user_id": user_id,
         "username": username,
@@ -73,6 +214,20 @@ def format_token(user: Users) -> AccessToken:
     return AccessToken.model_validate(data)
 
 
+async def verify_refresh_key(access_payload: dict, refresh_key: str | None) -> bool:
+    """
+    验证刷新令牌与访问令牌是否匹配
+    旧版本签发的refresh_key为bcrypt哈希 在线程池中校验
+    """
+    message = (
+        f"{access_payload.get('user_id')}{access_payload.get('jid')}"
+        f"{access_payload.get('username')}"
+    )
+    if refresh_key and refresh_key.startswith("$2"):
+        return await async_verify_password(message, refresh_key)
+    return hmac_verify(message, refresh_key)
+
+
 def generate_totp(name: str, issuer_name: str = settings.SYS_TITLE) -> dict:
     """
     生成TOTP Key
@@ -94,53 +249,306 @@ def verify_totp(key: str, token: str) -> bool:
         return False
 
 
-async def get_client_ip(request: Request) -> str:
+# 可信代理
+trusted_proxies = IpMatcher(settings.TRUSTED_PROXIES)
+
+
+def get_client_ip(scope: Scope) -> str:
     """
-    按照优先级获取request请求头中的客户端IP
+    获取客户端IP 请求头可以由客户端伪造 只有直连地址为可信代理时才读取
+    X-Forwarded-For从右向左取第一个不属于可信代理的地址 其次为X-Real-IP
+    没有直连地址(unix socket)时视为本机代理
     """
-    x_forwarded_for = request.headers.get("X-Forwarded-For")
-    if isinstance(x_forwarded_for, list) and x_forwarded_for:
-        return x_forwarded_for[0]
-    elif request.headers.get("X-Real-IP"):
-        return request.headers.get("X-Real-IP")
-    elif request.headers.get("X-Forwarded-Host"):
-        return request.headers.get("X-Forwarded-Host")
-    else:
-        return request.client.host
+    client = scope.get("client")
+    peer = client[0] if client else ""
+    if client and peer not in trusted_proxies:
+        return peer
+    headers = Headers(scope=scope)
+    x_forwarded_for = headers.get("X-Forwarded-For")
+    if x_forwarded_for:
+        hops = [hop.strip() for hop in x_forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if hop not in trusted_proxies:
+                return hop
+        if hops:
+            return hops[0]
+    x_real_ip = headers.get("X-Real-IP")
+    if x_real_ip:
+        return x_real_ip.strip()
+    return peer
+
+
+def _is_ip_entry(ip: str) -> bool:
+    try:
+        parse_ip_entry(ip)
+        return True
+    except ValueError:
+        return False
+
+
+# 编译后的IP列表 按配置版本和检查模式缓存
+_ip_matcher: tuple[tuple[int, int], IpMatcher] | None = None
+
+
+def get_ip_matcher(version: int, mode: int, ip_list: list[str]) -> IpMatcher:
+    """
+    获取编译后的IP列表 配置版本或检查模式变化时重新编译
+    """
+    global _ip_matcher  # pylint: disable=global-statement
+    key = (version, mode)
+    if _ip_matcher is None or _ip_matcher[0] != key:
+        try:
+            matcher = IpMatcher(ip_list)
+        except ValueError as e:
+            # 保存配置时已校验 此处只跳过不符合规范的项
+            logger.error(f"IP List Compile Error - {e}")
+            matcher = IpMatcher(ip for ip in ip_list if _is_ip_entry(ip))
+        _ip_matcher = (key, matcher)
+    return _ip_matcher[1]
 
 
 async def verify_client_ip(client_ip: str) -> bool | None:
     """
     校验客户端IP是否允许访问
     """
-    # 读取redis系统配置
-    state = await redis_exists_key("sys:settings")
-    if not state:
-        return True
-    # 读取redis系统配置中的安全设置
-    security_settings = await get_redis_data("sys:settings", "security")
+    # 读取进程内系统配置快照中的安全设置
+    sys_settings = get_sys_settings()
+    security_settings = sys_settings.security
     # 判断是否开启了IP地址检查
-    if not security_settings.get("ip_check"):
+    if not security_settings.ip_check:
         return True
     # 根据IP地址检查模式获取不同模式的IP列表
-    mode = security_settings.get("ip_check_mode")
+    mode = security_settings.ip_check_mode
     if mode == 1:
-        ip_list = security_settings.get("ip_black_list")
+        ip_list = security_settings.ip_black_list
     else:
-        ip_list = security_settings.get("ip_white_list")
-    if len(ip_list) == 0:
+        ip_list = security_settings.ip_white_list
+    if not ip_list:
         return True
-    # 判断client_ip 是否符合要求
-    _ip_state = None
-    for ip in ip_list:
-        if is_ip(ip):
-            if client_ip in IP(ip):
-                _ip_state = not mode == 1
-                break
-            _ip_state = mode == 1
-        else:
-            if "-" in ip and is_ip_in_range(client_ip, ip):
-                _ip_state = not mode == 1
-                break
-            _ip_state = False
-    return _ip_state
+    # 黑名单模式匹配时拒绝 白名单模式匹配时允许
+    matched = client_ip in get_ip_matcher(sys_settings.version, mode, ip_list)
+    return not matched if mode == 1 else matched
+
+
+class BlockedClients:
+    """
+    被拦截的客户端 按间隔定时汇总日志 超过阈值的IP加入redis封禁有序集合
+    有序集合的分数为每个IP的封禁截止时间 各IP独立过期
+    封禁查询结果在进程内缓存 被封禁的IP不再计算IP黑白名单
+    """
+
+    # 汇总日志中输出的IP数量
+    log_top = 10
+    # 进程内缓存的封禁查询结果数量上限 超过时清理过期项
+    local_max = 10000
+
+    def __init__(
+        self,
+        interval: int,
+        ban_enable: bool,
+        ban_threshold: int,
+        ban_ttl: int,
+        local_ttl: int,
+    ):
+        self.interval = interval
+        self.ban_enable = ban_enable
+        self.ban_threshold = ban_threshold
+        self.ban_ttl = ban_ttl
+        self.local_ttl = local_ttl
+        # 当前间隔内 {IP: 拦截次数} {IP: 最近一次请求}
+        self.counts: dict[str, int] = {}
+        self.last_request: dict[str, str] = {}
+        self.window_start = time.monotonic()
+        # {IP: (过期时间, 是否封禁)}
+        self._banned: dict[str, tuple[float, bool]] = {}
+        # redis异常后暂停查询的截止时间
+        self._suspend_until = 0.0
+        # 定时输出汇总日志的任务
+        self._flush_task: asyncio.Task | None = None
+
+    async def is_banned(self, client_ip: str) -> bool:
+        """
+        是否已被自动封禁 redis异常时放行
+        """
+        if not self.ban_enable:
+            return False
+        now = time.monotonic()
+        entry = self._banned.get(client_ip)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        if now < self._suspend_until:
+            return False
+        try:
+            cache = await get_async_cache()
+            # 到期的成员由ban和定时任务清理 这里只比较封禁截止时间
+            expire_at = await observe_cache(
+                BANNED_IPS_KEY,
+                "zscore",
+                cache.zscore(BANNED_IPS_KEY, client_ip),
+                read=True,
+            )
+        except RedisError as e:
+            self._suspend_until = now + self.local_ttl
+            logger.error(f"Banned IPs Check Error - {e}")
+            return False
+        if len(self._banned) >= self.local_max:
+            self._banned = {k: v for k, v in self._banned.items() if v[0] > now}
+        remaining = float(expire_at) - time.time() if expire_at is not None else 0.0
+        banned = remaining > 0
+        # 进程内缓存不超过剩余的封禁时间
+        local_ttl = min(self.local_ttl, remaining) if banned else self.local_ttl
+        self._banned[client_ip] = (now + local_ttl, banned)
+        return banned
+
+    async def record(self, client_ip: str, method: str, path: str) -> None:
+        """
+        记录一次拦截 达到阈值时封禁
+        """
+        self.maybe_flush()
+        count = self.counts.get(client_ip, 0) + 1
+        self.counts[client_ip] = count
+        self.last_request[client_ip] = f"{method} {path}"
+        if self.ban_enable and count == self.ban_threshold:
+            await self.ban(client_ip)
+
+    async def ban(self, client_ip: str) -> None:
+        """
+        加入封禁有序集合 分数为该IP的封禁截止时间
+        集合本身的过期时间为最近一次封禁的截止时间 不会早于任何成员
+        """
+        self._banned[client_ip] = (
+            time.monotonic() + min(self.local_ttl, self.ban_ttl),
+            True,
+        )
+        try:
+            cache = await get_async_cache()
+            now = time.time()
+            pipe = cache.pipeline()
+            pipe.zremrangebyscore(BANNED_IPS_KEY, "-inf", now)
+            pipe.zadd(BANNED_IPS_KEY, {client_ip: now + self.ban_ttl})
+            pipe.expire(BANNED_IPS_KEY, self.ban_ttl)
+            await observe_cache(BANNED_IPS_KEY, "pipeline_zadd", pipe.execute())
+        except RedisError as e:
+            logger.error(f"Banned IPs Add Error - {e}")
+        logger.warning(
+            f"非法IP {client_ip} {self.interval}秒内被拦截{self.ban_threshold}次 "
+            f"已自动封禁{self.ban_ttl}秒!"
+        )
+
+    def maybe_flush(self) -> None:
+        """
+        超过汇总间隔时输出一条汇总日志
+        """
+        now = time.monotonic()
+        if now - self.window_start < self.interval:
+            return
+        self.flush()
+        self.window_start = now
+
+    async def remove_expired(self) -> None:
+        """
+        清理封禁有序集合中已到期的IP
+        """
+        try:
+            cache = await get_async_cache()
+            await observe_cache(
+                BANNED_IPS_KEY,
+                "zremrangebyscore",
+                cache.zremrangebyscore(BANNED_IPS_KEY, "-inf", time.time()),
+            )
+        except RedisError as e:
+            logger.error(f"Banned IPs Cleanup Error - {e}")
+
+    async def _flush_loop(self) -> None:
+        """
+        定时输出汇总日志并清理到期的封禁 不依赖下一次拦截触发
+        """
+        while True:
+            await asyncio.sleep(
+                max(self.window_start + self.interval - time.monotonic(), 0)
+            )
+            self.maybe_flush()
+            if self.ban_enable:
+                await self.remove_expired()
+
+    def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is None:
+            return
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+        self.flush()
+
+    def flush(self) -> None:
+        if not self.counts:
+            return
+        counts, self.counts = self.counts, {}
+        last_request, self.last_request = self.last_request, {}
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        detail = " ".join(
+            f"{ip}({count}次 最近 {last_request[ip]})"
+            for ip, count in top[: self.log_top]
+        )
+        logger.warning(
+            f"非法IP已拦截 {sum(counts.values())}次 {len(counts)}个IP - {detail}"
+        )
+
+
+blocked_clients = BlockedClients(
+    interval=settings.BLOCKED_LOG_INTERVAL,
+    ban_enable=settings.IP_AUTO_BAN_ENABLE,
+    ban_threshold=settings.IP_AUTO_BAN_THRESHOLD,
+    ban_ttl=settings.IP_AUTO_BAN_TTL,
+    local_ttl=settings.IP_AUTO_BAN_LOCAL_TTL,
+)
+
+
+async def register_blocked_clients(
+    app: FastAPI,  # pylint: disable=unused-argument
+) -> None:
+    """
+    启动拦截汇总日志定时任务
+    """
+    blocked_clients.start()
+
+
+async def close_blocked_clients(
+    app: FastAPI,  # pylint: disable=unused-argument
+) -> None:
+    """
+    停止定时任务并输出剩余的汇总日志
+    """
+    await blocked_clients.stop()
+
+
+def _bench_jwt(number: int = 20000) -> None:
+    """
+    各JWT编解码实现签发和验证吞吐对比 python -m app.core.security
+    """
+    claims = {"username": "admin", "user_id": 1, "jid": random_str()}
+    for backend in JWT_CODECS:
+        codec = get_jwt_codec(backend=backend)
+        token = codec.encode({**claims, "exp": int(time.time()) + 600})
+        start = time.perf_counter()
+        for _ in range(number):
+            codec.encode({**claims, "exp": int(time.time()) + 600})
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(number):
+            codec.decode(token)
+        decode_time = time.perf_counter() - start
+        print(
+            f"{backend:<8}issue={number / encode_time:,.0f} ops/s "
+            f"verify={number / decode_time:,.0f} ops/s"
+        )
+
+
+if __name__ == "__main__":
+    _bench_jwt()
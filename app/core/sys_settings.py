@@ -0,0 +1,263 @@
+import asyncio
+import threading
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from loguru import logger
+from pydantic import BaseModel, Field
+from redis.exceptions import ResponseError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import (
+    evict_client_tracking,
+    get_async_cache,
+    get_async_pubsub_redis,
+    get_sync_cache,
+    observe_cache,
+    publish_message,
+)
+from app.core.cache_keys import (
+    SYS_SETTINGS_CHANNEL,
+    SYS_SETTINGS_KEY,
+    SYS_SETTINGS_LEGACY_KEYS,
+    SYS_SETTINGS_VERSION_KEY,
+)
+from app.core.database import async_engine
+from app.models.system_model import (
+    SystemSettings,
+    channelsSeetings,
+    generalSettings,
+    ldapSettings,
+    securitySettings,
+)
+from app.utils.cache_tools import dumps_redis_data, loads_redis_data
+from app.utils.password_tools import clear_secret_cache
+
+# 按分区存储的配置
+SYS_SETTINGS_SECTIONS = ("general", "security", "ldap", "channels")
+# 不写入缓存的计算字段
+SYS_SETTINGS_COMPUTED = {"ansible_model_list", "system_path"}
+
+
+class SettingsSnapshot(BaseModel):
+    """
+    进程内系统配置快照
+    """
+
+    version: int = Field(default=0, description="配置版本号")
+    general: generalSettings = Field(default=generalSettings(), description="常规配置")
+    security: securitySettings = Field(
+        default=securitySettings(), description="安全设置"
+    )
+    ldap: ldapSettings = Field(default=ldapSettings(), description="ldap设置")
+    channels: channelsSeetings = Field(
+        default=channelsSeetings(), description="通知渠道"
+    )
+
+
+# 当前进程持有的配置快照 读取时无网络IO
+_snapshot = SettingsSnapshot()
+_listener: Optional[asyncio.Task] = None
+_sync_lock = threading.Lock()
+# 同步进程中各分区已加载的版本号
+_section_versions: dict[str, int] = {}
+
+
+def get_sys_settings() -> SettingsSnapshot:
+    """
+    获取进程内系统配置快照
+    """
+    return _snapshot
+
+
+def parse_sys_settings(data: dict | None, version: int = 0) -> SettingsSnapshot:
+    """
+    解析缓存中的系统配置 未配置的部分使用默认值
+    """
+    if not data:
+        return SettingsSnapshot(version=version)
+    sections = {k: v for k, v in data.items() if k in SYS_SETTINGS_SECTIONS and v}
+    return SettingsSnapshot.model_validate({**sections, "version": version})
+
+
+def parse_sys_settings_section(section: str, data: dict | None) -> Any:
+    """
+    解析单个配置分区 为空时使用默认值
+    """
+    model = SettingsSnapshot.model_fields[section].annotation
+    if not data:
+        return model()
+    return model.model_validate(data)
+
+
+def load_sys_settings(*sections: str) -> SettingsSnapshot:
+    """
+    同步获取系统配置快照 供celery等同步进程使用
+    每次只读取版本号 版本变化时才用HMGET重新加载需要的分区
+    sections : 需要的分区 默认全部
+    """
+    global _snapshot  # pylint: disable=global-statement
+    cache = get_sync_cache()
+    version = int(cache.get(SYS_SETTINGS_VERSION_KEY) or 0)
+    sections = sections or SYS_SETTINGS_SECTIONS
+    with _sync_lock:
+        stale = [
+            section
+            for section in sections
+            if not version or _section_versions.get(section) != version
+        ]
+        if not stale:
+            return _snapshot
+        try:
+            values = cache.hmget(SYS_SETTINGS_KEY, stale)
+        except ResponseError as e:
+            # 旧版本以字符串存储 等待API启动时迁移
+            logger.error(f"Sys Settings Load Error - {e}")
+            return _snapshot
+        update = {
+            section: parse_sys_settings_section(section, loads_redis_data(value))
+            for section, value in zip(stale, values)
+        }
+        _snapshot = _snapshot.model_copy(update={**update, "version": version})
+        _section_versions.update({section: version for section in stale})
+        clear_secret_cache(version)
+    return _snapshot
+
+
+def _set_snapshot(snapshot: SettingsSnapshot) -> SettingsSnapshot:
+    """
+    替换进程内快照 所有分区标记为当前版本
+    """
+    global _snapshot  # pylint: disable=global-statement
+    _snapshot = snapshot
+    _section_versions.update(
+        {section: snapshot.version for section in SYS_SETTINGS_SECTIONS}
+    )
+    clear_secret_cache(snapshot.version)
+    return _snapshot
+
+
+async def refresh_sys_settings() -> SettingsSnapshot:
+    """
+    从redis重新加载系统配置快照
+    """
+    cache = await get_async_cache()
+    pipe = cache.pipeline()
+    pipe.hmget(SYS_SETTINGS_KEY, SYS_SETTINGS_SECTIONS)
+    pipe.get(SYS_SETTINGS_VERSION_KEY)
+    values, version = await observe_cache(
+        SYS_SETTINGS_KEY, "pipeline_hmget", pipe.execute(), read=True
+    )
+    data = {
+        section: loads_redis_data(value)
+        for section, value in zip(SYS_SETTINGS_SECTIONS, values)
+    }
+    return _set_snapshot(parse_sys_settings(data, int(version or 0)))
+
+
+async def publish_sys_settings(value: dict) -> SettingsSnapshot:
+    """
+    写入系统配置 只写入value中包含的字段
+    版本号自增并通知所有进程重新加载
+    """
+    cache = await get_async_cache()
+    pipe = cache.pipeline()
+    pipe.hset(
+        SYS_SETTINGS_KEY,
+        mapping={k: dumps_redis_data(v) for k, v in value.items() if v is not None},
+    )
+    pipe.incr(SYS_SETTINGS_VERSION_KEY)
+    _, version = await pipe.execute()
+    evict_client_tracking([SYS_SETTINGS_KEY])
+    snapshot = await refresh_sys_settings()
+    await publish_message(SYS_SETTINGS_CHANNEL, version)
+    return snapshot
+
+
+async def migrate_sys_settings() -> None:
+    """
+    旧版本系统配置key不带hash tag 以json字符串或hash存储 迁移至新的key
+    """
+    cache = await get_async_cache()
+    legacy_key = SYS_SETTINGS_LEGACY_KEYS[0]
+    key_type = await cache.type(legacy_key)
+    if key_type == "string":
+        data = loads_redis_data(await cache.get(legacy_key))
+    elif key_type == "hash":
+        data = {
+            k: loads_redis_data(v) for k, v in (await cache.hgetall(legacy_key)).items()
+        }
+    else:
+        return
+    await cache.delete(*SYS_SETTINGS_LEGACY_KEYS)
+    if isinstance(data, dict):
+        await publish_sys_settings(
+            {k: v for k, v in data.items() if k not in SYS_SETTINGS_COMPUTED}
+        )
+
+
+async def _listen_sys_settings() -> None:
+    """
+    订阅配置变更通知 收到更高版本号时重新加载快照
+    """
+    while True:
+        cache = None
+        client = None
+        pubsub = None
+        try:
+            cache = await get_async_cache()
+            client = await get_async_pubsub_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(SYS_SETTINGS_CHANNEL)
+            # 订阅后重新加载一次 防止断线期间遗漏变更
+            await refresh_sys_settings()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                if int(message.get("data") or 0) != _snapshot.version:
+                    await refresh_sys_settings()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Sys Settings Listener Error - {e}")
+            await asyncio.sleep(5)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+            if client is not None and client is not cache:
+                await client.aclose()
+
+
+async def register_sys_settings(
+    app: FastAPI,  # pylint: disable=unused-argument
+) -> None:
+    """
+    加载系统配置快照并订阅变更通知
+    redis中不存在配置时从数据库加载
+    """
+    global _listener  # pylint: disable=global-statement
+    await migrate_sys_settings()
+    snapshot = await refresh_sys_settings()
+    if not snapshot.version:
+        async with AsyncSession(async_engine) as session:
+            db_settings = await session.get(SystemSettings, 1)
+        if db_settings:
+            await publish_sys_settings(
+                db_settings.model_dump(exclude=SYS_SETTINGS_COMPUTED)
+            )
+    _listener = asyncio.create_task(_listen_sys_settings())
+
+
+async def close_sys_settings(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    取消配置变更订阅
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+from loguru import logger
+
+from app.core.cache import get_async_cache, get_async_pubsub_redis, publish_message
+from app.core.cache_keys import JWT_REVOKED_CHANNEL, jwt_key
+from app.core.config import settings
+from app.utils.cache_tools import delete_many_redis_data
+
+
+class TokenCache:
+    """
+    进程内已验证的JWT 以token摘要为key 保存解码后的内容直到过期
+    只有订阅失效通知正常时才使用 断开期间回退到严格模式
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # {摘要: (过期时间, 解码内容)}
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # {用户ID: {摘要}}
+        self._users: dict[int, set[str]] = {}
+        # 每次失效自增 验证期间发生失效则不写入
+        self.epoch = 0
+        self.online = False
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        if not self.online:
+            return None
+        digest = self.digest(token)
+        entry = self._data.get(digest)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._remove(digest)
+            return None
+        self._data.move_to_end(digest)
+        return entry[1]
+
+    def put(self, token: str, payload: dict, epoch: int) -> None:
+        if not self.online or epoch != self.epoch or not payload.get("exp"):
+            return
+        digest = self.digest(token)
+        user_id = payload["user_id"]
+        self._data[digest] = (payload["exp"], payload)
+        self._data.move_to_end(digest)
+        self._users.setdefault(user_id, set()).add(digest)
+        while len(self._data) > self.max_size:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, digest: str) -> None:
+        entry = self._data.pop(digest, None)
+        if entry is None:
+            return
+        user_id = entry[1]["user_id"]
+        digests = self._users.get(user_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                self._users.pop(user_id)
+
+    def revoke(self, user_ids: Iterable[int] | None) -> None:
+        """
+        user_ids为None时清空全部
+        """
+        self.epoch += 1
+        if user_ids is None:
+            self._data.clear()
+            self._users.clear()
+            return
+        for user_id in user_ids:
+            for digest in self._users.pop(user_id, set()):
+                self._data.pop(digest, None)
+
+
+token_cache = TokenCache(settings.SECRET_JWT_CACHE_SIZE)
+_listener: Optional[asyncio.Task] = None
+
+
+async def publish_token_revoked(user_ids: Iterable[int]) -> None:
+    """
+    通知所有进程清除用户的JWT缓存 重新登录或注销时调用
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    token_cache.revoke(user_ids)
+    if not settings.SECRET_JWT_LOCAL_CACHE:
+        return
+    await publish_message(JWT_REVOKED_CHANNEL, ",".join(map(str, user_ids)))
+
+
+async def revoke_user_tokens(user_ids: Iterable[int]) -> None:
+    """
+    删除redis中用户的JWT并通知所有进程 强制下线
+    """
+    user_ids = list(user_ids)
+    await delete_many_redis_data([jwt_key(user_id) for user_id in user_ids])
+    await publish_token_revoked(user_ids)
+
+
+async def _listen_token_revoked() -> None:
+    """
+    订阅JWT失效通知 断开期间不使用缓存
+    """
+    while True:
+        cache = None
+        client = None
+        pubsub = None
+        try:
+            cache = await get_async_cache()
+            client = await get_async_pubsub_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(JWT_REVOKED_CHANNEL)
+            # 断线期间可能遗漏通知 重新订阅后清空
+            token_cache.revoke(None)
+            token_cache.online = True
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                token_cache.revoke(
+                    int(user_id) for user_id in message["data"].split(",") if user_id
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Token Cache Listener Error - {e}")
+        finally:
+            token_cache.online = False
+            token_cache.revoke(None)
+            if pubsub is not None:
+                await pubsub.aclose()
+            if client is not None and client is not cache:
+                await client.aclose()
+        await asyncio.sleep(5)
+
+
+async def register_token_cache(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    开启SECRET_JWT_LOCAL_CACHE时订阅JWT失效通知
+    """
+    global _listener  # pylint: disable=global-statement
+    if settings.SECRET_JWT_LOCAL_CACHE:
+        _listener = asyncio.create_task(_listen_token_revoked())
+
+
+async def close_token_cache(app: FastAPI) -> None:  # pylint: disable=unused-argument
+    """
+    取消JWT失效订阅
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
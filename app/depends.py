@@ -5,14 +5,22 @@ from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import ExpiredSignatureError, JWTError
 from pydantic import ValidationError
-from redis import Redis
 from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache_keys import jwt_key
 from app.core.config import settings
-from app.core.database import async_engine, engine
+from app.core.database import (
+    async_engine,
+    engine,
+    flush_table_versions,
+    get_read_engine,
+)
 from app.core.exeption import AuthError
-from app.utils.password_tools import jwt_decode
+from app.core.permission import get_permission_map, get_user_permissions
+from app.core.security import jwt_decode
+from app.core.token_cache import token_cache
+from app.utils.cache_tools import get_redis_raw
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -26,13 +34,24 @@ def get_session() -> Generator[Session, None, None]:
 async def get_async_session() -> AsyncGenerator[AsyncSession, None, None]:
     """
     获取异步数据库连接
+    返回响应前等待提交触发的表版本号更新 避免之后的请求读到旧的缓存总数
     """
     async with AsyncSession(bind=async_engine, expire_on_commit=False) as session:
         yield session
+        await flush_table_versions(session)
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取只读数据库连接 有可用从库时使用从库 只能用于查询
+    """
+    async with AsyncSession(bind=get_read_engine(), expire_on_commit=False) as session:
+        yield session
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.SYS_ROUTER_PREFIX}{settings.SYS_ROUTER_AUTH2}"
@@ -54,6 +73,14 @@ async def check_token_dep(req: Request, token: TokenDep) -> None:
     """
     检查JWT Token
     """
+    # 进程内缓存的已验证token 不需要验证签名和读取redis
+    payload = token_cache.get(token)
+    if payload:
+        req.state.user_id = payload["user_id"]
+        req.state.username = payload["username"]
+        req.state.permissions = await get_user_permissions(payload["user_id"])
+        return
+    epoch = token_cache.epoch
     try:
         # token解密
         payload = jwt_decode(token)
@@ -66,17 +93,29 @@ async def check_token_dep(req: Request, token: TokenDep) -> None:
             if user_id is None or username is None:
                 raise jwt_validation_error
             # 查询redis是否存在jwt
-            cache: Redis = req.app.state.cache
-            cache_token = await cache.get(f"jwt:{user_id}")
+            cache_token = await get_redis_raw(jwt_key(user_id))
             # 如果和redis中的key不一致则前端请求刷新
             if cache_token != token:
                 raise jwt_expires_error
             # 缓存用户ID至request
             req.state.user_id = user_id
             req.state.username = username
+            token_cache.put(token, payload, epoch)
+            req.state.permissions = await get_user_permissions(user_id)
         else:
             raise jwt_validation_error
     except ExpiredSignatureError:
         raise jwt_expires_error
     except (JWTError, ValidationError):
         raise jwt_validation_error
+
+
+async def check_permission_dep(req: Request) -> None:
+    """
+    检查当前用户是否拥有路由对应的菜单或按钮 需要在check_token_dep之后执行
+    """
+    route = req.scope.get("route")
+    operation_id = getattr(route, "operation_id", None) or getattr(route, "name", None)
+    permission_map = await get_permission_map()
+    if not permission_map.allowed(req.state.permissions, operation_id):
+        raise AuthError(message="没有访问权限!", status_code=403)
@@ -8,15 +8,16 @@ import ansible_runner
 from ansible_runner import Runner, RunnerConfig
 from fastapi.exceptions import RequestValidationError
 from loguru import logger
-from pydantic import BaseModel, Field, Json
+from pydantic import BaseModel, Field, Json, PrivateAttr
 from sqlmodel import Session, select
 
-from app.core.cache import get_redis
+from app.core.cache import get_sync_cache
+from app.core.cache_keys import tasks_record_key
 from app.core.config import BASE_CONFIG_DIR, base_path
 from app.depends import get_session
 from app.ext.sqlmodel_celery_beat.models import PeriodicTask
 from app.models.tasks_model import TasksHistory, TaskType
-from app.utils.cache_tools import is_json
+from app.utils.cache_tools import dumps_redis_model, is_json, loads_redis_model
 from app.utils.files_tools import remove_dir
 
 
@@ -51,38 +52,38 @@ class RunConf(BaseModel):
     skip_tags: Optional[str] = Field(default=None, description="skip tags")
     role: Optional[str] = Field(default=None, description="role name")
     roles_path: Optional[str] = Field(default=None, description="roles path")
+    # 当前进程持有的任务记录 执行期间只有本进程写入 更新时无需重新读取
+    _task_record: Optional[TasksHistory] = PrivateAttr(default=None)
 
     def get_cache_record(self) -> TasksHistory:
-        redis = next(get_redis())
-        cache_task_record = redis.get(f"tasks:record:{self.ident}")
+        redis = get_sync_cache()
+        cache_task_record = redis.get(tasks_record_key(self.ident))
         if not cache_task_record:
             raise Exception("task record not found")
-        task_record = TasksHistory.model_validate(json.loads(cache_task_record))
+        task_record = loads_redis_model(cache_task_record, TasksHistory)
+        self._task_record = task_record
         return task_record
 
     def update_cache_record(self, update_data: dict) -> TasksHistory:
-        redis = next(get_redis())
+        redis = get_sync_cache()
         try:
-            task_record = self.get_cache_record()
+            task_record = self._task_record or self.get_cache_record()
             task_record.sqlmodel_update(update_data)
-            redis.set(f"tasks:record:{self.ident}", task_record.model_dump_json())
+            redis.set(tasks_record_key(self.ident), dumps_redis_model(task_record))
             return task_record
         except Exception as e:
             logger.error(e)
             raise e
-        finally:
-            redis.close()
 
     def clear_cache_record(self) -> bool:
-        redis = next(get_redis())
+        redis = get_sync_cache()
         try:
-            redis.delete(f"tasks:record:{self.ident}")
+            redis.delete(tasks_record_key(self.ident))
+            self._task_record = None
             return True
         except Exception as e:
             logger.error(e)
             raise e
-        finally:
-            redis.close()
 
     def get_db_record(self, session: Session) -> TasksHistory:
         db_task_record = session.exec(
@@ -247,7 +248,7 @@ class TasksRunConfig(RunConf):
 
     def run_scheduled_task(self, exec_worker: str) -> Any:
         session = next(get_session())
-        redis = next(get_redis())
+        redis = get_sync_cache()
         periodic_task = session.exec(
             select(PeriodicTask).where(PeriodicTask.name == self.task_name)
         ).one_or_none()
@@ -258,12 +259,11 @@ class TasksRunConfig(RunConf):
             task_record = create_task_record(
                 session=session, username=periodic_task.user_by, run_conf=self
             )
-            redis.set(f"tasks:record:{self.ident}", task_record.model_dump_json())
+            redis.set(tasks_record_key(self.ident), dumps_redis_model(task_record))
         except Exception as e:
             raise e
         finally:
             session.close()
-            redis.close()
         try:
             run_config = RunConf.model_validate(self.model_dump())
             run_config.exec_worker = exec_worker
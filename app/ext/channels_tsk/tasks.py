@@ -7,7 +7,7 @@ from app.ext.channels_tsk.email import MailInstance, MessageType
 from app.ext.channels_tsk.utils import get_mail_conf
 from app.models.system_model import mailServerSettings
 from app.tasks import celery
-from app.utils.password_tools import aes_decrypt_password, is_decrypt
+from app.utils.password_tools import decrypt_secret
 
 
 @celery.task(name="tasks.send_email",rate_limit="60/m")
@@ -31,8 +31,7 @@ def send_email(
             "recipients": recipients,
             "subject": subject,
         }
-    if is_decrypt(_config.mail_password):
-        _config.mail_password = aes_decrypt_password(_config.mail_password)
+    _config.mail_password = decrypt_secret(_config.mail_password)
     if body is None:
         body = {}
     _send = MailInstance(
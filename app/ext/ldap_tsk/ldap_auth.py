@@ -5,7 +5,7 @@ from ldap3.core.exceptions import LDAPInvalidCredentialsResult
 from loguru import logger
 
 from app.models.system_model import LdapAttributesMap
-from app.utils.password_tools import aes_decrypt_password, is_decrypt
+from app.utils.password_tools import decrypt_secret
 
 
 def ldap_res(code: int = 1, message=None, data=None):
@@ -46,8 +46,7 @@ class LdapAuthMixin:
                 hosts = [hosts]
             for host in hosts:
                 conn_pool.add(Server(host=host, get_info=None))
-            if is_decrypt(password):
-                password = aes_decrypt_password(password)
+            password = decrypt_secret(password)
             self.conn = Connection(
                 conn_pool,
                 user=user,
@@ -1,26 +1,17 @@
-import json
-
-from app.core.cache import get_redis
+from app.core.sys_settings import load_sys_settings
 from app.models.system_model import ldapConfig, ldapSync
-from app.utils.format_tools import get_dict_target_value
 
 
 def get_ldap_conn_conf() -> ldapConfig:
-    redis = next(get_redis())
-    data = redis.get("sys:settings")
-    config = get_dict_target_value(json.loads(data), "ldap.config")
-    return ldapConfig(**config)
+    return load_sys_settings("ldap").ldap.config.model_copy(deep=True)
 
 
 def get_ldap_sync_conf() -> ldapSync:
-    redis = next(get_redis())
-    data = redis.get("sys:settings")
-    config = get_dict_target_value(json.loads(data), "ldap.sync")
-    return ldapSync(**config)
+    return load_sys_settings("ldap").ldap.sync.model_copy(deep=True)
 
 
 if __name__ == "__main__":
     a = get_ldap_conn_conf()
     print(a)
     attributes = a.attributes
-    print(attributes)
\ No newline at end of file
+    print(attributes)
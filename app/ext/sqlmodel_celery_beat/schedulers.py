@@ -219,7 +219,9 @@ class DatabaseScheduler(Scheduler):
         # DB handling
         self.app = kwargs.get("app") or current_app._get_current_object()
         self.dburi = dburi or self.app.conf.beat_dburi
-        self.engine = create_engine(self.dburi)
+        self.engine = create_engine(
+            self.dburi, **(self.app.conf.get("beat_engine_options") or {})
+        )
         Scheduler.__init__(self, *args, **kwargs)
         self._finalize = Finalize(self, self.sync, exitpriority=5)
         self.max_interval = (
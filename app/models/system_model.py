@@ -7,7 +7,7 @@ from sqlmodel import JSON, Field, SQLModel
 from app.core.base import ModelBase
 from app.core.config import base_path
 from app.ext.ansible_tsk.helper import list_ansible_modules
-from app.utils.password_tools import aes_hash_password
+from app.utils.password_tools import encrypt_secret
 
 
 class generalSettings(SQLModel):
@@ -34,7 +34,7 @@ class generalSettings(SQLModel):
         loose = 3
 
     user_default_password: Optional[str] = Field(
-        default=aes_hash_password("FastApi@2024"), description="用户创建时静态密码"
+        default=encrypt_secret("FastApi@2024"), description="用户创建时静态密码"
     )
     user_default_roles: Optional[list[int]] = Field(
         default=[], description="用户默认角色"
@@ -144,3 +144,7 @@ class TasksHistory(TasksHistoryBase, ModelBase, table=True):
     """
 
     __tablename__ = "tasks_history"
+    # 游标分页按(task_start_time, id)定位
+    __table_args__ = (
+        sa.Index("ix_tasks_history_start_time_id", "task_start_time", "id"),
+    )
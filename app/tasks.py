@@ -1,7 +1,10 @@
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from kombu import Exchange, Queue
 
+from app.core.cache import close_sync_cache, reset_sync_cache
 from app.core.config import settings
+from app.core.database import engine
 from app.ext.sqlmodel_celery_beat.schedulers import DatabaseScheduler
 
 ds = DatabaseScheduler
@@ -23,6 +26,9 @@ config = {
     "enable_utc": settings.CELERY_ENABLE_UTC,
     "timezone": settings.SYS_TIMEZONE,
     "beat_dburi": str(settings.DATABASE_URI),
+    # beat调度器和结果后端各自创建的引擎使用对应角色的连接池配置
+    "beat_engine_options": settings.get_db_pool("beat", "sync").model_dump(),
+    "database_engine_options": settings.get_db_pool("worker", "sync").model_dump(),
     "result_extended": True,
     "result_expires": settings.CELERY_RESULT_EXPIRES,
     # Celery 6.0 Not sure whether to use
@@ -78,5 +84,25 @@ celery.autodiscover_tasks(
     ]
 )
 
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):  # pylint: disable=unused-argument
+    """
+    prefork子进程启动 丢弃从父进程继承的Redis客户端和数据库连接
+    进程内首次使用时重新创建 之后所有任务复用
+    """
+    reset_sync_cache()
+    engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):  # pylint: disable=unused-argument
+    """
+    prefork子进程退出 关闭Redis连接池和数据库连接池
+    """
+    close_sync_cache()
+    engine.dispose()
+
+
 # celery -A app.tasks:celery worker -l info -P eventlet
 # celery -A app.tasks:celery beat -S app.tasks:ds -l info
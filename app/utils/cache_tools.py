@@ -1,10 +1,40 @@
 import asyncio
+import base64
+import functools
+import inspect
 import json
-from builtins import anext
-from typing import Any
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Iterable, Type, TypeVar
 
-from app.core.cache import get_async_redis
-from app.utils.format_tools import get_dict_target_value
+from loguru import logger
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+from redis.asyncio import RedisCluster
+from redis.exceptions import LockError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import (
+    evict_client_tracking,
+    get_async_cache,
+    get_client_tracking,
+    observe_cache,
+)
+from app.core.cache_keys import cache_lock_key
+from app.core.config import settings
+from app.core.database import async_engine
+from app.utils.format_tools import get_dict_target_value, orjson
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 带版本标记的缓存值前缀 正常json和字符串不会以此开头
+CODEC_TAG_PREFIX = "\x1e"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+FuncT = TypeVar("FuncT", bound=Callable[..., Awaitable[Any]])
 
 
 def is_json(data: str | None) -> bool:
@@ -20,21 +50,172 @@ def is_json(data: str | None) -> bool:
     return True
 
 
+class CacheCodec:
+    """
+    缓存序列化基础编解码器 标准库json
+    tag为写入时的版本标记前缀 为空表示标准json 与旧数据及其他json编解码器互通
+    """
+
+    name = "json"
+    tag = ""
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def loads(self, data: str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    """
+    orjson编解码器 输出仍为标准json 不需要版本标记
+    """
+
+    name = "orjson"
+
+    def dumps(self, value: Any) -> str:
+        return orjson.dumps(value).decode()
+
+    def loads(self, data: str) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """
+    msgpack编解码器 redis客户端开启了decode_responses 二进制内容以base64存储
+    """
+
+    name = "msgpack"
+    tag = f"{CODEC_TAG_PREFIX}msgpack1:"
+
+    def dumps(self, value: Any) -> str:
+        packed = msgpack.packb(value)
+        return f"{self.tag}{base64.b64encode(packed).decode()}"
+
+    def loads(self, data: str) -> Any:
+        return msgpack.unpackb(base64.b64decode(data[len(self.tag) :]))
+
+
+def _load_codecs() -> dict[str, CacheCodec]:
+    """
+    可用的编解码器 orjson和msgpack未安装时不可用
+    """
+    codecs: dict[str, CacheCodec] = {"json": CacheCodec()}
+    if orjson is not None:
+        codecs["orjson"] = OrjsonCodec()
+    if msgpack is not None:
+        codecs["msgpack"] = MsgpackCodec()
+    return codecs
+
+
+CACHE_CODECS = _load_codecs()
+# 读取标准json时使用最快的可用实现
+_json_codec = CACHE_CODECS.get("orjson", CACHE_CODECS["json"])
+# 带版本标记的编解码器
+_tagged_codecs = {codec.tag: codec for codec in CACHE_CODECS.values() if codec.tag}
+# 已提示过未安装的编解码器
+_missing_codecs: set[str] = set()
+
+
+def get_cache_codec(name: str | None = None) -> CacheCodec:
+    """
+    获取编解码器 默认使用配置中的CACHE_CODEC 未安装时回退到json
+    """
+    name = name or settings.CACHE_CODEC
+    codec = CACHE_CODECS.get(name)
+    if codec is None:
+        if name not in _missing_codecs:
+            _missing_codecs.add(name)
+            logger.warning(f"Cache codec {name} not installed, fallback to json")
+        codec = CACHE_CODECS["json"]
+    return codec
+
+
+def _tagged_codec(data: str) -> CacheCodec | None:
+    """
+    根据版本标记查找编解码器 无标记返回None
+    """
+    if not data.startswith(CODEC_TAG_PREFIX):
+        return None
+    tag = data[: data.find(":") + 1]
+    if tag not in _tagged_codecs:
+        raise ValueError(f"Unsupported cache codec tag {tag!r}")
+    return _tagged_codecs[tag]
+
+
+def loads_redis_data(data: str | None, value_key: str | None = None) -> Any:
+    """
+    解析redis中读取的数据 只解析一次 非json原样返回
+    value_key : 如果是个json可直接查找json里的字段
+    """
+    if not data:
+        return None
+    codec = _tagged_codec(data)
+    try:
+        data = codec.loads(data) if codec else _json_codec.loads(data)
+    except ValueError:
+        return data
+    if value_key and isinstance(data, dict):
+        return get_dict_target_value(data, value_key)
+    return data
+
+
+def dumps_redis_data(value: Any, codec: str | None = None) -> Any:
+    """
+    dict和list按配置的编解码器序列化 其他类型原样写入
+    """
+    if isinstance(value, (dict, list)):
+        return get_cache_codec(codec).dumps(value)
+    return value
+
+
+def loads_redis_model(data: str | None, model: Type[ModelT]) -> ModelT | None:
+    """
+    解析redis中读取的数据为模型 标准json直接model_validate_json
+    """
+    if not data:
+        return None
+    codec = _tagged_codec(data)
+    if codec:
+        return model.model_validate(codec.loads(data))
+    return model.model_validate_json(data)
+
+
+def dumps_redis_model(value: BaseModel, codec: str | None = None) -> str:
+    """
+    模型按配置的编解码器序列化 标准json直接model_dump_json
+    """
+    _codec = get_cache_codec(codec)
+    if not _codec.tag:
+        return value.model_dump_json()
+    return _codec.dumps(value.model_dump(mode="json"))
+
+
 async def redis_exists_key(key: str) -> bool:
     """
     key : reids中的key
     判断key是否存在，数据为空也视为不存在
     """
-    _c = get_async_redis()
-    cache = await anext(_c)
-    # 返回值1和0
-    state = await cache.exists(key)
-    if not state:
-        return False
-    data = await cache.get(key)
-    if not data:
-        return False
-    return True
+    cache = await get_async_cache()
+    # 不存在时返回None 单次GET同时判断存在和非空
+    data = await observe_cache(key, "get", cache.get(key), read=True)
+    return bool(data)
+
+
+async def get_redis_raw(key: str) -> str | None:
+    """
+    key : reids中的key
+    读取原始数据 开启客户端缓存时优先读取进程内缓存
+    """
+    cache = await get_async_cache()
+    tracking = get_client_tracking()
+
+    def load() -> Awaitable[str | None]:
+        return observe_cache(key, "get", cache.get(key), read=True)
+
+    if tracking is None:
+        return await load()
+    return await tracking.fetch(key, "get", load)
 
 
 async def get_redis_data(key: str, value_key: str | None = None) -> Any:
@@ -42,20 +223,8 @@ async def get_redis_data(key: str, value_key: str | None = None) -> Any:
     key : reids中的key
     value_key : 如果是个json可直接查找json里的字段
     """
-    _c = get_async_redis()
-    cache = await anext(_c)
-    try:
-        is_empty = await redis_exists_key(key)
-        if not is_empty:
-            return None
-        data = await cache.get(key)
-        if is_json(data):
-            data = json.loads(data)
-            if value_key:
-                return get_dict_target_value(data, value_key)
-        return data
-    except Exception as e:
-        raise e
+    data = await get_redis_raw(key)
+    return loads_redis_data(data, value_key)
 
 
 async def set_redis_data(key: str, value: str | dict, **kwargs) -> None:
@@ -63,17 +232,315 @@ async def set_redis_data(key: str, value: str | dict, **kwargs) -> None:
     key : reids中的key
     value : 要存的数据
     """
-    _c = get_async_redis()
-    cache = await anext(_c)
+    cache = await get_async_cache()
+    data = dumps_redis_data(value)
+    await observe_cache(key, "set", cache.set(key, data, **kwargs), write=data)
+    evict_client_tracking([key])
+
+
+async def get_redis_model(key: str, model: Type[ModelT]) -> ModelT | None:
+    """
+    key : reids中的key
+    model : 解析的模型 不存在返回None
+    """
+    cache = await get_async_cache()
+    data = await observe_cache(key, "get", cache.get(key), read=True)
+    return loads_redis_model(data, model)
+
+
+async def set_redis_model(key: str, value: BaseModel, **kwargs) -> None:
+    """
+    key : reids中的key
+    value : 要存的模型
+    """
+    cache = await get_async_cache()
+    data = dumps_redis_model(value)
+    await observe_cache(key, "set", cache.set(key, data, **kwargs), write=data)
+    evict_client_tracking([key])
+
+
+async def get_redis_hash(key: str, fields: Iterable[str] | None = None) -> dict:
+    """
+    key : reids中hash类型的key
+    fields : 需要读取的字段 为None时读取全部
+    每个字段单独解析json 只传输需要的字段
+    """
+    cache = await get_async_cache()
+    tracking = get_client_tracking()
+    if fields is None:
+
+        def load() -> Awaitable[dict]:
+            return observe_cache(key, "hgetall", cache.hgetall(key), read=True)
+
+        variant = "hgetall"
+    else:
+        fields = list(fields)
+
+        def load() -> Awaitable[list]:
+            return observe_cache(key, "hmget", cache.hmget(key, fields), read=True)
+
+        variant = ("hmget", *fields)
+    data = (
+        await load() if tracking is None else await tracking.fetch(key, variant, load)
+    )
+    if fields is not None:
+        data = dict(zip(fields, data))
+    return {k: loads_redis_data(v) for k, v in data.items() if v is not None}
+
+
+async def get_many_redis_data(keys: Iterable[str]) -> list[Any]:
+    """
+    keys : reids中的key列表
+    单次MGET批量读取 返回值顺序与keys一致 不存在为None
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+    cache = await get_async_cache()
+    if isinstance(cache, RedisCluster):
+        # 集群模式key可能分布在不同slot
+        call = cache.mget_nonatomic(keys)
+    else:
+        call = cache.mget(keys)
+    values = await observe_cache(keys, "mget", call, read=True)
+    return [loads_redis_data(value) for value in values]
+
+
+async def set_many_redis_data(mapping: dict[str, Any], ex: int | None = None) -> None:
+    """
+    mapping : {key: value}
+    ex : 过期时间(秒) 为None不过期
+    pipeline单次往返批量写入
+    """
+    if not mapping:
+        return
+    cache = await get_async_cache()
+    pipe = cache.pipeline(transaction=False)
+    data = {key: dumps_redis_data(value) for key, value in mapping.items()}
+    for key, value in data.items():
+        pipe.set(key, value, ex=ex)
+    await observe_cache(list(data), "pipeline_set", pipe.execute(), write=data)
+    evict_client_tracking(list(data))
+
+
+async def delete_many_redis_data(keys: Iterable[str]) -> int:
+    """
+    keys : reids中的key列表
+    单次DEL批量删除 返回删除数量
+    集群模式由客户端按slot分组 每个slot一条DEL 通过pipeline按节点并行发送
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+    cache = await get_async_cache()
     try:
-        if isinstance(value, dict):
-            value = json.dumps(value)
-        await cache.set(key, value, **kwargs)
-    except Exception as e:
-        raise e
+        return await observe_cache(keys, "delete", cache.delete(*keys))
+    finally:
+        evict_client_tracking(keys)
+
+
+async def delete_redis_pattern(pattern: str) -> int:
+    """
+    pattern : 匹配的key 例如 auth:menus:*
+    SCAN遍历后批量删除 返回删除数量 只用于低频的写操作
+    """
+    cache = await get_async_cache()
+    keys = [key async for key in cache.scan_iter(match=pattern, count=500)]
+    return await delete_many_redis_data(keys)
+
+
+# 进程内每个key的单飞锁 无人持有时自动回收
+_cached_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+    weakref.WeakValueDictionary()
+)
+# 正在后台刷新的key
+_cached_refreshing: set[str] = set()
+# 后台刷新任务 保持引用避免未完成时被回收
+_cached_refresh_tasks: set[asyncio.Task] = set()
+
+
+def _format_cache_key(template: str, arguments: dict) -> str:
+    """
+    使用函数参数格式化缓存key 列表参数排序去重后以逗号拼接
+    """
+    values = {
+        k: (
+            ",".join(map(str, sorted(set(v))))
+            if isinstance(v, (list, tuple, set))
+            else v
+        )
+        for k, v in arguments.items()
+    }
+    return template.format(**values)
+
+
+def _loads_cached(data: str | None) -> dict | None:
+    """
+    解析缓存的数据 格式不符(旧数据)视为未命中
+    """
+    value = loads_redis_data(data)
+    if isinstance(value, dict) and value.keys() == {"data", "refresh_at"}:
+        return value
+    return None
+
+
+def cached(
+    key: str,
+    ttl: int | None = 300,
+    codec: str | None = None,
+    negative_ttl: int | None = None,
+    soft_ttl: int | None = None,
+    lock_timeout: int = 10,
+) -> Callable[[FuncT], FuncT]:
+    """
+    cache-aside装饰器 未命中时加载并写入缓存
+    key : 缓存key模版 使用函数参数格式化 例如 auth:menus:roles:{roles_id}
+    ttl : 过期时间(秒) 为None不过期
+    codec : 序列化方式 默认使用配置中的CACHE_CODEC
+    negative_ttl : 加载结果为None时的缓存时间 为None不缓存空结果
+    soft_ttl : 超过该时间(秒)后返回旧数据并在后台刷新
+    lock_timeout : 单飞锁超时时间(秒)
+    同一个key同时只有一个加载者 进程内使用asyncio锁 进程间使用redis锁
+    返回值需要可转换为json 被装饰函数增加cache_key/invalidate/invalidate_all方法
+    """
+
+    def decorator(func: FuncT) -> FuncT:
+        signature = inspect.signature(func)
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            return _format_cache_key(key, bound.arguments)
+
+        async def store(_key: str, value: Any) -> None:
+            if value is None and not negative_ttl:
+                return
+            ex = negative_ttl if value is None else ttl
+            refresh_at = time.time() + soft_ttl if soft_ttl else None
+            envelope = {"data": to_jsonable_python(value), "refresh_at": refresh_at}
+            cache = await get_async_cache()
+            data = dumps_redis_data(envelope, codec)
+            await observe_cache(_key, "set", cache.set(_key, data, ex=ex), write=data)
+            evict_client_tracking([_key])
+
+        async def load(_key: str, args: tuple, kwargs: dict, blocking: bool) -> Any:
+            cache = await get_async_cache()
+            lock = cache.lock(
+                cache_lock_key(_key),
+                timeout=lock_timeout,
+                blocking=blocking,
+                blocking_timeout=lock_timeout,
+            )
+            locked = await lock.acquire()
+            if not locked and not blocking:
+                return None
+            try:
+                if locked and blocking:
+                    # 等待期间其他进程可能已经写入
+                    hit = _loads_cached(await cache.get(_key))
+                    if hit is not None:
+                        return hit["data"]
+                value = to_jsonable_python(await func(*args, **kwargs))
+                await store(_key, value)
+                return value
+            finally:
+                if locked:
+                    try:
+                        await lock.release()
+                    except LockError:
+                        # 加载超过lock_timeout 锁已过期
+                        pass
+
+        async def refresh(_key: str, args: tuple, kwargs: dict) -> None:
+            # 请求结束后原会话会关闭 使用新的数据库会话
+            sessions = []
+            bound = signature.bind(*args, **kwargs)
+            for name, value in bound.arguments.items():
+                if isinstance(value, AsyncSession):
+                    session = AsyncSession(bind=async_engine, expire_on_commit=False)
+                    sessions.append(session)
+                    bound.arguments[name] = session
+            try:
+                await load(_key, bound.args, bound.kwargs, blocking=False)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Cache Refresh Error {_key} - {e}")
+            finally:
+                _cached_refreshing.discard(_key)
+                for session in sessions:
+                    await session.close()
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            _key = cache_key(*args, **kwargs)
+            hit = _loads_cached(await get_redis_raw(_key))
+            if hit is not None:
+                refresh_at = hit["refresh_at"]
+                if (
+                    refresh_at
+                    and refresh_at < time.time()
+                    and _key not in _cached_refreshing
+                ):
+                    _cached_refreshing.add(_key)
+                    task = asyncio.create_task(refresh(_key, args, kwargs))
+                    _cached_refresh_tasks.add(task)
+                    task.add_done_callback(_cached_refresh_tasks.discard)
+                return hit["data"]
+            lock = _cached_locks.setdefault(_key, asyncio.Lock())
+            async with lock:
+                # 等待期间同进程的其他请求可能已经写入
+                cache = await get_async_cache()
+                hit = _loads_cached(await cache.get(_key))
+                if hit is not None:
+                    return hit["data"]
+                return await load(_key, args, kwargs, blocking=True)
+
+        async def invalidate(*args, **kwargs) -> int:
+            return await delete_many_redis_data([cache_key(*args, **kwargs)])
+
+        async def invalidate_all() -> int:
+            return await delete_redis_pattern(f"{key.split('{')[0]}*")
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        wrapper.invalidate_all = invalidate_all
+        return wrapper
+
+    return decorator
+
+
+def _bench_codecs(number: int = 2000) -> None:
+    """
+    各编解码器序列化耗时对比 python -m app.utils.cache_tools
+    """
+    from app.core.sys_settings import SettingsSnapshot
+    from app.models.tasks_model import TasksHistory
+
+    payloads = {
+        "TasksHistory": TasksHistory(
+            task_id="bench", task_name="bench", task_kwargs={"hosts": list(range(50))}
+        ).model_dump(mode="json"),
+        "SystemSettings": SettingsSnapshot().model_dump(mode="json"),
+    }
+    for payload_name, payload in payloads.items():
+        for codec in CACHE_CODECS.values():
+            data = codec.dumps(payload)
+            start = time.perf_counter()
+            for _ in range(number):
+                codec.dumps(payload)
+            dumps_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(number):
+                codec.loads(data)
+            loads_time = time.perf_counter() - start
+            print(
+                f"{payload_name:<16}{codec.name:<10}size={len(data):<8}"
+                f"dumps={dumps_time * 1e6 / number:.1f}us "
+                f"loads={loads_time * 1e6 / number:.1f}us"
+            )
 
 
 if __name__ == "__main__":
-    asyncio.run(get_redis_data("sys:settings", "channels.email"))
+    _bench_codecs()
+    # asyncio.run(get_redis_hash("sys:settings", ["channels"]))
     # asyncio.run(set_redis_data('k1', {'a': 1, 'b': 2}, ex=200))
     # asyncio.run(redis_exists_key('sys:settings'))
@@ -1,10 +1,14 @@
 import base64
 import re
+import time
 
 from Crypto.Cipher import AES
 
 from app.core.config import settings
 
+# 解密后需要去除的非法字符
+ILLEGAL_CHARS = re.compile("[\\x00-\\x08\\x0b-\\x0c\\x0e-\\x1f\n\r\t]")
+
 
 class AESCBC:
     """
@@ -19,6 +23,15 @@ class AESCBC:
             self.bs - len(s) % self.bs
         )
 
+    def _decrypt_text(self, meg: bytes) -> str:
+        # 去除解码后的非法字符
+        return ILLEGAL_CHARS.sub("", meg.decode())
+
+    @staticmethod
+    def _b64decode(text: str) -> bytes:
+        text += (len(text) % 4) * "="
+        return base64.b64decode(text)  # 输出Base64
+
     def encrypt(self, text) -> dict:
         """
         加密
@@ -40,19 +53,41 @@ class AESCBC:
         """
         try:
             generator = AES.new(self.key, self.mode, self.IV)
-            text += (len(text) % 4) * "="
-            decrpyt_bytes = base64.b64decode(text)  # 输出Base64
+            decrpyt_bytes = self._b64decode(text)
             # decrpyt_bytes = binascii.a2b_hex(text)  # 输出Hex
             meg = generator.decrypt(decrpyt_bytes)
-            # 去除解码后的非法字符
-            data = re.compile("[\\x00-\\x08\\x0b-\\x0c\\x0e-\\x1f\n\r\t]").sub(
-                "", meg.decode()
-            )
-            result = {"code": 1, "data": data}
+            result = {"code": 1, "data": self._decrypt_text(meg)}
         except Exception as e: # pylint: disable=W0718:broad-exception-caught
             result = {"code": 0, "data": e}
         return result
 
+    def encrypt_many(self, texts: list[str]) -> list[dict]:
+        """
+        批量加密 返回与texts顺序一致的结果 单个失败不影响其他
+        """
+        return [self.encrypt(text) for text in texts]
+
+    def decrypt_many(self, texts: list[str]) -> list[dict]:
+        """
+        批量解密 返回与texts顺序一致的结果 单个失败不影响其他
+        """
+        return [self.decrypt(text) for text in texts]
+
+
+def _bench_aes(number: int = 20000) -> None:
+    """
+    AES加解密耗时 python -m app.utils.encryption
+    """
+    aes = AESCBC(settings.SECRET_KEY, settings.SECRET_IV)
+    text = "FastApi@2024"
+    data = aes.encrypt(text)["data"]
+    for name, func in (("encrypt", aes.encrypt), ("decrypt", aes.decrypt)):
+        value = text if name == "encrypt" else data
+        start = time.perf_counter()
+        for _ in range(number):
+            func(value)
+        print(f"{name:<8}{(time.perf_counter() - start) / number * 1e6:.1f}us")
+
 
 if __name__ == "__main__":
     aes = AESCBC(settings.SECRET_KEY, settings.SECRET_IV)
@@ -61,3 +96,5 @@ if __name__ == "__main__":
     str2 = aes.decrypt(str1["data"])
     print(str1)
     print(str2)
+    print(aes.decrypt_many([str1["data"], to_encrypt, str1["data"]]))
+    _bench_aes()
@@ -1,7 +1,31 @@
+import json
 from typing import Any, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps_bytes(value: Any) -> bytes:
+    """
+    紧凑格式的json序列化 安装了orjson时使用orjson
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def json_loads(data: bytes | str) -> Any:
+    """
+    json反序列化 安装了orjson时使用orjson
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def get_dict_target_value(data: dict, key: str | None) -> Any:
     """
@@ -1,4 +1,7 @@
-from typing import List
+import ipaddress
+import time
+from bisect import bisect_right
+from typing import Iterable, List
 
 from IPy import IP
 
@@ -42,6 +45,66 @@ def is_ip_in_range(ip, ip_range, divide: str = "-") -> bool:
         return False
 
 
+def parse_ip_entry(entry: str, divide: str = "-") -> tuple[int, int, int]:
+    """
+    解析IP列表中的一项为整数区间
+    entry : IP地址 IP地址/掩码 IP地址-IP地址
+    return: (IP版本, 起始IP, 结束IP) 不符合规范时抛出ValueError
+    """
+    if not is_ip(entry):
+        if divide not in entry:
+            raise ValueError(entry)
+        start_ip, end_ip = ip_range_to_tuple(entry, divide)
+        if not is_ip(start_ip) or not is_ip(end_ip):
+            raise ValueError(entry)
+        start, end = IP(start_ip), IP(end_ip)
+        if start.version() != end.version() or start >= end:
+            raise ValueError(entry)
+        return start.version(), start.int(), end.int()
+    network = IP(entry)
+    return network.version(), network.int(), network.int() + network.len() - 1
+
+
+class IpMatcher:
+    """
+    编译后的IP列表 IPv4和IPv6分别合并为有序不重叠的整数区间
+    查找时二分 耗时与列表长度无关
+    """
+
+    def __init__(self, ip_list: Iterable[str], divide: str = "-"):
+        ranges: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        for entry in ip_list:
+            version, start, end = parse_ip_entry(entry, divide)
+            ranges[version].append((start, end))
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        for version, items in ranges.items():
+            merged: list[list[int]] = []
+            for start, end in sorted(items):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts[4]) + len(self._starts[6])
+
+    def __contains__(self, ip: str) -> bool:
+        """
+        ip : 客户端IP 不符合规范时视为不匹配
+        """
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        value = int(address)
+        starts = self._starts[address.version]
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= self._ends[address.version][index]
+
+
 async def check_ip_list(
     ip_list: List[str], divide: str = "-"
 ) -> tuple[bool, str | None]:
@@ -50,27 +113,42 @@ async def check_ip_list(
     ip_list : ['192.168.1.1', '192.168.1.2']
     divide : '-'
     """
-    check_state = True
-    failed_ip = None
     for ip in ip_list:
-        if not is_ip(ip):
-            if not divide in ip:
-                check_state = False
-                failed_ip = ip
-                break
-            else:
-                start_ip, end_ip = ip_range_to_tuple(ip)
-                if not is_ip(start_ip) or not is_ip(end_ip):
-                    check_state = False
-                    failed_ip = ip
-                    break
-                if IP(start_ip) >= IP(end_ip):
-                    check_state = False
-                    failed_ip = ip
-                    break
-    return check_state, failed_ip
+        try:
+            parse_ip_entry(ip, divide)
+        except ValueError:
+            return False, ip
+    return True, None
+
+
+def _bench_ip_matcher(number: int = 20000) -> None:
+    """
+    不同列表长度下的查找耗时 python -m app.utils.ipaddress_tools
+    """
+    for size in (10, 100, 1000, 5000):
+        # 网段和IP范围各占一半
+        ip_list = [
+            (
+                f"10.{i // 256}.{i % 256}.0/24"
+                if i % 2
+                else f"10.{i // 256}.{i % 256}.1-10.{i // 256}.{i % 256}.200"
+            )
+            for i in range(size)
+        ]
+        start = time.perf_counter()
+        matcher = IpMatcher(ip_list)
+        compile_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(number):
+            "192.168.1.1" in matcher  # pylint: disable=pointless-statement
+        lookup_time = time.perf_counter() - start
+        print(
+            f"size={size:<6}compile={compile_time * 1000:.1f}ms "
+            f"lookup={lookup_time * 1e6 / number:.2f}us"
+        )
 
 
 if __name__ == "__main__":
     a = is_ip_in_range("192.168.1.1", "192.168.1.1-192.168.1.255")
     print(a)
+    _bench_ip_matcher()
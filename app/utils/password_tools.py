@@ -1,7 +1,10 @@
+import asyncio
 import hashlib
+import hmac
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-from jose import jwt
 from loguru import logger
 from passlib import pwd
 from passlib.context import CryptContext
@@ -13,6 +16,15 @@ from app.utils.encryption import AESCBC
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # aes加密密码可解密为明文
 aeshash = AESCBC(settings.SECRET_KEY, settings.SECRET_IV)
+# 系统配置中加密密钥的版本标记 base64不含$ 不会与密文冲突
+AES_SECRET_MARKER = "$aes1$"
+# 系统配置密钥的解密结果 {密文: 明文} 配置版本变化时清空
+_secret_cache: dict[str, str] = {}
+_secret_version: int | None = None
+# 密码哈希和校验的线程池 bcrypt计算时释放GIL 不阻塞事件循环
+crypto_executor = ThreadPoolExecutor(
+    max_workers=settings.CRYPTO_MAX_WORKERS, thread_name_prefix="crypto"
+)
 
 
 def random_str(text: str = None) -> str:
@@ -47,6 +59,42 @@ def get_password_hash(password) -> str:
     return pwd_context.hash(password)
 
 
+async def async_verify_password(plain_password, hashed_password) -> bool:
+    """
+    在线程池中验证密码
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        crypto_executor, verify_password, plain_password, hashed_password
+    )
+
+
+async def async_get_password_hash(password) -> str:
+    """
+    在线程池中加密密码
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(crypto_executor, get_password_hash, password)
+
+
+def hmac_sign(message: str) -> str:
+    """
+    使用JWT密钥的HMAC-SHA256签名
+    """
+    return hmac.new(
+        settings.SECRET_JWT_KEY.encode(), message.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def hmac_verify(message: str, signature: str | None) -> bool:
+    """
+    验证HMAC-SHA256签名 常量时间比较
+    """
+    if not signature:
+        return False
+    return hmac.compare_digest(hmac_sign(message), signature)
+
+
 def aes_hash_password(password) -> str:
     """
     AES密码加密
@@ -67,7 +115,7 @@ def aes_decrypt_password(hash_password) -> str:
     :return:
     """
 
-    hash_res = aeshash.decrypt(hash_password)
+    hash_res = aeshash.decrypt(hash_password.removeprefix(AES_SECRET_MARKER))
     if hash_res.get("code"):
         return hash_res.get("data")
     logger.error(f"AES解密失败 {hash_res.get('data')}")
@@ -82,15 +130,34 @@ def aes_verify_password(password, old_password) -> bool:
     :return:
     """
     re_password = aes_hash_password(password)
-    if re_password == old_password:
+    if re_password == old_password.removeprefix(AES_SECRET_MARKER):
         return True
     return False
 
 
+def encrypt_secret(secret) -> str:
+    """
+    加密系统配置中的密钥 带版本标记 判断是否加密时无需解密
+    """
+    return f"{AES_SECRET_MARKER}{aes_hash_password(secret)}"
+
+
+def strip_secret_marker(text):
+    """
+    去除密钥的版本标记 返回给客户端的仍是旧格式的密文
+    """
+    if isinstance(text, str):
+        return text.removeprefix(AES_SECRET_MARKER)
+    return text
+
+
 def is_decrypt(text) -> bool:
     """
     判读密码是否能正常解密 能解密说明已经加密过
+    带版本标记的直接返回 旧数据尝试解密
     """
+    if isinstance(text, str) and text.startswith(AES_SECRET_MARKER):
+        return True
     try:
         aes_decrypt_password(text)
         return True
@@ -98,22 +165,73 @@ def is_decrypt(text) -> bool:
         return False
 
 
-def jwt_decode(token, verify_exp=True) -> str:
+def clear_secret_cache(version: int | None = None) -> None:
     """
-    jwt解密
-    :param token:
-    :param verify_exp:
-    :return:
+    系统配置版本变化时清空密钥解密缓存
     """
+    global _secret_version  # pylint: disable=global-statement
+    if version is not None and version == _secret_version:
+        return
+    _secret_cache.clear()
+    _secret_version = version
 
-    # token解密
-    payload = jwt.decode(
-        token,
-        settings.SECRET_JWT_KEY,
-        algorithms=[settings.SECRET_JWT_ALGORITHM],
-        options={"verify_exp": verify_exp},
-    )
-    return payload
+
+def decrypt_secret(text) -> str:
+    """
+    解密系统配置中的密钥 未加密的原样返回
+    同一配置版本内缓存解密结果
+    """
+    if not text:
+        return text
+    secret = _secret_cache.get(text)
+    if secret is None:
+        secret = aes_decrypt_password(text) if is_decrypt(text) else text
+        _secret_cache[text] = secret
+    return secret
+
+
+def _bench_login_storm(logins: int = 20, interval: float = 0.001) -> None:
+    """
+    登录风暴期间无关请求的事件循环延迟 python -m app.utils.password_tools
+    inline为在事件循环中直接bcrypt校验 executor为在crypto线程池中校验
+    """
+    password = "FastApi@2024"
+    hashed = get_password_hash(password)
+
+    async def inline_verify() -> bool:
+        return verify_password(password, hashed)
+
+    async def executor_verify() -> bool:
+        return await async_verify_password(password, hashed)
+
+    async def run(verify) -> list[float]:
+        delays: list[float] = []
+        done = asyncio.Event()
+
+        async def probe() -> None:
+            # 模拟无关请求 每次睡眠interval 超出部分即为等待事件循环的时间
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                delays.append(time.perf_counter() - start - interval)
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.sleep(interval * 2)
+        await asyncio.gather(*(verify() for _ in range(logins)))
+        done.set()
+        await probe_task
+        return sorted(delays)
+
+    for name, verify in (("inline", inline_verify), ("executor", executor_verify)):
+        start = time.perf_counter()
+        delays = asyncio.run(run(verify))
+        elapsed = time.perf_counter() - start
+        p50 = delays[len(delays) // 2]
+        p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))]
+        print(
+            f"{name:<10}logins={logins} total={elapsed:.2f}s "
+            f"unrelated p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms"
+        )
 
 
 if __name__ == "__main__":
@@ -121,3 +239,4 @@ if __name__ == "__main__":
     print(test)
     print(is_decrypt("zcqeqzyablobbfhc"))
     print(generate_password(12))
+    _bench_login_storm()
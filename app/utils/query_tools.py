@@ -0,0 +1,57 @@
+from typing import Any, Iterable
+
+from sqlalchemy import func
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def load_related_ids(
+    session: AsyncSession,
+    key_column: Any,
+    value_column: Any,
+    keys: Iterable[Any],
+) -> dict[Any, list[Any]]:
+    """
+    批量查询关联ID 一次IN查询后按key分组
+    例: load_related_ids(session, UsersRolesLink.auth_users_id,
+        UsersRolesLink.auth_roles_id, users_id) -> {用户ID: [角色ID]}
+    keys中没有关联数据的返回空列表
+    """
+    keys = list(dict.fromkeys(keys))
+    result: dict[Any, list[Any]] = {key: [] for key in keys}
+    if not keys:
+        return result
+    rows = (
+        await session.exec(
+            select(key_column, value_column)
+            .where(col(key_column).in_(keys))
+            .order_by(key_column, value_column)
+        )
+    ).all()
+    for key, value in rows:
+        result[key].append(value)
+    return result
+
+
+async def count_related(
+    session: AsyncSession, key_column: Any, keys: Iterable[Any]
+) -> dict[Any, int]:
+    """
+    批量统计关联数量 一次GROUP BY查询
+    例: count_related(session, UsersRolesLink.auth_roles_id, roles_id) -> {角色ID: 用户数}
+    keys中没有关联数据的返回0
+    """
+    keys = list(dict.fromkeys(keys))
+    result: dict[Any, int] = {key: 0 for key in keys}
+    if not keys:
+        return result
+    rows = (
+        await session.exec(
+            select(key_column, func.count())
+            .where(col(key_column).in_(keys))
+            .group_by(key_column)
+        )
+    ).all()
+    for key, count in rows:
+        result[key] = count
+    return result
@@ -0,0 +1,60 @@
+import fakeredis
+import pytest
+from redis.asyncio import RedisCluster
+
+from app.core import cache
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def redis_server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+async def redis_cache(monkeypatch, redis_server):
+    """
+    进程内共享的aioRedis客户端替换为fakeredis
+    """
+    client = fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True)
+    monkeypatch.setattr(cache, "_async_cache", client)
+    yield client
+    await client.aclose()
+
+
+class FakeRedisCluster(RedisCluster):
+    """
+    命令转发到单个fakeredis节点的集群客户端
+    与redis 5.0.3的asyncio集群客户端一样没有publish
+    """
+
+    def __init__(self, node: fakeredis.FakeAsyncRedis):
+        # pylint: disable-next=super-init-not-called
+        object.__setattr__(self, "_node", node)
+
+    def __getattribute__(self, name: str):
+        if name == "publish":
+            raise AttributeError(name)
+        return getattr(object.__getattribute__(self, "_node"), name)
+
+
+@pytest.fixture
+async def cluster_cache(monkeypatch, redis_server, redis_cache):
+    """
+    集群模式的共享客户端 订阅和发布使用同一个fakeredis服务的节点客户端
+    """
+
+    async def pubsub_node() -> fakeredis.FakeAsyncRedis:
+        return fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True)
+
+    monkeypatch.setattr(cache, "_async_cache", FakeRedisCluster(redis_cache))
+    monkeypatch.setattr(cache, "get_async_pubsub_redis", pubsub_node)
+    yield redis_cache
+    # pylint: disable=protected-access
+    if cache._publish_node is not None:
+        await cache._publish_node.aclose()
+        cache._publish_node = None
@@ -0,0 +1,127 @@
+import random
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import load_only
+from sqlmodel import Field, SQLModel, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.base import PagingQueryBase, PagingQueryBaseModel
+
+pytestmark = pytest.mark.anyio
+
+
+class KeysetItem(SQLModel, table=True):
+    __tablename__ = "test_keyset_item"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    score: Optional[int] = Field(default=None, nullable=True)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(KeysetItem.__table__.create)
+    rng = random.Random(7)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        # 排序字段有重复值和NULL
+        session.add_all(
+            KeysetItem(id=i, score=rng.choice([None, 1, 2, 3, 5, 8]))
+            for i in range(1, 38)
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+def _expected(items: list[KeysetItem], desc: bool) -> list[int]:
+    # NULL小于任何值 与MySQL和SQLite一致
+    ordered = sorted(
+        items, key=lambda item: (item.score is not None, item.score or 0, item.id)
+    )
+    if desc:
+        ordered.reverse()
+    return [item.id for item in ordered]
+
+
+async def _page(session, order_by, cursor: str) -> PagingQueryBaseModel:
+    paging = PagingQueryBase(
+        {}, order_by, 5, 1, KeysetItem, PagingQueryBaseModel, cursor=cursor
+    )
+    return await paging.query(session)
+
+
+@pytest.mark.parametrize("desc", [True, False])
+async def test_keyset_pages(session, desc):
+    items = (await session.exec(KeysetItem.__table__.select())).all()
+    expected = _expected(items, desc)
+    order_by = col(KeysetItem.score).desc() if desc else col(KeysetItem.score)
+    pages = []
+    result = await _page(session, order_by, "")
+    while True:
+        pages.append(result)
+        if not result.next_cursor:
+            break
+        result = await _page(session, order_by, result.next_cursor)
+    assert [item.id for page in pages for item in page.result] == expected
+    assert pages[0].prev_cursor is None
+    assert not pages[-1].has_more
+    # 向前翻页回到上一页
+    for previous, current in zip(pages, pages[1:]):
+        back = await _page(session, order_by, current.prev_cursor)
+        assert [item.id for item in back.result] == [
+            item.id for item in previous.result
+        ]
+
+
+async def test_invalid_cursor(session):
+    for cursor in ("@@", PagingQueryBase.encode_cursor([1], 1, "next")):
+        with pytest.raises(HTTPException) as exc:
+            await _page(session, col(KeysetItem.score), cursor)
+        assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("page", [1, 2, 3])
+async def test_window_count_matches_exact(session, page):
+    where = col(KeysetItem.score).is_not(None)
+    order_by = col(KeysetItem.id).desc()
+    exact = await PagingQueryBase(
+        {}, order_by, 5, page, KeysetItem, PagingQueryBaseModel
+    ).query(session, where)
+    session.expunge_all()
+    window = await PagingQueryBase(
+        {},
+        order_by,
+        5,
+        page,
+        KeysetItem,
+        PagingQueryBaseModel,
+        count_mode="window",
+        options=[load_only(KeysetItem.id)],
+    ).query(session, where)
+    assert [item.id for item in window.result] == [item.id for item in exact.result]
+    assert (window.total, window.page_total, window.has_more) == (
+        exact.total,
+        exact.page_total,
+        exact.has_more,
+    )
+    # 查询选项仍然生效 未加载的列不在实例中
+    assert all("score" not in item.__dict__ for item in window.result)
+
+
+async def test_window_count_out_of_range(session):
+    paging = PagingQueryBase(
+        {},
+        col(KeysetItem.id),
+        5,
+        99,
+        KeysetItem,
+        PagingQueryBaseModel,
+        count_mode="window",
+    )
+    with pytest.raises(HTTPException) as exc:
+        await paging.query(session)
+    assert exc.value.status_code == 400
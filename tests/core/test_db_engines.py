@@ -0,0 +1,43 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import check_indexes
+
+pytestmark = pytest.mark.anyio
+
+
+def _table(metadata: sa.MetaData, *indexes: sa.Index) -> sa.Table:
+    return sa.Table(
+        "test_index_item",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("start_time", sa.DateTime),
+        *indexes,
+    )
+
+
+async def test_check_indexes_reports_missing_index():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    # 旧版本建的表没有索引
+    old = sa.MetaData()
+    _table(old)
+    async with engine.begin() as conn:
+        await conn.run_sync(old.create_all)
+    new = sa.MetaData()
+    table = _table(
+        new, sa.Index("ix_test_index_item_start_time_id", "start_time", "id")
+    )
+    # 数据库中不存在的表由create_all创建 不检查
+    sa.Table("test_index_other", new, sa.Column("id", sa.Integer, primary_key=True))
+    # create_all不会给已存在的表补建索引
+    async with engine.begin() as conn:
+        await conn.run_sync(new.create_all)
+    assert await check_indexes(new, engine) == [
+        "CREATE INDEX ix_test_index_item_start_time_id "
+        "ON test_index_item (start_time, id)"
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(next(iter(table.indexes)).create)
+    assert await check_indexes(new, engine) == []
+    await engine.dispose()
@@ -0,0 +1,51 @@
+import pytest
+
+from app.core import permission
+from app.core.cache_keys import PERMISSION_CHANNEL
+from app.core.permission import ALL_PERMISSIONS, SUPER_ROLE_ID, PermissionMap
+
+MENUS = [(10, "users_list"), (11, "users_add"), (12, "roles_list")]
+
+
+def test_permission_map():
+    permission_map = PermissionMap(
+        MENUS,
+        roles=[SUPER_ROLE_ID, 2, 3],
+        roles_menus=[(2, 10), (2, 11), (3, 12), (4, 12)],
+        users_roles=[(100, 2), (101, 3), (102, SUPER_ROLE_ID)],
+        route_names=["users_list", "users_add", "roles_list", "hosts_list"],
+    )
+    users = permission_map.roles_bits([2])
+    assert permission_map.allowed(users, "users_list")
+    assert permission_map.allowed(users, "users_add")
+    assert not permission_map.allowed(users, "roles_list")
+    # 停用的角色没有权限
+    assert permission_map.roles_bits([4]) == 0
+    assert permission_map.roles_bits([SUPER_ROLE_ID]) == ALL_PERMISSIONS
+    assert permission_map.allowed(ALL_PERMISSIONS, "roles_list")
+    # 没有对应菜单的路由只校验token 并记录在unmatched中
+    assert permission_map.allowed(0, "hosts_list")
+    assert permission_map.unmatched == ["hosts_list"]
+
+
+def test_log_unmatched_once(monkeypatch):
+    messages = []
+    monkeypatch.setattr(permission.logger, "warning", messages.append)
+    monkeypatch.setattr(permission, "_logged_unmatched", [])
+    for _ in range(2):
+        permission._log_unmatched(  # pylint: disable=protected-access
+            PermissionMap(MENUS, [], [], [], route_names=["hosts_list"])
+        )
+    assert len(messages) == 1
+    assert "hosts_list" in messages[0]
+
+
+@pytest.mark.anyio
+async def test_invalidate_permissions_cluster(cluster_cache):
+    pubsub = cluster_cache.pubsub()
+    await pubsub.subscribe(PERMISSION_CHANNEL)
+    await pubsub.get_message(timeout=1)
+    await permission.invalidate_permissions()
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+    assert message["data"] == str(permission._epoch)  # pylint: disable=protected-access
+    await pubsub.aclose()
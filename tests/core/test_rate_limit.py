@@ -0,0 +1,45 @@
+import types
+
+import pytest
+
+from app.core import rate_limit
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+async def test_token_bucket(redis_cache, clock):
+    key = "test:bucket"
+    # 容量3 每秒恢复0.5个
+    for _ in range(3):
+        assert await rate_limit.take_token(key, 3, 0.5) == 0
+    assert await rate_limit.take_token(key, 3, 0.5) == 2
+    clock[0] += 1
+    assert await rate_limit.take_token(key, 3, 0.5) == 1
+    clock[0] += 1
+    assert await rate_limit.take_token(key, 3, 0.5) == 0
+    # 恢复不超过容量
+    clock[0] += 3600
+    for _ in range(3):
+        assert await rate_limit.take_token(key, 3, 0.5) == 0
+    assert await rate_limit.take_token(key, 3, 0.5) > 0
+    assert 0 < await redis_cache.pttl(key) <= 6000
+
+
+def _scope(peer: str) -> dict:
+    return {"type": "http", "client": (peer, 50000), "headers": []}
+
+
+def test_login_limit_client():
+    assert rate_limit.login_limit_client(_scope("203.0.113.9")) == "203.0.113.9"
+    assert (
+        rate_limit.login_limit_client(_scope("2001:db8:1:2:aaaa::1"))
+        == rate_limit.login_limit_client(_scope("2001:db8:1:2:bbbb::2"))
+        == "2001:db8:1:2::/64"
+    )
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+from app.core.security import (
+    BANNED_IPS_KEY,
+    BlockedClients,
+    JoseJwtCodec,
+    NativeJwtCodec,
+    get_client_ip,
+)
+
+KEY = "k" * 64
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+def test_native_codec_compatible_with_jose(algorithm):
+    native = NativeJwtCodec(KEY, algorithm)
+    jose = JoseJwtCodec(KEY, algorithm)
+    claims = {"sub": "admin", "id": 1, "exp": int(time.time()) + 60}
+    assert jose.decode(native.encode(claims)) == claims
+    assert native.decode(jose.encode(claims)) == claims
+
+
+def test_native_codec_rejects_tampered_token():
+    codec = NativeJwtCodec(KEY, "HS256")
+    header, payload, signature = codec.encode({"id": 1}).split(".")
+    other = NativeJwtCodec("x" * 64, "HS256").encode({"id": 2}).split(".")[1]
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{other}.{signature}")
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{payload}")
+
+
+def test_native_codec_rejects_other_algorithm():
+    token = JoseJwtCodec(KEY, "HS512").encode({"id": 1})
+    with pytest.raises(JWTError):
+        NativeJwtCodec(KEY, "HS256").decode(token)
+
+
+def test_native_codec_expiration():
+    codec = NativeJwtCodec(KEY, "HS256")
+    token = codec.encode({"id": 1, "exp": int(time.time()) - 10})
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(token)
+    assert codec.decode(token, verify_exp=False)["id"] == 1
+
+
+def _scope(peer: str | None, **headers: str) -> dict:
+    return {
+        "type": "http",
+        "client": (peer, 50000) if peer else None,
+        "headers": [
+            (name.replace("_", "-").lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+    }
+
+
+def test_client_ip_ignores_headers_from_untrusted_peer():
+    scope = _scope("203.0.113.9", X_Forwarded_For="1.1.1.1", X_Real_IP="2.2.2.2")
+    assert get_client_ip(scope) == "203.0.113.9"
+
+
+def test_client_ip_from_trusted_proxy():
+    scope = _scope("127.0.0.1", X_Forwarded_For="1.1.1.1, 203.0.113.9, 127.0.0.1")
+    assert get_client_ip(scope) == "203.0.113.9"
+    assert get_client_ip(_scope("127.0.0.1", X_Real_IP="2.2.2.2")) == "2.2.2.2"
+    assert get_client_ip(_scope("127.0.0.1")) == "127.0.0.1"
+
+
+@pytest.mark.anyio
+async def test_blocked_clients_ban_and_expire(redis_cache):
+    blocked = BlockedClients(
+        interval=60, ban_enable=True, ban_threshold=2, ban_ttl=60, local_ttl=5
+    )
+    assert not await blocked.is_banned("10.0.0.1")
+    await blocked.record("10.0.0.1", "GET", "/")
+    await blocked.record("10.0.0.1", "GET", "/")
+    assert await blocked.is_banned("10.0.0.1")
+    # 其他进程只查询redis
+    other = BlockedClients(
+        interval=60, ban_enable=True, ban_threshold=2, ban_ttl=60, local_ttl=5
+    )
+    assert await other.is_banned("10.0.0.1")
+    # 已到期但尚未清理的成员不视为封禁 查询本身不写入
+    await redis_cache.zadd(BANNED_IPS_KEY, {"10.0.0.2": time.time() - 1})
+    assert not await other.is_banned("10.0.0.2")
+    assert await redis_cache.zscore(BANNED_IPS_KEY, "10.0.0.2") is not None
+    await other.remove_expired()
+    assert await redis_cache.zscore(BANNED_IPS_KEY, "10.0.0.2") is None
+    assert await redis_cache.zscore(BANNED_IPS_KEY, "10.0.0.1") is not None
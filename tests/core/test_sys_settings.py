@@ -0,0 +1,36 @@
+import pytest
+
+from app.core import cache, sys_settings
+from app.core.cache_keys import SYS_SETTINGS_CHANNEL
+
+pytestmark = pytest.mark.anyio
+
+
+async def _check_publish(redis_client):
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(SYS_SETTINGS_CHANNEL)
+    await pubsub.get_message(timeout=1)
+    security = {"ip_check": True, "ip_check_mode": 1, "ip_black_list": ["10.0.0.1"]}
+    snapshot = await sys_settings.publish_sys_settings({"security": security})
+    assert snapshot.version == 1
+    assert snapshot.security.ip_black_list == ["10.0.0.1"]
+    assert sys_settings.get_sys_settings() is snapshot
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+    assert message["data"] == "1"
+    await pubsub.aclose()
+
+
+async def test_publish_sys_settings(redis_cache):
+    await _check_publish(redis_cache)
+
+
+async def test_publish_sys_settings_cluster(cluster_cache):
+    await _check_publish(cluster_cache)
+
+
+async def test_cluster_publish_reuses_node(cluster_cache):
+    await cache.publish_message("test:channel", "a")
+    node = cache._publish_node  # pylint: disable=protected-access
+    assert node is not None
+    await cache.publish_message("test:channel", "b")
+    assert cache._publish_node is node  # pylint: disable=protected-access
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from app.core import token_cache as token_cache_module
+from app.core.cache_keys import JWT_REVOKED_CHANNEL, jwt_key
+from app.core.token_cache import revoke_user_tokens, token_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def _check_revoke(redis_client, monkeypatch):
+    monkeypatch.setattr(token_cache_module.settings, "SECRET_JWT_LOCAL_CACHE", True)
+    await redis_client.set(jwt_key(1), "token-1")
+    await redis_client.set(jwt_key(2), "token-2")
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(JWT_REVOKED_CHANNEL)
+    await pubsub.get_message(timeout=1)
+    monkeypatch.setattr(token_cache, "online", True)
+    payload = {"user_id": 1, "exp": int(time.time()) + 60}
+    token_cache.put("token-1", payload, token_cache.epoch)
+    assert token_cache.get("token-1") == payload
+    await revoke_user_tokens([1, 2])
+    assert await redis_client.exists(jwt_key(1), jwt_key(2)) == 0
+    assert token_cache.get("token-1") is None
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+    assert message["data"] == "1,2"
+    await pubsub.aclose()
+
+
+async def test_revoke_user_tokens(redis_cache, monkeypatch):
+    await _check_revoke(redis_cache, monkeypatch)
+
+
+async def test_revoke_user_tokens_cluster(cluster_cache, monkeypatch):
+    await _check_revoke(cluster_cache, monkeypatch)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils.cache_tools import (
+    CACHE_CODECS,
+    dumps_redis_data,
+    get_cache_codec,
+    loads_redis_data,
+)
+
+VALUE = {"id": 1, "name": "中文", "roles": [1, 2], "ok": True, "none": None}
+
+
+@pytest.mark.parametrize("name", sorted(CACHE_CODECS))
+def test_codec_roundtrip(name):
+    data = dumps_redis_data(VALUE, name)
+    assert isinstance(data, str)
+    # 读取时不依赖当前配置的编解码器
+    assert loads_redis_data(data) == VALUE
+    assert loads_redis_data(data, "roles") == [1, 2]
+
+
+def test_plain_values():
+    assert dumps_redis_data("text") == "text"
+    assert loads_redis_data("text") == "text"
+    assert loads_redis_data(None) is None
+    assert loads_redis_data('{"a": 1}') == {"a": 1}
+
+
+def test_missing_codec_falls_back_to_json():
+    assert get_cache_codec("missing") is CACHE_CODECS["json"]
+    assert "missing" not in CACHE_CODECS
+
+
+def test_unknown_tag():
+    with pytest.raises(ValueError):
+        loads_redis_data("\x1eunknown1:abc")
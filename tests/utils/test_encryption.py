@@ -0,0 +1,43 @@
+import base64
+
+from Crypto.Cipher import AES
+
+from app.utils.encryption import AESCBC
+
+KEY = "0123456789abcdef0123456789abcdef"
+IV = "fedcba9876543210"
+
+
+def test_roundtrip():
+    aes = AESCBC(KEY, IV)
+    for text in ("", "a", "x" * 15, "y" * 16, "FastApi@2024", "z" * 100):
+        encrypted = aes.encrypt(text)
+        assert encrypted["code"] == 1
+        assert aes.decrypt(encrypted["data"]) == {"code": 1, "data": text}
+
+
+def test_matches_library_cbc():
+    aes = AESCBC(KEY, IV)
+    for text in ("FastApi@2024", "p" * 40):
+        cipher = AES.new(KEY.encode(), AES.MODE_CBC, IV.encode())
+        expected = cipher.encrypt(aes.PADDING(text).encode())
+        assert base64.b64decode(aes.encrypt(text)["data"]) == expected
+
+
+def test_decrypt_invalid():
+    aes = AESCBC(KEY, IV)
+    assert aes.decrypt("not-base64!")["code"] == 0
+    assert aes.decrypt(base64.b64encode(b"short").decode())["code"] == 0
+
+
+def test_batch():
+    aes = AESCBC(KEY, IV)
+    texts = ["a", "FastApi@2024", "p" * 40]
+    encrypted = aes.encrypt_many(texts)
+    assert [item["data"] for item in encrypted] == [
+        aes.encrypt(text)["data"] for text in texts
+    ]
+    # 单个失败不影响其他
+    results = aes.decrypt_many([encrypted[0]["data"], "bad", encrypted[2]["data"]])
+    assert [item["code"] for item in results] == [1, 0, 1]
+    assert [results[0]["data"], results[2]["data"]] == [texts[0], texts[2]]
@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils.ipaddress_tools import IpMatcher, check_ip_list, parse_ip_entry
+
+
+def test_parse_ip_entry():
+    assert parse_ip_entry("10.0.0.1") == (4, 0x0A000001, 0x0A000001)
+    assert parse_ip_entry("10.0.0.0/30") == (4, 0x0A000000, 0x0A000003)
+    assert parse_ip_entry("10.0.0.5-10.0.0.9") == (4, 0x0A000005, 0x0A000009)
+    for entry in ("10.0.0.9-10.0.0.5", "10.0.0.1-::1", "abc", "10.0.0.1-x"):
+        with pytest.raises(ValueError):
+            parse_ip_entry(entry)
+
+
+def test_matcher_merges_ranges():
+    matcher = IpMatcher(
+        ["10.0.0.0/30", "10.0.0.4-10.0.0.8", "10.0.0.6", "192.168.1.1", "2001:db8::/64"]
+    )
+    # 相邻和重叠的区间合并为一个
+    assert len(matcher) == 3
+    assert "10.0.0.0" in matcher
+    assert "10.0.0.8" in matcher
+    assert "10.0.0.9" not in matcher
+    assert "9.255.255.255" not in matcher
+    assert "192.168.1.1" in matcher
+    assert "192.168.1.2" not in matcher
+    assert "2001:db8::ffff" in matcher
+    assert "2001:db9::" not in matcher
+    assert "not-an-ip" not in matcher
+    assert "10.0.0.1" not in IpMatcher([])
+
+
+@pytest.mark.anyio
+async def test_check_ip_list():
+    assert await check_ip_list(["10.0.0.1", "10.0.0.0/24"]) == (True, None)
+    assert await check_ip_list(["10.0.0.1", "10.0.0.300"]) == (False, "10.0.0.300")
@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.auth_model import Menus, Roles, RolesMenusLink, Users, UsersRolesLink
+from app.utils.query_tools import count_related, load_related_ids
+
+pytestmark = pytest.mark.anyio
+
+# 用户3和角色3、4没有关联数据
+USERS_ROLES = [(1, 2), (1, 1), (2, 2), (4, 3), (4, 1)]
+ROLES_MENUS = [(1, 3), (1, 1), (1, 2), (2, 2)]
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    tables = [
+        model.__table__
+        for model in (Users, Roles, Menus, UsersRolesLink, RolesMenusLink)
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all, tables=tables)
+    async with AsyncSession(engine) as session:
+        session.add_all(
+            Users(id=i, username=f"user{i}", password="-", nickname=f"user{i}")
+            for i in range(1, 5)
+        )
+        session.add_all(
+            Roles(id=i, name=f"role{i}", nickname=f"role{i}") for i in range(1, 5)
+        )
+        session.add_all(
+            Menus(id=i, path=f"/menu{i}", name=f"menu{i}") for i in range(1, 4)
+        )
+        await session.flush()
+        session.add_all(
+            UsersRolesLink(auth_users_id=user_id, auth_roles_id=role_id)
+            for user_id, role_id in USERS_ROLES
+        )
+        session.add_all(
+            RolesMenusLink(auth_roles_id=role_id, auth_menus_id=menu_id)
+            for role_id, menu_id in ROLES_MENUS
+        )
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+async def test_users_roles_match_relationship(engine):
+    async with AsyncSession(engine) as session:
+        # 关系默认selectin加载 与批量查询前的结果对比
+        users = (await session.exec(select(Users).order_by(Users.id))).all()
+        expected = {user.id: sorted(role.id for role in user.roles) for user in users}
+        users_roles = await load_related_ids(
+            session,
+            UsersRolesLink.auth_users_id,
+            UsersRolesLink.auth_roles_id,
+            [user.id for user in users],
+        )
+    assert users_roles == expected
+    assert users_roles[3] == []
+
+
+async def test_roles_menus_and_user_count_match_relationship(engine):
+    async with AsyncSession(engine) as session:
+        roles = (await session.exec(select(Roles).order_by(Roles.id))).all()
+        expected_menus = {
+            role.id: sorted(menu.id for menu in role.menus) for role in roles
+        }
+        expected_count = {role.id: len(role.users) for role in roles}
+        roles_id = [role.id for role in roles]
+        roles_menus = await load_related_ids(
+            session,
+            RolesMenusLink.auth_roles_id,
+            RolesMenusLink.auth_menus_id,
+            roles_id,
+        )
+        roles_user_count = await count_related(
+            session, UsersRolesLink.auth_roles_id, roles_id
+        )
+    assert roles_menus == expected_menus
+    assert roles_user_count == expected_count
+    assert roles_menus[3] == roles_menus[4] == []
+    assert roles_user_count[4] == 0
+
+
+async def test_duplicate_unknown_and_empty_keys(engine):
+    async with AsyncSession(engine) as session:
+        related = await load_related_ids(
+            session,
+            UsersRolesLink.auth_users_id,
+            UsersRolesLink.auth_roles_id,
+            [2, 99, 2],
+        )
+        counts = await count_related(session, UsersRolesLink.auth_roles_id, [1, 99, 1])
+        assert related == {2: [2], 99: []}
+        assert counts == {1: 2, 99: 0}
+        assert (
+            await load_related_ids(
+                session,
+                UsersRolesLink.auth_users_id,
+                UsersRolesLink.auth_roles_id,
+                [],
+            )
+            == {}
+        )
+        assert await count_related(session, UsersRolesLink.auth_roles_id, []) == {}